@@ -0,0 +1,42 @@
+"""
+Набор микробенчмарков горячих путей: разбор ответа API, рендер, разбиение на подгруппы,
+снимок дня, поиск и сравнение названий.
+
+    python -m benchmarks [--filter render] [--sizes one,day] [--compare benchmarks/results/<файл>.json]
+"""
+import argparse
+from typing import Optional
+
+from benchmarks.runner import BenchmarkResult, format_result, load_results, measure, save_results
+from benchmarks.suite import SIZES, benchmarks
+
+RESULTS_DIRECTORY = "benchmarks/results"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="запускать только бенчмарки, в имени которых есть подстрока")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="размеры наборов через запятую")
+    parser.add_argument("--compare", default=None, help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--output", default=RESULTS_DIRECTORY, help="каталог для JSON с результатами")
+    args = parser.parse_args()
+
+    sizes: dict[str, int] = {size: SIZES[size] for size in args.sizes.split(",") if size in SIZES}
+    baseline: dict[tuple[str, str], dict] = load_results(args.compare) if args.compare else {}
+
+    results: list[BenchmarkResult] = []
+    for name, size, run in benchmarks(sizes):
+        if args.filter not in name:
+            continue
+
+        result: BenchmarkResult = measure(name, size, run)
+        results.append(result)
+
+        previous: Optional[dict] = baseline.get((name, size))
+        print(format_result(result, previous), flush=True)
+
+    print(f"Результаты сохранены в {save_results(results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Сравнение разбора ответа API: прежний путь (Response.json() и async-сборка dataclass на каждое занятие)
+против синхронного decode_schedule_group со слотами и интернированием строк.
+
+    python -m benchmarks.decode [--groups 300]
+"""
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass
+
+from benchmarks.fixtures import encode, make_day
+from benchmarks.runner import BenchmarkResult, format_result, measure
+from src.utils.schedule import ScheduleStates, SubGroup, decode_schedule_group
+
+
+# region Прежний путь разбора
+@dataclass(frozen=True, order=True)
+class _LegacyScheduleItem:
+    time: str
+    subject_name: str
+    group_name: str
+    teacher_name: str
+    room_number: str
+    sub_group: SubGroup
+    state: ScheduleStates
+
+
+@dataclass(frozen=True, order=True)
+class _LegacyScheduleGroup:
+    schedule_date: str
+    group_name: str
+    teacher_name: str
+    schedule_items: list[_LegacyScheduleItem]
+
+
+async def _legacy_build_item(info: dict) -> _LegacyScheduleItem:
+    return _LegacyScheduleItem(
+        time=info.get("time", ""),
+        subject_name=info.get("subjectName", ""),
+        group_name=info.get("groupName", ""),
+        teacher_name=info.get("teacherName", ""),
+        room_number=info.get("roomNumber", ""),
+        sub_group=SubGroup(info.get("subGroup", "")),
+        state=ScheduleStates(info.get("state"))
+    )
+
+
+async def _legacy_build_group(info: dict) -> _LegacyScheduleGroup:
+    items: list[_LegacyScheduleItem] = []
+    for item_info in info.get("scheduleItems", []):
+        items.append(await _legacy_build_item(item_info))
+
+    return _LegacyScheduleGroup(
+        schedule_date=info.get("scheduleDate", ""),
+        group_name=info.get("groupName", "Не указана"),
+        teacher_name=info.get("teacherName", "Не указан"),
+        schedule_items=items
+    )
+
+
+async def _legacy_decode_all(bodies: list[bytes]) -> list[_LegacyScheduleGroup]:
+    return [await _legacy_build_group(json.loads(body)) for body in bodies]
+# endregion
+
+
+def run(groups: int = 300) -> list[BenchmarkResult]:
+    bodies: list[bytes] = [encode(info) for info in make_day(groups)]
+    size: str = str(groups)
+    loop = asyncio.new_event_loop()
+
+    try:
+        return [
+            measure("decode_legacy", size, lambda: loop.run_until_complete(_legacy_decode_all(bodies))),
+            measure("decode", size, lambda: [decode_schedule_group(body) for body in bodies]),
+        ]
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--groups", type=int, default=300)
+    args = parser.parse_args()
+
+    for result in run(args.groups):
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
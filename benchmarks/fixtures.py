@@ -0,0 +1,50 @@
+import json
+import random
+
+from src.utils.schedule import ScheduleStates, SubGroup
+
+LESSON_TIMES: tuple[str, ...] = (
+    "08:30-10:00", "10:10-11:40", "12:10-13:40", "13:50-15:20", "15:30-17:00", "17:10-18:40"
+)
+SUBJECTS: tuple[str, ...] = (
+    "Математика", "Физика", "Информатика", "Русский язык", "Литература", "История", "Английский язык",
+    "Физическая культура", "Электротехника", "Инженерная графика", "Основы программирования", "Базы данных"
+)
+
+
+def make_schedule_info(group_index: int, lessons: int = 5, seed: int = 0) -> dict:
+    """Ответ API /api/schedule/student/ для одной синтетической группы"""
+
+    rng = random.Random(seed * 100_003 + group_index)
+    group_name: str = f"ИС-{group_index:03d}"
+
+    items: list[dict] = []
+    for lesson in range(lessons):
+        sub_groups: tuple[SubGroup, ...] = (
+            (SubGroup.FIRST, SubGroup.SECOND) if rng.random() < 0.2 else (SubGroup.BOTH,)
+        )
+        for sub_group in sub_groups:
+            items.append({
+                "time": LESSON_TIMES[lesson % len(LESSON_TIMES)],
+                "subjectName": rng.choice(SUBJECTS),
+                "groupName": group_name,
+                "teacherName": f"Преподаватель {rng.randrange(120):03d} А.А.",
+                "roomNumber": str(100 + rng.randrange(80)),
+                "subGroup": sub_group.value,
+                "state": ScheduleStates.DISTANT.value if rng.random() < 0.05 else ScheduleStates.OK.value,
+            })
+
+    return {
+        "scheduleDate": "2026-10-19",
+        "groupName": group_name,
+        "teacherName": None,
+        "scheduleItems": items,
+    }
+
+
+def make_day(groups: int, lessons: int = 5, seed: int = 0) -> list[dict]:
+    return [make_schedule_info(group_index, lessons, seed) for group_index in range(groups)]
+
+
+def encode(schedule_info: dict) -> bytes:
+    return json.dumps(schedule_info, ensure_ascii=False).encode()
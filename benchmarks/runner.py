@@ -0,0 +1,122 @@
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+MIN_DURATION = 0.2
+ROUNDS = 5
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    name: str
+    size: str
+    iterations: int
+    seconds: float
+    ops_per_sec: float
+    peak_bytes: int
+    retained_bytes: int
+    retained_blocks: int
+
+
+def _calibrate(run: Callable[[], Any]) -> int:
+    iterations: int = 1
+    while True:
+        started: float = time.perf_counter()
+        for _ in range(iterations):
+            run()
+        if time.perf_counter() - started >= MIN_DURATION / ROUNDS or iterations >= 1 << 20:
+            return iterations
+        iterations *= 2
+
+
+def _allocations(run: Callable[[], Any]) -> tuple[int, int, int]:
+    """Пиковый и удержанный объём памяти и число удержанных блоков за один запуск"""
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+
+    retained: Any = run()
+
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    retained_bytes: int = sum(stat.size_diff for stat in stats)
+    blocks: int = sum(max(0, stat.count_diff) for stat in stats)
+    del retained
+
+    return peak, retained_bytes, blocks
+
+
+def measure(name: str, size: str, run: Callable[[], Any]) -> BenchmarkResult:
+    """Лучшее время из ROUNDS серий по iterations запусков и память одного запуска"""
+
+    run()
+    iterations: int = _calibrate(run)
+
+    best: float = float("inf")
+    for _ in range(ROUNDS):
+        started: float = time.perf_counter()
+        for _ in range(iterations):
+            run()
+        best = min(best, (time.perf_counter() - started) / iterations)
+
+    peak, retained_bytes, blocks = _allocations(run)
+
+    return BenchmarkResult(name=name, size=size, iterations=iterations, seconds=best, ops_per_sec=1 / best,
+                           peak_bytes=peak, retained_bytes=retained_bytes, retained_blocks=blocks)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: list[BenchmarkResult], directory: str) -> str:
+    commit: Optional[str] = _git_commit()
+    timestamp: str = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path: str = os.path.join(directory, f"{timestamp}-{commit or 'nocommit'}.json")
+
+    data: dict = {
+        "commit": commit,
+        "timestamp": timestamp,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [asdict(result) for result in results],
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=1)
+
+    return path
+
+
+def load_results(path: str) -> dict[tuple[str, str], dict]:
+    with open(path, encoding="utf-8") as file:
+        data: dict = json.load(file)
+    return {(result["name"], result["size"]): {**result, "commit": data.get("commit")} for result in data["results"]}
+
+
+def format_result(result: BenchmarkResult, baseline: Optional[dict] = None) -> str:
+    line: str = (f"{result.name:<18} {result.size:<6} {result.ops_per_sec:>12.1f} оп/с "
+                 f"{result.seconds * 1e6:>12.1f} мкс  пик {result.peak_bytes / 1024:>9.1f} КиБ  "
+                 f"блоков {result.retained_blocks:>7}")
+
+    if baseline is not None:
+        line += f"  x{result.ops_per_sec / baseline['ops_per_sec']:.2f} к {baseline.get('commit') or 'базе'}"
+
+    return line
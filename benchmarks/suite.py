@@ -0,0 +1,82 @@
+from typing import Any, Callable
+
+from benchmarks.fixtures import encode, make_day
+from src.utils.digest import build_digest
+from src.utils.directory import Directory, build_directory, normalize_name
+from src.utils.limits import MAX_SUBSCRIPTION_COUNT
+from src.utils.schedule import ScheduleGroup, SubGroup, decode_schedule_group, schedule_fingerprint
+from src.utils.search import SearchIndex, build_search_index
+from src.utils.snapshot import build_snapshot
+
+# Размер набора: число групп в синтетическом дне
+SIZES: dict[str, int] = {
+    "one": 1,
+    "small": 30,
+    "day": 300,
+}
+LESSONS_PER_GROUP = 6
+
+Benchmark = tuple[str, str, Callable[[], Any]]
+
+# cached_property кэширует результат в объекте, поэтому рендер и разбиение меряются через исходные функции
+_split: Callable[[ScheduleGroup], dict] = ScheduleGroup._sub_groups.func
+
+
+def _render(group: ScheduleGroup) -> str:
+    return ScheduleGroup.schedule_header.func(group) + "".join(ScheduleGroup.lesson_blocks.func(group))
+
+
+def _schedule_benchmarks(size: str, groups_count: int) -> list[Benchmark]:
+    infos: list[dict] = make_day(groups_count, LESSONS_PER_GROUP)
+    bodies: list[bytes] = [encode(info) for info in infos]
+    groups: list[ScheduleGroup] = [decode_schedule_group(body) for body in bodies]
+    by_name: dict[str, ScheduleGroup] = {group.group_name: group for group in groups}
+
+    def render_sub_groups() -> list[str]:
+        return [_render(view) for group in groups for view in _split(group).values()]
+
+    # Чаты с наибольшим числом подписок; блоки занятий уже отрисованы, как при рассылке
+    chats: list[list[ScheduleGroup]] = [groups[start:start + MAX_SUBSCRIPTION_COUNT]
+                                        for start in range(0, len(groups), MAX_SUBSCRIPTION_COUNT)]
+
+    return [
+        ("decode", size, lambda: [decode_schedule_group(body) for body in bodies]),
+        ("render", size, lambda: [_render(group) for group in groups]),
+        ("sub_group_split", size, lambda: [_split(group) for group in groups]),
+        ("sub_group_render", size, render_sub_groups),
+        ("digest", size, lambda: [build_digest(chat) for chat in chats]),
+        ("fingerprint", size, lambda: [schedule_fingerprint(group) for group in groups]),
+        ("snapshot", size, lambda: build_snapshot(None, by_name)),
+    ]
+
+
+def _lookup_benchmarks(size: str, groups_count: int) -> list[Benchmark]:
+    infos: list[dict] = make_day(groups_count, LESSONS_PER_GROUP)
+    group_names: list[str] = [info["groupName"] for info in infos]
+    teacher_names: list[str] = sorted({item["teacherName"] for info in infos for item in info["scheduleItems"]})
+
+    directory: Directory = build_directory(group_names, teacher_names)
+    index: SearchIndex = build_search_index(directory.groups, directory.teachers)
+
+    # Пользователи пишут названия как попало: другой регистр, лишние пробелы, промахи
+    queries: list[str] = [f" {name.lower()} " for name in group_names] + ["нет такой группы"]
+    partial: list[str] = [name[:4] for name in group_names[:50]] + ["ис0", "преподаватель 01"]
+
+    return [
+        ("find_group", size, lambda: [directory.find_group(query) for query in queries]),
+        ("normalize_name", size, lambda: [normalize_name(query) for query in queries]),
+        ("search", size, lambda: [index.search(query) for query in partial]),
+    ]
+
+
+def _sub_group_names() -> list[Benchmark]:
+    names: list[str] = [sub_group.display_name for sub_group in SubGroup] * 100
+    return [("from_display_name", "-", lambda: [SubGroup.from_display_name(name) for name in names])]
+
+
+def benchmarks(sizes: dict[str, int] = SIZES) -> list[Benchmark]:
+    cases: list[Benchmark] = _sub_group_names()
+    for size, groups_count in sizes.items():
+        cases += _schedule_benchmarks(size, groups_count)
+        cases += _lookup_benchmarks(size, groups_count)
+    return cases
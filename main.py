@@ -1,17 +1,71 @@
+from typing import Optional
+
 from dotenv import load_dotenv
 import os
 
 from src.api_communicator import ApiCommunicator
 from src.bot import AkttBot
 from src.database import Database
+from src.metrics import MetricsConfig
+from src.schedule_poller import PollConfig, parse_windows
+from src.state_snapshot import StateSnapshot
+from src.webhook import WebhookConfig
+
+
+def webhook_config() -> Optional[WebhookConfig]:
+    if os.getenv("BOT_MODE", "polling").lower() != "webhook":
+        return None
+
+    return WebhookConfig(
+        url=os.getenv("WEBHOOK_URL") or None,
+        listen=os.getenv("WEBHOOK_LISTEN", "0.0.0.0"),
+        port=int(os.getenv("WEBHOOK_PORT", "8443")),
+        path=os.getenv("WEBHOOK_PATH", "/telegram"),
+        secret_token=os.getenv("WEBHOOK_SECRET") or None,
+        max_connections=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40")),
+        health_path=os.getenv("WEBHOOK_HEALTH_PATH", "/health"),
+    )
+
+
+def metrics_config() -> Optional[MetricsConfig]:
+    if not os.getenv("METRICS_PORT"):
+        return None
+
+    return MetricsConfig(
+        listen=os.getenv("METRICS_LISTEN", "127.0.0.1"),
+        port=int(os.getenv("METRICS_PORT")),
+        path=os.getenv("METRICS_PATH", "/metrics"),
+    )
+
+
+def poll_config() -> PollConfig:
+    return PollConfig(
+        fast_interval=float(os.getenv("SCHEDULE_FAST_INTERVAL", "120")),
+        slow_interval=float(os.getenv("SCHEDULE_SLOW_INTERVAL", "1800")),
+        max_backoff=float(os.getenv("SCHEDULE_MAX_BACKOFF", "1800")),
+        windows=parse_windows(os.getenv("SCHEDULE_PUBLISH_WINDOWS", "")),
+        content_interval=float(os.getenv("SCHEDULE_CONTENT_INTERVAL", "0")),
+        content_after_publish=float(os.getenv("SCHEDULE_CONTENT_AFTER_PUBLISH", "10800")),
+        content_targets=int(os.getenv("SCHEDULE_CONTENT_TARGETS", "20")),
+    )
 
 
 def main() -> None:
     load_dotenv()
     token: str = os.getenv("TG_BOT", None)
 
-    bot = AkttBot(token)
-    bot.start_bot()
+    StateSnapshot().load()
+
+    concurrent_updates: int = int(os.getenv("CONCURRENT_UPDATES", "64"))
+
+    admin_ids: frozenset[int] = frozenset(
+        int(admin_id) for admin_id in os.getenv("ADMIN_IDS", "").split(",") if admin_id.strip()
+    )
+
+    bot = AkttBot(token, concurrent_updates=concurrent_updates, poll_config=poll_config(),
+                  metrics=metrics_config(), slow_update_seconds=float(os.getenv("SLOW_UPDATE_SECONDS", "2")),
+                  admin_ids=admin_ids, broadcast_workers=os.getenv("BROADCAST_MODE", "").lower() == "worker")
+    bot.start_bot(webhook=webhook_config())
 
 
 if __name__ == "__main__":
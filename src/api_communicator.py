@@ -1,7 +1,77 @@
+import asyncio
+import math
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import Optional
-from httpx import AsyncClient, Response
-from src.utils.schedule import ScheduleGroup, build_schedule_group, SubGroup
+from http import HTTPStatus
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from dotenv import load_dotenv
+from httpx import AsyncClient, HTTPStatusError, Limits, Response, Timeout, TransportError
+from src.logger_config import logger
+from src.metrics import UPSTREAM_DURATION, observed
+from src.utils.cache import CacheStats, LRUCache
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from src.utils.directory import Directory, build_directory
+from src.utils.search import MAX_RESULTS, build_search_index
+from src.utils.single_flight import SingleFlight
+from src.utils.schedule import (ScheduleGroup, ScheduleItem, decode_schedule_group, SubGroup, ScheduleKind,
+                                ScheduleTarget, schedule_group_size)
+from src.utils.snapshot import ScheduleSnapshot, build_snapshot, teacher_schedule_group
+
+DIRECTORY_TTL = 60 * 60
+SCHEDULE_CACHE_ENTRIES = 1024
+SCHEDULE_CACHE_SIZE = 32 * 1024 * 1024
+SNAPSHOT_CONCURRENCY = 16
+# Неполный снимок (часть групп не загрузилась) пересобирается не раньше, чем через столько секунд
+SNAPSHOT_RETRY_INTERVAL = 5 * 60
+FETCH_CONCURRENCY = 8
+
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE = 16
+HTTP_KEEPALIVE_EXPIRY = 30
+HTTP_TIMEOUT = Timeout(10, connect=3)
+DATE_TIMEOUT = Timeout(5, connect=3)
+DIRECTORY_TIMEOUT = Timeout(15, connect=3)
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.3
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+
+ScheduleCacheKey = tuple[Optional[datetime], ScheduleKind, str]
+StaleScheduleKey = tuple[ScheduleKind, str]
+
+
+@dataclass
+class ApiClientStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    rejected: int = 0
+    served_stale: int = 0
+    in_flight: int = 0
+    max_connections: int = HTTP_MAX_CONNECTIONS
+    breaker_state: CircuitState = CircuitState.CLOSED
+    breaker_failures: int = 0
+
+
+def _is_upstream_unavailable(error: BaseException) -> bool:
+    """Ошибка говорит о недоступности API, а не о неправильном запросе"""
+
+    if isinstance(error, HTTPStatusError):
+        return error.response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+    return isinstance(error, (TransportError, CircuitOpenError))
+
+
+def _decode_schedule(kind: ScheduleKind, name: str, body: bytes) -> ScheduleGroup:
+    """Расписание преподавателя приводится к виду, в котором его собирает снимок"""
+
+    schedule: ScheduleGroup = decode_schedule_group(body)
+    if kind == ScheduleKind.TEACHER:
+        return teacher_schedule_group(schedule.schedule_date, name, schedule.schedule_items)
+    return schedule
 
 
 class ApiCommunicator:
@@ -10,75 +80,550 @@ class ApiCommunicator:
     _port: int
     _http_client: AsyncClient
     _last_edit_datetime: Optional[datetime]
+    _schedule_revision: int
+    _date_validators: dict[str, str]
+    _pending_validators: dict[str, str]
+    _republish_signalled: bool
+    _directory: Optional[Directory]
+    _directory_task: Optional[asyncio.Task]
+    _directory_ttl: float
+    _schedule_cache: LRUCache[ScheduleCacheKey, ScheduleGroup]
+    _stale_schedules: LRUCache[StaleScheduleKey, ScheduleGroup]
+    _schedule_flights: SingleFlight[ScheduleCacheKey, ScheduleGroup]
+    _list_flights: SingleFlight[str, list[str]]
+    _fresh_flights: SingleFlight[StaleScheduleKey, ScheduleGroup]
+    _breaker: CircuitBreaker
+    _client_stats: ApiClientStats
+    _snapshot_mode: bool
+    _snapshot: Optional[ScheduleSnapshot]
+    _snapshot_task: Optional[asyncio.Task]
+    _snapshot_expires: float
 
-    def __new__(cls, address: str = "http://localhost", port: int = 16311):
+    def __new__(cls, address: str = "http://localhost", port: int = 16311, directory_ttl: float = DIRECTORY_TTL,
+                schedule_cache_entries: int = SCHEDULE_CACHE_ENTRIES, schedule_cache_size: int = SCHEDULE_CACHE_SIZE,
+                snapshot_mode: Optional[bool] = None):
         if not cls.instance:
+            load_dotenv()
+            if snapshot_mode is None:
+                snapshot_mode = os.getenv("API_SNAPSHOT_MODE", "").lower() in ("1", "true", "yes")
+
             cls.instance = object.__new__(cls)
             cls._address: str = address
             cls._port: int = port
-            cls._http_client: AsyncClient = AsyncClient()
+            cls._http_client: AsyncClient = AsyncClient(
+                limits=Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                              keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+                timeout=HTTP_TIMEOUT
+            )
             cls._last_edit_datetime: Optional[datetime] = None
+            cls._schedule_revision: int = 0
+            cls._date_validators: dict[str, str] = {}
+            cls._pending_validators: dict[str, str] = {}
+            cls._republish_signalled: bool = False
+            cls._directory: Optional[Directory] = None
+            cls._directory_task: Optional[asyncio.Task] = None
+            cls._directory_ttl: float = directory_ttl
+            cls._schedule_cache: LRUCache[ScheduleCacheKey, ScheduleGroup] = LRUCache(
+                schedule_cache_entries, schedule_cache_size, schedule_group_size
+            )
+            cls._stale_schedules: LRUCache[StaleScheduleKey, ScheduleGroup] = LRUCache(
+                schedule_cache_entries, schedule_cache_entries
+            )
+            cls._schedule_flights: SingleFlight[ScheduleCacheKey, ScheduleGroup] = SingleFlight()
+            cls._list_flights: SingleFlight[str, list[str]] = SingleFlight()
+            cls._fresh_flights: SingleFlight[StaleScheduleKey, ScheduleGroup] = SingleFlight()
+            cls._breaker: CircuitBreaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET_TIMEOUT)
+            cls._client_stats: ApiClientStats = ApiClientStats()
+            cls._snapshot_mode: bool = snapshot_mode
+            cls._snapshot: Optional[ScheduleSnapshot] = None
+            cls._snapshot_task: Optional[asyncio.Task] = None
+            cls._snapshot_expires: float = math.inf
 
         return cls.instance
 
-    async def get_groups_list(self) -> list[str]:
-        response: Response = await self._http_client.get(f"{self._address}:{self._port}/api/schedule/groups")
-        response.raise_for_status()
+    # region HTTP
+    async def _get(self, path: str, timeout: Timeout = HTTP_TIMEOUT,
+                   headers: Optional[dict[str, str]] = None) -> Response:
+        """
+        GET к API с повторами при сетевых ошибках и ответах 5xx.
+        Пока автомат разомкнут, запрос сразу завершается CircuitOpenError.
+        """
 
-        data: dict = response.json()
-        return data.get("groupsList")
+        stats: ApiClientStats = self._client_stats
+        endpoint: str = "/".join(path.split("/")[:4])
 
+        if not self._breaker.allow():
+            stats.rejected += 1
+            raise CircuitOpenError(f"API недоступно, запрос {path} не отправлен")
+
+        recorded: bool = False
+        stats.in_flight += 1
+        try:
+            error: Exception = TransportError(path)
+            for attempt in range(RETRY_ATTEMPTS):
+                if attempt:
+                    stats.retries += 1
+                    await asyncio.sleep(random.uniform(0, RETRY_BACKOFF * 2 ** attempt))
+
+                stats.requests += 1
+                started: float = time.perf_counter()
+                try:
+                    response: Response = await self._http_client.get(
+                        f"{self._address}:{self._port}{path}", headers=headers, timeout=timeout
+                    )
+                except TransportError as e:
+                    UPSTREAM_DURATION.observe(time.perf_counter() - started, endpoint, "error")
+                    error = e
+                    continue
+
+                UPSTREAM_DURATION.observe(time.perf_counter() - started, endpoint, str(response.status_code))
+
+                if response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR:
+                    self._breaker.record_success()
+                    recorded = True
+                    return response
+
+                error = HTTPStatusError(f"Ответ {response.status_code} на {path}",
+                                        request=response.request, response=response)
+
+            stats.failures += 1
+            self._breaker.record_failure()
+            recorded = True
+            raise error
+        finally:
+            stats.in_flight -= 1
+            if not recorded:
+                self._breaker.release()
+
+    @property
+    def client_stats(self) -> ApiClientStats:
+        self._client_stats.breaker_state = self._breaker.state
+        self._client_stats.breaker_failures = self._breaker.failures
+        return self._client_stats
+    # endregion
+
+    async def _get_list(self, path: str, field_name: str) -> list[str]:
+        async def load() -> list[str]:
+            response: Response = await self._get(path, DIRECTORY_TIMEOUT)
+            response.raise_for_status()
+
+            data: dict = response.json()
+            return data.get(field_name)
+
+        return await self._list_flights.do(path, load)
+
+    @observed("api")
+    async def get_groups_list(self) -> list[str]:
+        return await self._get_list("/api/schedule/groups", "groupsList")
+
+    @observed("api")
     async def get_teachers_list(self) -> list[str]:
-        response: Response = await self._http_client.get(f"{self._address}:{self._port}/api/schedule/teachers")
-        response.raise_for_status()
+        return await self._get_list("/api/schedule/teachers", "teachersList")
 
-        data: dict = response.json()
-        return data.get("teachersList")
+    # region Groups and teachers directory
+    async def _load_directory(self) -> Directory:
+        groups, teachers = await asyncio.gather(self.get_groups_list(), self.get_teachers_list())
+        directory: Directory = build_directory(groups, teachers)
+        self._directory = directory
+        return directory
+
+    def _on_directory_loaded(self, task: asyncio.Task) -> None:
+        self._directory_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Не удалось обновить список групп и преподавателей: {task.exception()!r}")
+
+    def refresh_directory(self) -> asyncio.Task:
+        """Запускает обновление справочника; одновременные вызовы получают одну и ту же задачу"""
+
+        if self._directory_task is None:
+            self._directory_task = asyncio.create_task(self._load_directory())
+            self._directory_task.add_done_callback(self._on_directory_loaded)
+
+        return self._directory_task
+
+    async def get_directory(self) -> Directory:
+        directory: Optional[Directory] = self._directory
+
+        if directory is not None and not directory.is_expired(self._directory_ttl) and self._directory_task is None:
+            return directory
+
+        try:
+            return await asyncio.shield(self.refresh_directory())
+        except Exception:
+            if directory is None:
+                raise
+            return directory
+
+    async def find_group(self, name: str) -> Optional[str]:
+        return (await self.get_directory()).find_group(name)
+
+    async def find_teacher(self, name: str) -> Optional[str]:
+        return (await self.get_directory()).find_teacher(name)
+
+    async def search(self, query: str, limit: int = MAX_RESULTS) -> list[ScheduleTarget]:
+        directory: Directory = await self.get_directory()
+        return build_search_index(directory.groups, directory.teachers).search(query, limit)
+    # endregion
+
+    async def _get_cached_schedule(self, kind: ScheduleKind, name: str,
+                                   loader: Callable[[str], Awaitable[bytes]]) -> ScheduleGroup:
+        key: ScheduleCacheKey = (self._last_edit_datetime, kind, name)
+        cached: Optional[ScheduleGroup] = self._schedule_cache.get(key)
+        if cached is not None:
+            return cached
+
+        return await self._schedule_flights.do(key, lambda: self._load_schedule(key, loader))
+
+    async def _load_schedule(self, key: ScheduleCacheKey, loader: Callable[[str], Awaitable[bytes]]) -> ScheduleGroup:
+        """Загружает расписание в кэш; одновременные запросы одной цели ждут одну загрузку"""
+
+        _, kind, name = key
+        try:
+            schedule_body: bytes = await loader(name)
+        except Exception as e:
+            stale: Optional[ScheduleGroup] = self._stale_schedules.get((kind, name))
+            if stale is None or not _is_upstream_unavailable(e):
+                raise
+
+            if not stale.stale:
+                stale = replace(stale, stale=True)
+                self._stale_schedules.put((kind, name), stale)
+
+            self._client_stats.served_stale += 1
+            logger.warning(f"API недоступно, отдаём последнее известное расписание для {name}: {e!r}")
+            return stale
+
+        schedule: ScheduleGroup = _decode_schedule(kind, name, schedule_body)
+
+        self._schedule_cache.put(key, schedule)
+        self._stale_schedules.put((kind, name), schedule)
+        return schedule
 
     # region Student schedule creation
-    async def _get_student_schedule_info(self, group_name: str) -> dict:
-        response: Response = await self._http_client.get(f"{self._address}:{self._port}/api/schedule/student/{group_name}/")
+    async def _get_student_schedule_info(self, group_name: str) -> bytes:
+        response: Response = await self._get(f"/api/schedule/student/{group_name}/")
         response.raise_for_status()
 
-        return response.json()
+        return response.content
 
+    @observed("api")
     async def get_student_schedule(self, group_name: str) -> ScheduleGroup:
-        schedule_info: dict = await self._get_student_schedule_info(group_name)
+        snapshot: Optional[ScheduleSnapshot] = self._current_snapshot()
+        if snapshot is not None and group_name in snapshot.groups:
+            return snapshot.groups[group_name]
 
-        return await build_schedule_group(schedule_info)
+        return await self._get_cached_schedule(ScheduleKind.STUDENT, group_name, self._get_student_schedule_info)
     # endregion
 
     # region Teacher schedule creation
-    async def _get_teacher_schedule_info(self, teacher_name: str) -> Optional[dict]:
-        response: Response = await self._http_client.get(f"{self._address}:{self._port}/api/schedule/teacher/{teacher_name}")
+    async def _get_teacher_schedule_info(self, teacher_name: str) -> bytes:
+        response: Response = await self._get(f"/api/schedule/teacher/{teacher_name}")
         response.raise_for_status()
 
-        return response.json()
+        return response.content
 
 
+    @observed("api")
     async def get_teacher_schedule(self, teacher_name: str) -> Optional[ScheduleGroup]:
-        schedule_info: dict = await self._get_teacher_schedule_info(teacher_name)
+        # В неполном снимке у преподавателя могут не хватать занятий из незагрузившихся групп
+        snapshot: Optional[ScheduleSnapshot] = self._current_snapshot()
+        if snapshot is not None and snapshot.complete and teacher_name in snapshot.teachers:
+            return snapshot.teacher_schedule(teacher_name)
 
-        return await build_schedule_group(schedule_info)
+        return await self._get_cached_schedule(ScheduleKind.TEACHER, teacher_name, self._get_teacher_schedule_info)
 
     # endregion
 
-    async def _get_schedule_date(self) -> datetime:
-        response: Response = await self._http_client.get(
-            f"{self._address}:{self._port}/api/schedule/date"
+    async def get_schedule(self, target: ScheduleTarget) -> ScheduleGroup:
+        if target.kind == ScheduleKind.TEACHER:
+            return await self.get_teacher_schedule(target.name)
+
+        return await self.get_student_schedule(target.name)
+
+    def loaded_schedule(self, target: ScheduleTarget) -> Optional[ScheduleGroup]:
+        """Расписание цели за текущую дату, если оно уже есть в снимке или кэше; API не вызывается"""
+
+        snapshot: Optional[ScheduleSnapshot] = self._current_snapshot()
+        if snapshot is not None:
+            if target.kind == ScheduleKind.STUDENT and target.name in snapshot.groups:
+                return snapshot.groups[target.name]
+            if target.kind == ScheduleKind.TEACHER and snapshot.complete and target.name in snapshot.teachers:
+                return snapshot.teacher_schedule(target.name)
+
+        key: ScheduleCacheKey = (self._last_edit_datetime, target.kind, target.name)
+        return self._schedule_cache.get(key) if key in self._schedule_cache else None
+
+    async def get_fresh_schedule(self, target: ScheduleTarget) -> ScheduleGroup:
+        """Загружает расписание мимо кэша; одновременные загрузки одной цели ждут одну"""
+
+        loader: Callable[[str], Awaitable[bytes]] = (
+            self._get_teacher_schedule_info if target.kind == ScheduleKind.TEACHER else self._get_student_schedule_info
         )
+
+        async def load() -> ScheduleGroup:
+            return _decode_schedule(target.kind, target.name, await loader(target.name))
+
+        return await self._fresh_flights.do((target.kind, target.name), load)
+
+    async def get_fresh_schedules(self, targets: list[ScheduleTarget],
+                                  concurrency: int = FETCH_CONCURRENCY) -> dict[ScheduleTarget, ScheduleGroup]:
+        """
+        Загружает расписания целей из API мимо кэша, снимка и запаса, ничего в них не меняя:
+        так переопубликованное расписание сравнивается с разосланным, не сбрасывая кэш.
+        """
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(target: ScheduleTarget) -> ScheduleGroup:
+            async with semaphore:
+                return await self.get_fresh_schedule(target)
+
+        results = await asyncio.gather(*(fetch(target) for target in targets), return_exceptions=True)
+
+        schedules: dict[ScheduleTarget, ScheduleGroup] = {}
+        for target, result in zip(targets, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Не удалось перепроверить расписание для {target.name}: {result!r}")
+                continue
+            schedules[target] = result
+
+        return schedules
+
+    def replace_schedules(self, schedules: dict[ScheduleTarget, ScheduleGroup]) -> None:
+        """Заменяет загруженные расписания исправленными; остальной кэш и снимок не трогаются"""
+
+        if not schedules:
+            return
+
+        for target, schedule in schedules.items():
+            self._schedule_cache.put((self._last_edit_datetime, target.kind, target.name), schedule)
+            self._stale_schedules.put((target.kind, target.name), schedule)
+
+        snapshot: Optional[ScheduleSnapshot] = self._current_snapshot()
+        if snapshot is not None:
+            groups: dict[str, ScheduleGroup] = {
+                target.name: schedule for target, schedule in schedules.items() if target.kind == ScheduleKind.STUDENT
+            }
+            rebuilt: ScheduleSnapshot = build_snapshot(snapshot.schedule_date, {**snapshot.groups, **groups},
+                                                       complete=snapshot.complete)
+            # Расписание преподавателя собирается из групп, которых могло не быть среди исправленных:
+            # исправленное расписание преподавателя заменяет собранное, снимок при этом не пересобирается
+            teachers: dict[str, list[ScheduleItem]] = {
+                target.name: schedule.schedule_items
+                for target, schedule in schedules.items() if target.kind == ScheduleKind.TEACHER
+            }
+            self._snapshot = replace(rebuilt, teachers={**rebuilt.teachers, **teachers}) if teachers else rebuilt
+
+        self._schedule_revision += 1
+
+    # region Full day snapshot
+    def _current_snapshot(self) -> Optional[ScheduleSnapshot]:
+        snapshot: Optional[ScheduleSnapshot] = self._snapshot
+        if snapshot is None or snapshot.schedule_date != self._last_edit_datetime:
+            return None
+        return snapshot
+
+    async def _load_snapshot(self) -> ScheduleSnapshot:
+        schedule_date: Optional[datetime] = self._last_edit_datetime
+        revision: int = self._schedule_revision
+        directory: Directory = await self.get_directory()
+        semaphore = asyncio.Semaphore(SNAPSHOT_CONCURRENCY)
+
+        async def fetch(group_name: str) -> ScheduleGroup:
+            async with semaphore:
+                return decode_schedule_group(await self._get_student_schedule_info(group_name))
+
+        group_names: list[str] = sorted(directory.groups)
+        results = await asyncio.gather(*(fetch(group_name) for group_name in group_names), return_exceptions=True)
+
+        groups: dict[str, ScheduleGroup] = {}
+        for group_name, result in zip(group_names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Не удалось получить расписание группы {group_name} для снимка: {result!r}")
+                continue
+            groups[group_name] = result
+            self._stale_schedules.put((ScheduleKind.STUDENT, group_name), result)
+
+        snapshot: ScheduleSnapshot = build_snapshot(schedule_date, groups, complete=len(groups) == len(group_names))
+        # Пока снимок собирался, расписания могли начать загружать заново: такой снимок уже устарел
+        if revision == self._schedule_revision:
+            self._snapshot = snapshot
+            self._snapshot_expires = math.inf if snapshot.complete else time.monotonic() + SNAPSHOT_RETRY_INTERVAL
+        logger.info(f"Снимок расписания собран: {len(groups)} из {len(group_names)} групп, "
+                    f"{len(snapshot.teachers)} преподавателей, {len(snapshot.rooms)} кабинетов")
+        return snapshot
+
+    def _on_snapshot_loaded(self, task: asyncio.Task) -> None:
+        self._snapshot_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Не удалось собрать снимок расписания: {task.exception()!r}")
+
+    def _snapshot_due(self) -> bool:
+        """Снимка за текущую дату нет, или он неполный и пора попробовать собрать его снова"""
+
+        return self._current_snapshot() is None or time.monotonic() >= self._snapshot_expires
+
+    async def get_snapshot(self) -> ScheduleSnapshot:
+        """
+        Возвращает снимок за текущую дату, собирая его при необходимости одним общим запросом.
+        Неполный снимок отдаётся, пока в фоне собирается новый.
+        """
+
+        snapshot: Optional[ScheduleSnapshot] = self._current_snapshot()
+        if snapshot is not None and not self._snapshot_due():
+            return snapshot
+
+        if self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._load_snapshot())
+            self._snapshot_task.add_done_callback(self._on_snapshot_loaded)
+
+        if snapshot is not None:
+            return snapshot
+        return await asyncio.shield(self._snapshot_task)
+
+    @property
+    def snapshot_complete(self) -> bool:
+        snapshot: Optional[ScheduleSnapshot] = self._current_snapshot()
+        return snapshot is not None and snapshot.complete
+
+    @observed("api")
+    async def get_room_schedule(self, room_number: str) -> Optional[ScheduleGroup]:
+        """
+        API не отдаёт расписание кабинета, поэтому оно собирается из снимка всех групп.
+        Без snapshot_mode снимок не собирается, и расписания кабинетов нет.
+        """
+
+        if not self._snapshot_mode:
+            return None
+
+        snapshot: ScheduleSnapshot = await self.get_snapshot()
+        return snapshot.room_schedule(room_number)
+    # endregion
+
+    @property
+    def schedule_date(self) -> Optional[datetime]:
+        return self._last_edit_datetime
+
+    @property
+    def schedule_revision(self) -> int:
+        """Меняется, когда исправленные расписания той же даты заменяют загруженные"""
+
+        return self._schedule_revision
+
+    @property
+    def schedule_cache_stats(self) -> CacheStats:
+        return self._schedule_cache.stats
+
+    async def _get_schedule_date(self) -> tuple[datetime, dict[str, str]]:
+        """
+        Запрашивает дату расписания; если сервер отдаёт ETag или Last-Modified, запрос условный.
+        Возвращает дату и заголовки для следующего условного запроса.
+        """
+
+        headers: dict[str, str] = {}
+        if self._last_edit_datetime is not None:
+            headers = self._date_validators
+
+        response: Response = await self._get("/api/schedule/date", DATE_TIMEOUT, headers)
+
+        if response.status_code == HTTPStatus.NOT_MODIFIED and self._last_edit_datetime is not None:
+            return self._last_edit_datetime, self._date_validators
+
+        response.raise_for_status()
+
+        validators: dict[str, str] = {}
+        if "etag" in response.headers:
+            validators["If-None-Match"] = response.headers["etag"]
+        if "last-modified" in response.headers:
+            validators["If-Modified-Since"] = response.headers["last-modified"]
+
         data: dict = response.json()
         schedule_date_str: str = data.get("scheduleDate", "")
         schedule_date: datetime = datetime.strptime(schedule_date_str, "%Y-%m-%d")
-        return schedule_date
 
-    async def check_changed(self) -> bool:
-        new_date: datetime = await self._get_schedule_date()
+        return schedule_date, validators
 
-        if self._last_edit_datetime is None:
-            self._last_edit_datetime = new_date
-            return False
+    @observed("api")
+    async def check_changed(self) -> Optional[datetime]:
+        """
+        Возвращает новую дату расписания, если она позже текущей. Текущая дата при этом не меняется:
+        на новую переходит advancing_schedule_date, когда рассылка начинается.
+        """
+
+        new_date, validators = await self._get_schedule_date()
+
+        if self._last_edit_datetime is not None and new_date > self._last_edit_datetime:
+            self._pending_validators = validators
+            return new_date
+
+        # Дата та же, но ресурс даты изменился: расписание этой даты переопубликовали
+        if (new_date == self._last_edit_datetime and self._date_validators
+                and validators and validators != self._date_validators):
+            self._republish_signalled = True
 
-        changed: bool = new_date > self._last_edit_datetime
         self._last_edit_datetime = new_date
-        return changed
\ No newline at end of file
+        self._date_validators = validators
+
+        if self._snapshot_due():
+            await self._prepare_snapshot()
+
+        return None
+
+    def pop_republish_signal(self) -> bool:
+        """Сообщал ли API с прошлого вызова, что расписание текущей даты переопубликовали"""
+
+        signalled: bool = self._republish_signalled
+        self._republish_signalled = False
+        return signalled
+
+    @asynccontextmanager
+    async def advancing_schedule_date(self, schedule_date: datetime) -> AsyncIterator[None]:
+        """
+        Переходит на новую дату на время рассылки. Если рассылка не удалась, возвращает прежнюю дату
+        и заголовки условного запроса, чтобы следующая проверка снова увидела изменение.
+        """
+
+        previous_date: Optional[datetime] = self._last_edit_datetime
+        previous_validators: dict[str, str] = self._date_validators
+
+        self._date_validators = self._pending_validators
+        try:
+            self.refresh_directory()
+            await self.use_schedule_date(schedule_date)
+            yield
+        except BaseException:
+            self._last_edit_datetime = previous_date
+            self._date_validators = previous_validators
+            raise
+
+    def restore(self, schedule_date: Optional[datetime], directory: Optional[Directory]) -> None:
+        """Восстанавливает состояние из сохранённого снимка, чтобы первая проверка после запуска не пропала"""
+
+        if self._last_edit_datetime is None:
+            self._last_edit_datetime = schedule_date
+
+        if self._directory is None and directory is not None:
+            self._directory = directory
+
+    async def use_schedule_date(self, schedule_date: datetime) -> None:
+        """Рабочий процесс рассылки не проверяет дату сам, а берёт её из задания бота"""
+
+        if schedule_date != self._last_edit_datetime:
+            self._last_edit_datetime = schedule_date
+            self._schedule_cache.clear()
+
+        if self._snapshot_due():
+            await self._prepare_snapshot()
+
+    @property
+    def directory(self) -> Optional[Directory]:
+        return self._directory
+
+    async def _prepare_snapshot(self) -> None:
+        if not self._snapshot_mode:
+            return
+
+        try:
+            await self.get_snapshot()
+        except Exception as e:
+            logger.error(f"Снимок расписания недоступен, запросы пойдут напрямую в API: {e!r}")
@@ -1,27 +1,131 @@
+import asyncio
+import signal
+from typing import Optional
+
 from telegram import Update
 from telegram.ext import Application, ApplicationBuilder
 
-from src.handlers.schedule_anounce import start_schedule_check
+from src.handlers.admin import PROFILER_KEY, profile_handler
+from src.handlers.schedule_anounce import BROADCAST_WORKERS_KEY, resume_broadcasts, start_schedule_check
 from src.handlers.start import start_handler
-from src.handlers.inline import inline_query_handler
+from src.handlers.inline import inline_query_handler, inline_schedule_button_handler
+from src.bot_metrics import register_bot_metrics
 from src.logger_config import logger
+from src.metrics import MetricsConfig, MetricsServer
+from src.outbox import Outbox
+from src.profiler import SamplingProfiler
+from src.schedule_poller import PollConfig
 from src.handlers.schedule_conversation import schedule_conversation_handler
 from src.handlers.schedule_subscription import schedule_subscription_handler
+from src.subscription_store import start_subscription_store
+from src.tracing import SLOW_UPDATE_SECONDS, UpdateTracer
+from src.update_processor import CONCURRENT_UPDATES, ChatOrderedUpdateProcessor
+from src.utils.message_sender import BOT_RESERVED_RATE, GLOBAL_RATE, MessageDispatcher
+from src.webhook import WebhookConfig, WebhookServer
+
 
 class AkttBot:
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str, concurrent_updates: int = CONCURRENT_UPDATES,
+                 poll_config: PollConfig = PollConfig(), metrics: Optional[MetricsConfig] = None,
+                 slow_update_seconds: float = SLOW_UPDATE_SECONDS, admin_ids: frozenset[int] = frozenset(),
+                 broadcast_workers: bool = False) -> None:
+        self._poll_config: PollConfig = poll_config
+        self._broadcast_workers: bool = broadcast_workers
+        self._metrics_server: Optional[MetricsServer] = MetricsServer(metrics) if metrics is not None else None
+        self._admin_ids: frozenset[int] = admin_ids
+        self._profiler = SamplingProfiler()
+        processor = ChatOrderedUpdateProcessor(concurrent_updates, UpdateTracer(slow_update_seconds))
+        # Рассылают рабочие процессы с тем же токеном, поэтому боту остаётся только его часть лимита
+        dispatcher = MessageDispatcher(BOT_RESERVED_RATE if broadcast_workers else GLOBAL_RATE)
         self._application: Application = (ApplicationBuilder().token(token)
-                                          .post_init(start_schedule_check)
+                                          .concurrent_updates(processor)
+                                          .rate_limiter(dispatcher)
+                                          .post_init(self._post_init)
+                                          .post_stop(self._post_stop)
                                           .build())
 
-    def start_bot(self) -> None:
+    async def _post_init(self, app: Application) -> None:
+        register_bot_metrics(app)
+        self._install_profile_signal()
+        if self._metrics_server is not None:
+            await self._metrics_server.start()
+
+        await start_subscription_store(app)
+        # Прерванные задания рабочих процессов рабочие же и подберут, иначе сообщения уйдут дважды
+        if not self._broadcast_workers:
+            app.create_task(resume_broadcasts(app))
+        await start_schedule_check(app, self._poll_config)
+
+    async def _post_stop(self, _: Application) -> None:
+        if self._metrics_server is not None:
+            await self._metrics_server.stop()
+
+        if self._profiler.running:
+            await self._profiler.stop()
+
+        Outbox().close()
+
+    def _install_profile_signal(self) -> None:
+        """SIGUSR1 запускает профилирование, повторный SIGUSR1 останавливает его и пишет профиль на диск"""
+
+        if not hasattr(signal, "SIGUSR1"):
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, lambda: self._application.create_task(self._profiler.toggle()))
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    def start_bot(self, webhook: Optional[WebhookConfig] = None) -> None:
         handlers: list = [
             start_handler(),
             inline_query_handler(),
+            inline_schedule_button_handler(),
             schedule_conversation_handler(),
             schedule_subscription_handler(),
         ]
 
+        if self._admin_ids:
+            handlers.append(profile_handler(self._admin_ids))
+        self._application.bot_data[PROFILER_KEY] = self._profiler
+        self._application.bot_data[BROADCAST_WORKERS_KEY] = self._broadcast_workers
+
         self._application.add_handlers(handlers)
-        self._application.run_polling(allowed_updates=Update.ALL_TYPES)
-        logger.info("Bot started.")
\ No newline at end of file
+
+        if webhook is None:
+            logger.info("Bot started.")
+            self._application.run_polling(allowed_updates=Update.ALL_TYPES)
+        else:
+            asyncio.run(self._run_webhook(webhook))
+
+    async def _run_webhook(self, config: WebhookConfig) -> None:
+        app: Application = self._application
+        server = WebhookServer(app, config)
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for stop_signal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(stop_signal, stop_event.set)
+            except NotImplementedError:
+                pass
+
+        async with app:
+            if app.post_init:
+                await app.post_init(app)
+
+            await app.start()
+            await server.start()
+            logger.info(f"Bot started in webhook mode on {config.listen}:{server.http_server.port}{config.path}")
+
+            try:
+                await stop_event.wait()
+            finally:
+                await server.stop()
+                await app.stop()
+                if app.post_stop:
+                    await app.post_stop(app)
+
+        if app.post_shutdown:
+            await app.post_shutdown(app)
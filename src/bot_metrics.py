@@ -0,0 +1,77 @@
+from telegram.ext import Application
+
+from src.api_communicator import ApiClientStats, ApiCommunicator
+from src.handlers.inline import answer_cache_stats
+from src.metrics import REGISTRY, CallbackMetric, Sample
+from src.outbox import Outbox
+from src.update_processor import ChatOrderedUpdateProcessor
+from src.utils.cache import CacheStats
+from src.utils.circuit_breaker import CircuitState
+from src.utils.message_sender import DispatcherStats, MessageDispatcher
+
+
+def _cache_stats() -> dict[str, CacheStats]:
+    return {
+        "schedule": ApiCommunicator().schedule_cache_stats,
+        "inline_answers": answer_cache_stats(),
+    }
+
+
+def _cache_requests() -> list[Sample]:
+    samples: list[Sample] = []
+    for cache, stats in _cache_stats().items():
+        samples += [((cache, "hit"), stats.hits), ((cache, "miss"), stats.misses)]
+    return samples
+
+
+def _messages() -> list[Sample]:
+    stats: DispatcherStats = MessageDispatcher().stats
+    return [(("sent",), stats.sent), (("failed",), stats.failed), (("forbidden",), stats.forbidden)]
+
+
+def _upstream() -> list[Sample]:
+    stats: ApiClientStats = ApiCommunicator().client_stats
+    return [(("requests",), stats.requests), (("retries",), stats.retries), (("failures",), stats.failures),
+            (("rejected",), stats.rejected), (("served_stale",), stats.served_stale)]
+
+
+def register_bot_metrics(app: Application) -> None:
+    """Добавляет в реестр метрики, которые считываются из уже собираемой статистики бота"""
+
+    metrics: list[CallbackMetric] = [
+        CallbackMetric("aktt_cache_hit_ratio", "Доля попаданий в кэш",
+                       lambda: [((cache,), stats.hit_ratio) for cache, stats in _cache_stats().items()], ("cache",)),
+        CallbackMetric("aktt_cache_requests_total", "Обращения к кэшу", _cache_requests, ("cache", "result"),
+                       kind="counter"),
+        CallbackMetric("aktt_cache_entries", "Записей в кэше",
+                       lambda: [((cache,), stats.entries) for cache, stats in _cache_stats().items()], ("cache",)),
+        CallbackMetric("aktt_messages_total", "Исходящие сообщения по результату", _messages, ("result",),
+                       kind="counter"),
+        CallbackMetric("aktt_message_retries_total", "Повторы отправки по причине",
+                       lambda: [(("network",), MessageDispatcher().stats.retried),
+                                (("retry_after",), MessageDispatcher().stats.retry_after)], ("reason",),
+                       kind="counter"),
+        CallbackMetric("aktt_messages_per_second", "Скорость отправки за последнюю минуту",
+                       lambda: [((), MessageDispatcher().stats.messages_per_second)]),
+        CallbackMetric("aktt_send_queue_depth", "Запросы к Telegram, ждущие ограничителя",
+                       lambda: [((), MessageDispatcher().stats.waiting)]),
+        CallbackMetric("aktt_update_queue_depth", "Обновления в очереди приложения",
+                       lambda: [((), app.update_queue.qsize())]),
+        CallbackMetric("aktt_upstream_calls_total", "Статистика клиента API расписания", _upstream, ("result",),
+                       kind="counter"),
+        CallbackMetric("aktt_upstream_in_flight", "Запросы к API расписания в работе",
+                       lambda: [((), ApiCommunicator().client_stats.in_flight)]),
+        CallbackMetric("aktt_upstream_circuit_state", "Состояние автомата API расписания",
+                       lambda: [((state.value,), int(ApiCommunicator().client_stats.breaker_state == state))
+                                for state in CircuitState], ("state",)),
+        CallbackMetric("aktt_broadcast_jobs_open", "Невыполненные задания рассылки в очереди рабочих процессов",
+                       lambda: [((), Outbox().open_jobs())]),
+    ]
+
+    if isinstance(app.update_processor, ChatOrderedUpdateProcessor):
+        processor: ChatOrderedUpdateProcessor = app.update_processor
+        metrics.append(CallbackMetric("aktt_active_chats", "Чаты с обновлениями в обработке",
+                                      lambda: [((), processor.active_chats)]))
+
+    for metric in metrics:
+        REGISTRY.register(metric)
@@ -1,20 +1,29 @@
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 from enum import StrEnum
 
 from dotenv import load_dotenv
-from postgrest import CountMethod
+from postgrest import APIError, CountMethod
 
-from src.utils.schedule import SubGroup
+from src.metrics import observe_call, observed
+from src.utils.limits import MAX_SUBSCRIPTION_COUNT
+from src.utils.schedule import SubGroup, ScheduleKind, ScheduleTarget
 from dataclasses import dataclass
 
 from supabase import AsyncClient
 
-MAX_SUBSCRIPTION_COUNT = 5
+SUBSCRIPTIONS_PAGE_SIZE = 500
+SUBSCRIPTION_COLUMNS: tuple[str, ...] = ("id", "chat_id", "group_name", "teacher_name", "sub_group")
+
+UNIQUE_VIOLATION = "23505"
+SUBSCRIPTION_LIMIT = "subscription_limit"
 
 class Tables(StrEnum):
     SCHEDULE_SUBSCRIPTIONS = "schedule_subscriptions"
 
+class Functions(StrEnum):
+    CREATE_SCHEDULE_SUBSCRIPTION = "create_schedule_subscription"
+
 @dataclass(frozen=True, order=True)
 class ScheduleSubscription:
     id: int
@@ -23,6 +32,13 @@ class ScheduleSubscription:
     teacher_name: Optional[str]
     sub_group: SubGroup
 
+    @property
+    def target(self) -> ScheduleTarget:
+        if self.group_name:
+            return ScheduleTarget(ScheduleKind.STUDENT, self.group_name)
+
+        return ScheduleTarget(ScheduleKind.TEACHER, self.teacher_name)
+
 async def _build_schedule_subscription_obj(subscription_info: dict) -> ScheduleSubscription:
     subscription_id: int = subscription_info.get("id")
     chat_id: int = subscription_info.get("chat_id")
@@ -63,40 +79,39 @@ class Database:
             cls._supabase = AsyncClient(url, key)
         return cls.instance
 
-    async def make_subscription(self, chat_id: int, group_name: Optional[str] = None, teacher_name: Optional[str] = None, sub_group: SubGroup = SubGroup.BOTH):
-
-        subscriptions, count = await self.get_schedule_subscriptions(chat_id)
+    @observed("database")
+    async def make_subscription(self, chat_id: int, group_name: Optional[str] = None, teacher_name: Optional[str] = None,
+                                sub_group: SubGroup = SubGroup.BOTH) -> Optional[ScheduleSubscription]:
+        """
+        Создаёт подписку одним вызовом функции в базе, которая сама проверяет уникальность и лимит.
+        Возвращает созданную подписку.
+        """
 
         if group_name is None and teacher_name is None:
             raise AttributeError("Группа или учитель обязательно должны быть указаны!")
 
-        if count >= MAX_SUBSCRIPTION_COUNT:
-            raise SubscriptionLimitError("Нельзя добавить больше 5 подписок!")
-
-        # for subscription in subscriptions:
-        #     if subscription.chat_id == chat_id:
-        #         if subscription.group_name == group_name or subscription.teacher_name == teacher_name:
-        #             if subscription.sub_group == sub_group:
-        #                 raise AlreadyExistingSubscriptionError("Подписка на эту группу или преподавателя уже есть!")
-        for s in subscriptions:
-            if s.chat_id != chat_id:
-                continue
-            if group_name is not None and s.group_name == group_name and s.sub_group == sub_group:
-                raise AlreadyExistingSubscriptionError("Подписка на эту группу уже есть!")
-            if teacher_name is not None and s.teacher_name == teacher_name:
-                raise AlreadyExistingSubscriptionError("Подписка на этого преподавателя уже есть!")
-
-        json: dict = {
-            "chat_id": chat_id,
-            "group_name": group_name,
-            "teacher_name": teacher_name,
-            "sub_group": sub_group
+        params: dict = {
+            "p_chat_id": chat_id,
+            "p_group_name": group_name,
+            "p_teacher_name": teacher_name,
+            "p_sub_group": sub_group,
+            "p_max_count": MAX_SUBSCRIPTION_COUNT
         }
 
-        response = await self._supabase.table(Tables.SCHEDULE_SUBSCRIPTIONS).insert(json=json).execute()
+        try:
+            response = await self._supabase.rpc(Functions.CREATE_SCHEDULE_SUBSCRIPTION, params).execute()
+        except APIError as e:
+            if e.code == UNIQUE_VIOLATION:
+                if teacher_name is not None:
+                    raise AlreadyExistingSubscriptionError("Подписка на этого преподавателя уже есть!") from e
+                raise AlreadyExistingSubscriptionError("Подписка на эту группу уже есть!") from e
+            if e.message == SUBSCRIPTION_LIMIT:
+                raise SubscriptionLimitError(f"Нельзя добавить больше {MAX_SUBSCRIPTION_COUNT} подписок!") from e
+            raise
 
-        return True if response.data else False
+        return await _build_schedule_subscription_obj(response.data[0]) if response.data else None
 
+    @observed("database")
     async def get_schedule_subscriptions(self, chat_id: int) -> tuple[list[ScheduleSubscription], int]:
         response = await (self._supabase.table(Tables.SCHEDULE_SUBSCRIPTIONS)
                           .select("*", count=CountMethod.exact)
@@ -109,14 +124,96 @@ class Database:
 
         return [await _build_schedule_subscription_obj(info) for info in data], count
 
-    async def get_all_schedule_subscriptions(self) -> list[ScheduleSubscription]:
-        response = await self._supabase.table(Tables.SCHEDULE_SUBSCRIPTIONS).select("*").execute()
-
-        data = response.data
+    async def iter_schedule_subscription_pages(self, page_size: int = SUBSCRIPTIONS_PAGE_SIZE
+                                               ) -> AsyncIterator[list[ScheduleSubscription]]:
+        """
+        Отдаёт все подписки страницами по возрастанию id. Следующая страница запрашивается
+        после последнего полученного id, поэтому ограничение PostgREST на размер ответа не теряет строки.
+        """
+
+        last_id: Optional[int] = None
+
+        while True:
+            query = (self._supabase.table(Tables.SCHEDULE_SUBSCRIPTIONS)
+                     .select(*SUBSCRIPTION_COLUMNS)
+                     .order("id")
+                     .limit(page_size))
+
+            if last_id is not None:
+                query = query.gt("id", last_id)
+
+            with observe_call("database", "subscription_page"):
+                response = await query.execute()
+            data: list = response.data
+
+            if not data:
+                return
+
+            last_id = data[-1]["id"]
+            yield [await _build_schedule_subscription_obj(info) for info in data]
+
+    async def iter_chat_subscription_pages(self, page_size: int = SUBSCRIPTIONS_PAGE_SIZE
+                                           ) -> AsyncIterator[list[ScheduleSubscription]]:
+        """
+        Отдаёт подписки страницами по возрастанию chat_id так, что все подписки чата попадают в одну страницу.
+        Страницы запрашиваются после последней полученной пары (chat_id, id), а подписки последнего чата
+        страницы, которые могли не поместиться в неё, переносятся в следующую без повторного запроса.
+        """
+
+        last_key: Optional[tuple[int, int]] = None
+        carried: list[dict] = []
+
+        while True:
+            query = (self._supabase.table(Tables.SCHEDULE_SUBSCRIPTIONS)
+                     .select(*SUBSCRIPTION_COLUMNS)
+                     .order("chat_id")
+                     .order("id")
+                     .limit(page_size))
+
+            if last_key is not None:
+                chat_id, subscription_id = last_key
+                query = query.or_(f"chat_id.gt.{chat_id},and(chat_id.eq.{chat_id},id.gt.{subscription_id})")
+
+            with observe_call("database", "chat_subscription_page"):
+                response = await query.execute()
+            data: list = response.data
+
+            if not data:
+                if carried:
+                    yield [await _build_schedule_subscription_obj(info) for info in carried]
+                return
+
+            last_key = data[-1]["chat_id"], data[-1]["id"]
+            rows: list[dict] = carried + data
+            tail_chat_id: int = rows[-1]["chat_id"]
+            carried = [info for info in rows if info["chat_id"] == tail_chat_id]
+
+            complete: list[dict] = [info for info in rows if info["chat_id"] != tail_chat_id]
+            if complete:
+                yield [await _build_schedule_subscription_obj(info) for info in complete]
+
+    async def stream_schedule_subscriptions(self, page_size: int = SUBSCRIPTIONS_PAGE_SIZE
+                                            ) -> AsyncIterator[ScheduleSubscription]:
+        async for page in self.iter_schedule_subscription_pages(page_size):
+            for subscription in page:
+                yield subscription
 
-        return [await _build_schedule_subscription_obj(info) for info in data]
+    async def get_all_schedule_subscriptions(self) -> list[ScheduleSubscription]:
+        return [subscription async for subscription in self.stream_schedule_subscriptions()]
 
+    @observed("database")
     async def remove_subscription(self, subscription_id: int) -> bool:
         response = await self._supabase.table(Tables.SCHEDULE_SUBSCRIPTIONS).delete().eq("id", subscription_id).execute()
 
-        return True if response.data else False
\ No newline at end of file
+        return True if response.data else False
+
+    @observed("database")
+    async def move_chat(self, chat_id: int, new_chat_id: int) -> list[ScheduleSubscription]:
+        """Переносит подписки чата на новый id, когда группа становится супергруппой"""
+
+        response = await (self._supabase.table(Tables.SCHEDULE_SUBSCRIPTIONS)
+                          .update({"chat_id": new_chat_id})
+                          .eq("chat_id", chat_id)
+                          .execute())
+
+        return [await _build_schedule_subscription_obj(info) for info in response.data]
@@ -0,0 +1,28 @@
+from telegram import Update
+from telegram.ext import CommandHandler, ContextTypes, filters
+
+from src.profiler import SamplingProfiler
+
+DEFAULT_PROFILE_SECONDS = 30
+PROFILER_KEY = "profiler"
+
+
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    profiler: SamplingProfiler = context.bot_data[PROFILER_KEY]
+
+    if profiler.running:
+        await update.message.reply_text("Профилирование уже идёт")
+        return
+
+    seconds: int = DEFAULT_PROFILE_SECONDS
+    if context.args and context.args[0].isdigit():
+        seconds = int(context.args[0])
+
+    await update.message.reply_text(f"Снимаю профиль событийного цикла {seconds} с.")
+    path: str = await profiler.profile(seconds)
+    await update.message.reply_text(f"Профиль записан в {path}")
+
+
+def profile_handler(admin_ids: frozenset[int]) -> CommandHandler:
+    # Профиль идёт долго, поэтому команда не должна держать очередь обновлений чата
+    return CommandHandler('profile', profile, filters=filters.User(user_id=admin_ids), block=False)
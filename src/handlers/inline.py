@@ -1,69 +1,325 @@
-from uuid import uuid4
+import asyncio
+import hashlib
+import re
+from typing import Optional
 
-from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
-from telegram.ext import ContextTypes, InlineQueryHandler
+from telegram import (CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle,
+                      InputTextMessageContent, Update)
+from telegram.error import BadRequest
+from telegram.ext import CallbackQueryHandler, ContextTypes, InlineQueryHandler
 
 from src.api_communicator import ApiCommunicator
-from src.utils.schedule import ScheduleGroup, SubGroup
+from src.handlers.schedule_anounce import seconds_until_next_check
+from src.logger_config import logger
+from src.metrics import observed_handler
+from src.utils.cache import CacheStats, LRUCache
+from src.utils.digest import MESSAGE_LIMIT, build_digest
+from src.utils.directory import Directory, normalize_name
+from src.utils.schedule import ScheduleGroup, SubGroup, ScheduleKind, ScheduleTarget
 
+PAGE_SIZE = 20
+SEARCH_LIMIT = 200
+DEFAULT_CACHE_TIME = 300
+PARTIAL_CACHE_TIME = 30
+ANSWER_CACHE_ENTRIES = 2048
+PARTIAL_FETCH_LIMIT = 5
+PARTIAL_FETCH_TIMEOUT = 2
+SCHEDULE_CALLBACK = "schedule"
+MAX_CALLBACK_DATA = 64
 
-async def inline_query(update: Update, _: ContextTypes.DEFAULT_TYPE):
+InlineAnswer = tuple[list[InlineQueryResultArticle], Optional[str]]
+
+# «каб 204», «кабинет 204а», «каб. 12»
+_ROOM_QUERY = re.compile(r"^каб(?:инет)?\.?\s*(\S+)$", re.IGNORECASE)
+
+_answer_cache: LRUCache[tuple, InlineAnswer] = LRUCache(ANSWER_CACHE_ENTRIES, ANSWER_CACHE_ENTRIES)
+
+TRUNCATED_NOTE = "\n…расписание не поместилось в сообщение, полностью его покажет бот в личных сообщениях"
+
+
+def _message_text(schedule: ScheduleGroup) -> str:
+    """Текст расписания не длиннее лимита сообщения Telegram; длинное обрезается между занятиями"""
+
+    text: str = schedule.pretty_schedule
+    if len(text) <= MESSAGE_LIMIT:
+        return text
+
+    return build_digest([schedule], MESSAGE_LIMIT - len(TRUNCATED_NOTE))[0] + TRUNCATED_NOTE
+
+
+def _result_id(schedule: ScheduleGroup, target: ScheduleTarget, sub_group: SubGroup) -> str:
+    """Одинаковый id для одного и того же расписания, чтобы Telegram мог кэшировать ответы у себя"""
+
+    key: str = f"{schedule.schedule_date}|{target.kind}|{target.name}|{sub_group}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def _article(schedule: ScheduleGroup, target: ScheduleTarget, sub_group: SubGroup, title: str,
+             description: Optional[str] = None) -> InlineQueryResultArticle:
+    return InlineQueryResultArticle(
+        id=_result_id(schedule, target, sub_group),
+        title=title,
+        description=description,
+        input_message_content=InputTextMessageContent(_message_text(schedule.get_sub_group(sub_group)))
+    )
+
+
+def _target_title(target: ScheduleTarget) -> str:
+    if target.kind == ScheduleKind.TEACHER:
+        return f"Расписание для {target.name}"
+    return f"Группа {target.name.upper()}"
+
+
+def _target_article(target: ScheduleTarget, schedule: ScheduleGroup) -> InlineQueryResultArticle:
+    if target.kind == ScheduleKind.TEACHER:
+        return _article(schedule, target, SubGroup.BOTH, _target_title(target))
+
+    return _article(schedule, target, SubGroup.BOTH, _target_title(target), "Обе подгруппы")
+
+
+def _schedule_button(target: ScheduleTarget) -> InlineKeyboardButton:
+    """Кнопка, по которой расписание загружается уже после выбора результата"""
+
+    callback_data: str = f"{SCHEDULE_CALLBACK}:{target.kind}:{target.name}"
+    if len(callback_data.encode()) <= MAX_CALLBACK_DATA:
+        return InlineKeyboardButton("Показать расписание", callback_data=callback_data)
+
+    # Длинное имя не помещается в callback_data: кнопка повторяет запрос точным именем
+    return InlineKeyboardButton("Показать расписание", switch_inline_query_current_chat=target.name)
+
+
+def _pending_article(target: ScheduleTarget) -> InlineQueryResultArticle:
+    """Лёгкий результат для цели, расписание которой не успело загрузиться к ответу"""
+
+    key: str = f"pending|{target.kind}|{target.name}"
+    return InlineQueryResultArticle(
+        id=hashlib.blake2b(key.encode(), digest_size=16).hexdigest(),
+        title=_target_title(target),
+        description="Расписание загрузится после выбора",
+        input_message_content=InputTextMessageContent(_target_title(target)),
+        reply_markup=InlineKeyboardMarkup([[_schedule_button(target)]])
+    )
+
+
+def _room_article(schedule: ScheduleGroup) -> InlineQueryResultArticle:
+    key: str = f"{schedule.schedule_date}|room|{schedule.room_number}"
+    return InlineQueryResultArticle(
+        id=hashlib.blake2b(key.encode(), digest_size=16).hexdigest(),
+        title=f"Кабинет {schedule.room_number}",
+        description=f"Занятий: {len(schedule.schedule_items)}",
+        input_message_content=InputTextMessageContent(_message_text(schedule))
+    )
+
+
+def _hint_article(query: str) -> InlineQueryResultArticle:
+    """Статья вместо пустого ответа, когда расписание не удалось загрузить"""
+
+    return InlineQueryResultArticle(
+        id=hashlib.blake2b(f"hint|{query}".encode(), digest_size=16).hexdigest(),
+        title="Не удалось загрузить расписание",
+        description="Уточните запрос: полное название группы или ФИО преподавателя",
+        input_message_content=InputTextMessageContent(
+            f"Не удалось загрузить расписание по запросу «{query}», попробуйте уточнить его"
+        )
+    )
+
+
+def _rooms_disabled_article(query: str) -> InlineQueryResultArticle:
+    return InlineQueryResultArticle(
+        id=hashlib.blake2b(f"rooms-disabled|{query}".encode(), digest_size=16).hexdigest(),
+        title="Расписание кабинетов недоступно",
+        description="Ищите по группе или ФИО преподавателя",
+        input_message_content=InputTextMessageContent("Расписание кабинетов в этом боте отключено")
+    )
+
+
+def answer_cache_stats() -> CacheStats:
+    return _answer_cache.stats
+
+
+def _log_late_failure(target: ScheduleTarget, task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Не удалось загрузить расписание для {target.name}: {task.exception()!r}")
+
+
+async def _load_ranked(api: ApiCommunicator, targets: list[ScheduleTarget]) -> dict[ScheduleTarget, ScheduleGroup]:
+    """
+    Загружает расписания первых PARTIAL_FETCH_LIMIT целей через кэш и общую загрузку одной цели.
+    Ответ ждёт их не дольше PARTIAL_FETCH_TIMEOUT секунд: опоздавшие загрузки продолжаются
+    и попадут в кэш к следующему запросу.
+    """
+
+    tasks: dict[asyncio.Task, ScheduleTarget] = {
+        asyncio.ensure_future(api.get_schedule(target)): target for target in targets[:PARTIAL_FETCH_LIMIT]
+    }
+    if not tasks:
+        return {}
+
+    done, pending = await asyncio.wait(tasks, timeout=PARTIAL_FETCH_TIMEOUT)
+    for task in pending:
+        task.add_done_callback(lambda late, target=tasks[task]: _log_late_failure(target, late))
+
+    schedules: dict[ScheduleTarget, ScheduleGroup] = {}
+    for task in done:
+        if task.exception() is not None:
+            _log_late_failure(tasks[task], task)
+            continue
+        schedules[tasks[task]] = task.result()
+
+    return schedules
+
+
+async def _build_answer(api: ApiCommunicator, query: str, offset: int) -> tuple[Optional[InlineAnswer], bool]:
+    """
+    Собирает ответ на запрос; второй элемент показывает, можно ли положить ответ в кэш:
+    нельзя, если в нём не хватает целей или расписание отдано из запаса при недоступном API.
+    """
+
+    room_match: Optional[re.Match] = _ROOM_QUERY.match(query.strip())
+    if room_match:
+        try:
+            schedule: Optional[ScheduleGroup] = await api.get_room_schedule(room_match.group(1))
+        except Exception as e:
+            logger.error(f"Не удалось собрать расписание кабинета {room_match.group(1)}: {e!r}")
+            return ([_hint_article(query)], None), False
+
+        if schedule is None:
+            return ([_rooms_disabled_article(query)], None), True
+
+        # Кабинет собирается из снимка: без части групп в нём могут не хватать занятий
+        return ([_room_article(schedule)], None), api.snapshot_complete
+
+    directory: Directory = await api.get_directory()
+
+    group_name: Optional[str] = directory.find_group(query)
+    teacher_name: Optional[str] = directory.find_teacher(query)
+
+    if group_name:
+        target = ScheduleTarget(ScheduleKind.STUDENT, group_name)
+        schedule: ScheduleGroup = await api.get_student_schedule(group_name)
+
+        return ([
+            _article(schedule, target, SubGroup.BOTH, "Обе подгруппы"),
+            _article(schedule, target, SubGroup.FIRST, "Первая подгруппа"),
+            _article(schedule, target, SubGroup.SECOND, "Вторая подгруппа"),
+        ], None), not schedule.stale
+
+    if teacher_name:
+        target = ScheduleTarget(ScheduleKind.TEACHER, teacher_name)
+        schedule: ScheduleGroup = await api.get_teacher_schedule(teacher_name)
+
+        return ([_article(schedule, target, SubGroup.BOTH, f"Расписание для {teacher_name}")], None), not schedule.stale
+
+    targets: list[ScheduleTarget] = await api.search(query, SEARCH_LIMIT)
+    page: list[ScheduleTarget] = targets[offset:offset + PAGE_SIZE]
+
+    if not page:
+        return None, True
+
+    # Цели из снимка или кэша показываются сразу, первые по рангу из остальных догружаются.
+    # Не успевшие к ответу цели показываются лёгким результатом, расписание которого загрузится по кнопке
+    schedules: dict[ScheduleTarget, ScheduleGroup] = {}
+    for target in page:
+        schedule: Optional[ScheduleGroup] = api.loaded_schedule(target)
+        if schedule is not None:
+            schedules[target] = schedule
+
+    schedules.update(await _load_ranked(api, [target for target in page if target not in schedules]))
+
+    results: list[InlineQueryResultArticle] = [
+        _target_article(target, schedules[target]) if target in schedules else _pending_article(target)
+        for target in page
+    ]
+    complete: bool = len(schedules) == len(page) and not any(schedule.stale for schedule in schedules.values())
+
+    next_offset: Optional[str] = str(offset + PAGE_SIZE) if offset + PAGE_SIZE < len(targets) else None
+    return (results, next_offset), complete
+
+
+@observed_handler
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Позволяет вызвать бота упоминанием и получить группу с уточнением подгруппы"""
 
     api = ApiCommunicator()
     query = update.inline_query.query
 
-    groups: list[str] = await api.get_groups_list()
-    teachers: list[str] = await api.get_teachers_list()
+    if not query:
+        return
 
-    in_group: bool = query.lower() in groups
-    in_teachers: bool = query in teachers
+    try:
+        offset: int = int(update.inline_query.offset or 0)
+    except ValueError:
+        offset: int = 0
 
-    if not query:
+    key: tuple = (api.schedule_date, api.schedule_revision, normalize_name(query), offset)
+    answer: Optional[InlineAnswer] = _answer_cache.get(key)
+    cacheable: bool = True
+
+    if answer is None:
+        answer, cacheable = await _build_answer(api, query, offset)
+
+        if answer is None:
+            return
+
+        if cacheable:
+            _answer_cache.put(key, answer)
+
+    results, next_offset = answer
+    cache_time: Optional[int] = seconds_until_next_check(context.job_queue)
+    if cache_time is None:
+        cache_time = DEFAULT_CACHE_TIME
+    if not cacheable:
+        cache_time = min(cache_time, PARTIAL_CACHE_TIME)
+
+    await update.inline_query.answer(
+        results,
+        cache_time=cache_time,
+        next_offset=next_offset
+    )
+
+@observed_handler
+async def show_schedule(update: Update, _: ContextTypes.DEFAULT_TYPE):
+    """Загружает расписание цели, выбранной из лёгкого инлайн-результата, и подставляет его в сообщение"""
+
+    api = ApiCommunicator()
+    query: CallbackQuery = update.callback_query
+
+    # Данные кнопки приходят от клиента: подделанные не должны доходить до API
+    try:
+        _, kind, name = query.data.split(":", 2)
+        target = ScheduleTarget(ScheduleKind(kind), name)
+    except ValueError:
+        logger.warning(f"Неправильные данные кнопки расписания: {query.data!r}")
+        await query.answer("Кнопка устарела, повторите запрос", show_alert=True)
         return
 
-    if in_group:
-        schedule: ScheduleGroup = await api.get_student_schedule(query)
-
-        results = [
-            InlineQueryResultArticle(
-                id=str(uuid4()),
-                title="Обе подгруппы",
-                input_message_content=InputTextMessageContent(
-                    schedule.pretty_schedule
-                )
-            ),
-            InlineQueryResultArticle(
-                id=str(uuid4()),
-                title="Первая подгруппа",
-                input_message_content=InputTextMessageContent(
-                    schedule.get_sub_group(SubGroup.FIRST).pretty_schedule
-                )
-            ),
-            InlineQueryResultArticle(
-                id=str(uuid4()),
-                title="Вторая подгруппа",
-                input_message_content=InputTextMessageContent
-                (schedule.get_sub_group(SubGroup.SECOND).pretty_schedule
-                 )
-            )
-        ]
-
-        await update.inline_query.answer(results)
-
-    elif in_teachers:
-        schedule: ScheduleGroup = await api.get_teacher_schedule(query)
-        results = [
-            InlineQueryResultArticle(
-                id=str(uuid4()),
-                title=f"Расписание для {query}",
-                input_message_content=InputTextMessageContent(
-                    schedule.pretty_schedule
-                )
-            )
-        ]
-
-        await update.inline_query.answer(results)
+    try:
+        directory: Directory = await api.get_directory()
+        known: Optional[str] = (
+            directory.find_teacher(name) if target.kind == ScheduleKind.TEACHER else directory.find_group(name)
+        )
+        if known != name:
+            await query.answer("Расписание не найдено, повторите запрос", show_alert=True)
+            return
+
+        schedule: ScheduleGroup = await api.get_schedule(target)
+    except Exception as e:
+        logger.error(f"Не удалось загрузить расписание для {name} по кнопке: {e!r}")
+        await query.answer("Не удалось загрузить расписание, попробуйте позже", show_alert=True)
+        return
+
+    await query.answer()
+    try:
+        await query.edit_message_text(_message_text(schedule.get_sub_group(SubGroup.BOTH)))
+    except BadRequest as e:
+        # Повторное нажатие не меняет сообщение, а старое инлайн-сообщение Telegram может уже не дать изменить
+        if "not modified" not in e.message.lower():
+            logger.error(f"Не удалось показать расписание для {name} по кнопке: {e!r}")
+
 
 def inline_query_handler() -> InlineQueryHandler:
-    return InlineQueryHandler(inline_query)
\ No newline at end of file
+    return InlineQueryHandler(inline_query)
+
+
+def inline_schedule_button_handler() -> CallbackQueryHandler:
+    return CallbackQueryHandler(show_schedule, pattern=rf"^{SCHEDULE_CALLBACK}:")
@@ -1,39 +1,668 @@
-from telegram.ext import Application, ContextTypes
+import asyncio
+import random
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional
 
-from src.api_communicator import ApiCommunicator
+from telegram import Bot
+from telegram.ext import Application, ContextTypes, JobQueue
+
+from src.api_communicator import ApiCommunicator, FETCH_CONCURRENCY
 from src.database import Database, ScheduleSubscription
-from src.utils.schedule import ScheduleGroup
+from src.logger_config import logger
+from src.metrics import observed_handler
+from src.outbox import BroadcastJob, Delivery, DeliveryKey, DeliveryStatus, Outbox, make_delivery
+from src.schedule_poller import PollConfig, PollScheduler
+from src.state_snapshot import StateSnapshot
+from src.subscription_store import SubscriptionStore
+from src.utils.digest import build_digest
+from src.utils.message_sender import MessageDispatcher, SendResult, send_message
+from src.utils.schedule import (ScheduleGroup, ScheduleKind, ScheduleTarget, SubGroup, schedule_fingerprint,
+                                unsent_fingerprint)
+
+SEND_CONCURRENCY = 64
+PREFETCH_PAGES = 2
+SUBMIT_BATCH_PAGES = 20
+SCHEDULE_CHECK_JOB = "schedule_check"
+FIRST_CHECK_DELAY = 10
+BROADCAST_WORKERS_KEY = "broadcast_workers"
+STALLED_JOBS_WARNING = 10 * 60
+SCHEDULE_DATE_FORMAT = "%Y-%m-%d"
+
+
+class _ScheduleFetcher:
+    """
+    Загружает расписание каждой цели не больше одного раза за рассылку
+    и сравнивает его отпечаток с последним разосланным, который возвращает previous.
+    При проверке переопубликования (republish) цель без прошлого отпечатка не рассылается,
+    её отпечаток только запоминается. С fresh расписания загружаются из API мимо кэша.
+    """
+
+    def __init__(self, api: ApiCommunicator, previous: Callable[[ScheduleTarget], Optional[str]],
+                 concurrency: int = FETCH_CONCURRENCY, republish: bool = False, fresh: bool = False) -> None:
+        self._api: ApiCommunicator = api
+        self._previous: Callable[[ScheduleTarget], Optional[str]] = previous
+        self._republish: bool = republish
+        self._load: Callable[[ScheduleTarget], Awaitable[ScheduleGroup]] = (
+            api.get_fresh_schedule if fresh else api.get_schedule
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: dict[ScheduleTarget, asyncio.Task] = {}
+        self._fingerprints: dict[ScheduleTarget, str] = {}
+        self._unsent: dict[ScheduleTarget, str] = {}
+
+    def fetch(self, target: ScheduleTarget) -> asyncio.Task:
+        task: Optional[asyncio.Task] = self._tasks.get(target)
+
+        if task is None:
+            task = asyncio.create_task(self._fetch(target))
+            self._tasks[target] = task
+
+        return task
+
+    async def _fetch(self, target: ScheduleTarget) -> Optional[ScheduleGroup]:
+        async with self._semaphore:
+            try:
+                schedule: ScheduleGroup = await self._load(target)
+
+                # Запасное расписание могло остаться от прошлой даты: не рассылаем его и не запоминаем
+                if schedule.stale:
+                    logger.warning(f"Расписание для {target.name} отдано из запаса, в рассылку не попадёт")
+                    self._mark_unsent(target)
+                    return None
+
+                fingerprint: str = schedule_fingerprint(schedule)
+            except Exception as e:
+                logger.error(f"Не удалось получить расписание для {target.name}: {e!r}")
+                self._mark_unsent(target)
+                return None
+
+        self._fingerprints[target] = fingerprint
+        return schedule
+
+    def _mark_unsent(self, target: ScheduleTarget) -> None:
+        """
+        Цель новой даты, которую не удалось разослать, получает отпечаток этой даты без хэша:
+        проверка переопубликования перепроверит её и разошлёт. При самой проверке прошлый отпечаток не трогается.
+        """
+
+        if not self._republish and self._api.schedule_date is not None:
+            self._unsent[target] = unsent_fingerprint(self._api.schedule_date.strftime(SCHEDULE_DATE_FORMAT))
+
+    def is_changed(self, target: ScheduleTarget) -> bool:
+        """Отличается ли загруженное расписание цели от последнего разосланного"""
+
+        previous: Optional[str] = self._previous(target)
+        if previous is None and self._republish:
+            return False
+
+        return self._fingerprints.get(target) != previous
+
+    @property
+    def changed_count(self) -> int:
+        return sum(self.is_changed(target) for target in self._fingerprints)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def fingerprints(self) -> dict[ScheduleTarget, str]:
+        return {**self._unsent, **self._fingerprints}
+
+
+async def _prefetched(pages: AsyncIterator[list[ScheduleSubscription]],
+                      depth: int = PREFETCH_PAGES) -> AsyncIterator[list[ScheduleSubscription]]:
+    """Подгружает следующие страницы подписок, пока обрабатывается текущая"""
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+
+    async def produce() -> None:
+        try:
+            async for page in pages:
+                await queue.put(page)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(None)
+
+    producer: asyncio.Task = asyncio.create_task(produce())
+    try:
+        while (page := await queue.get()) is not None:
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        producer.cancel()
+
+
+async def _update_chats(forbidden_chats: Optional[set[int]] = None,
+                       migrated_chats: Optional[dict[int, int]] = None) -> None:
+    """Удаляет подписки чатов, заблокировавших бота, и переносит подписки групп, ставших супергруппами"""
+
+    dispatcher = MessageDispatcher()
+    if forbidden_chats is None:
+        forbidden_chats = dispatcher.pop_forbidden_chats()
+    if migrated_chats is None:
+        migrated_chats = dispatcher.pop_migrated_chats()
+
+    store = SubscriptionStore()
+    for chat_id in forbidden_chats:
+        await store.remove_chat(chat_id)
+    for chat_id, new_chat_id in migrated_chats.items():
+        await store.move_chat(chat_id, new_chat_id)
+
+    if forbidden_chats:
+        logger.info(f"Удалены подписки {len(forbidden_chats)} чатов, заблокировавших бота")
+    if migrated_chats:
+        logger.info(f"Перенесены подписки {len(migrated_chats)} групп, ставших супергруппами")
+
+
+async def _deliver_all(bot: Bot, broadcast_id: str, deliveries: list[Delivery],
+                       semaphore: asyncio.Semaphore) -> int:
+    """
+    Отправляет записанные в журнал сообщения и отмечает результат каждого; возвращает число доставленных.
+    Чаты обслуживаются параллельно, а части дайджеста одного чата — по порядку. Сообщение, которое
+    не удалось отправить из-за сети или лимитов, остаётся недоставленным вместе с остальными частями чата,
+    пока не кончатся его попытки.
+    """
+
+    outbox = Outbox()
+
+    by_chat: dict[int, list[Delivery]] = {}
+    for delivery in deliveries:
+        by_chat.setdefault(delivery.chat_id, []).append(delivery)
+
+    async def deliver(chat_deliveries: list[Delivery]) -> int:
+        delivered: int = 0
+        for delivery in sorted(chat_deliveries, key=lambda d: d.part):
+            async with semaphore:
+                result: SendResult = await send_message(bot, delivery.chat_id, delivery.text)
+
+            if result == SendResult.DEFERRED:
+                if outbox.defer(broadcast_id, delivery.key) == DeliveryStatus.FAILED:
+                    logger.warning(f"Сообщение в чат {delivery.chat_id} из рассылки {broadcast_id} "
+                                   f"так и не удалось отправить, больше не повторяю")
+                break
+
+            if result == SendResult.SENT:
+                outbox.mark(broadcast_id, delivery.key, DeliveryStatus.DELIVERED)
+                delivered += 1
+            else:
+                outbox.mark(broadcast_id, delivery.key, DeliveryStatus.FAILED)
+        return delivered
+
+    results: list[int] = await asyncio.gather(*(deliver(chat_deliveries) for chat_deliveries in by_chat.values()))
+    return sum(results)
+
+
+def _restrict(page: list[ScheduleSubscription],
+              only: Optional[frozenset[ScheduleTarget]]) -> list[ScheduleSubscription]:
+    """Подписки страницы только на цели из only; без only — вся страница"""
+
+    return page if only is None else [subscription for subscription in page if subscription.target in only]
+
+
+async def _page_deliveries(page: list[ScheduleSubscription], fetcher: _ScheduleFetcher,
+                           completed: set[DeliveryKey]) -> tuple[list[Delivery], int]:
+    """
+    Дайджест для каждого чата страницы: все изменившиеся расписания его подписок в одном или нескольких
+    сообщениях. Возвращает сообщения и число пропущенных подписок.
+    """
+
+    await asyncio.gather(*(fetcher.fetch(subscription.target) for subscription in page))
+
+    by_chat: dict[int, list[ScheduleGroup]] = {}
+    skipped: int = 0
+    for subscription in page:
+        schedule: Optional[ScheduleGroup] = fetcher.fetch(subscription.target).result()
+
+        # Цель не менялась с прошлой рассылки: подписчики уже получили это расписание
+        if schedule is None or not fetcher.is_changed(subscription.target):
+            skipped += 1
+            continue
+
+        by_chat.setdefault(subscription.chat_id, []).append(schedule.get_sub_group(subscription.sub_group))
+
+    deliveries: list[Delivery] = []
+    for chat_id, schedules in by_chat.items():
+        for part, text in enumerate(build_digest(schedules)):
+            delivery: Delivery = make_delivery(chat_id, text, part)
+            if delivery.key not in completed:
+                deliveries.append(delivery)
+
+    return deliveries, skipped
+
+
+# region Broadcast jobs
+def _job_payload(schedule_date: datetime, page: list[ScheduleSubscription], state: StateSnapshot,
+                 republish: bool, fresh: bool) -> dict:
+    targets: set[ScheduleTarget] = {subscription.target for subscription in page}
+
+    return {
+        "schedule_date": schedule_date.strftime(SCHEDULE_DATE_FORMAT),
+        "republish": republish,
+        "fresh": fresh,
+        "subscriptions": [
+            [subscription.id, subscription.chat_id, subscription.group_name, subscription.teacher_name,
+             subscription.sub_group]
+            for subscription in page
+        ],
+        "hashes": [[target.kind, target.name, state.get_hash(target)] for target in sorted(targets)],
+    }
+
+
+async def _enqueue_broadcast(broadcast_id: str, schedule_date: datetime, state: StateSnapshot,
+                             republish: bool = False, only: Optional[frozenset[ScheduleTarget]] = None) -> None:
+    """
+    Ставит рассылку в очередь рабочих процессов: одно задание на страницу подписок, чаты страниц не делятся.
+    С only в задания попадают только подписки на эти цели, и рабочие загружают их мимо своего кэша.
+    Задания ставятся пачками по мере чтения подписок, а открываются рабочим разом в конце, поэтому сбой
+    на середине не оставит часть рассылки. Рассылка без заданий сразу завершается.
+    """
+
+    outbox = Outbox()
+    outbox.start_broadcast(broadcast_id)
+
+    batch: list[tuple[int, dict]] = []
+    total: int = 0
+    async for page in Database().iter_chat_subscription_pages():
+        page = _restrict(page, only)
+        if not page:
+            continue
+
+        batch.append((page[0].chat_id, _job_payload(schedule_date, page, state, republish, only is not None)))
+        total += len(page)
+
+        if len(batch) >= SUBMIT_BATCH_PAGES:
+            outbox.submit_jobs(broadcast_id, batch)
+            batch = []
+
+    outbox.submit_jobs(broadcast_id, batch)
+
+    queued: int = outbox.publish_jobs(broadcast_id)
+    if not queued:
+        _finish_or_defer(broadcast_id)
+        logger.info(f"Рассылка расписания {broadcast_id}: рассылать нечего")
+        return
+
+    logger.info(f"Рассылка расписания {broadcast_id} поставлена в очередь: {queued} заданий, {total} подписок")
+
+
+async def process_broadcast_job(bot: Bot, job: BroadcastJob) -> dict:
+    """Выполняет задание рассылки в рабочем процессе; результат забирает бот, когда готовы все задания"""
+
+    api = ApiCommunicator()
+    outbox = Outbox()
+    payload: dict = job.payload
+
+    await api.use_schedule_date(datetime.strptime(payload["schedule_date"], SCHEDULE_DATE_FORMAT))
+
+    previous: dict[ScheduleTarget, Optional[str]] = {
+        ScheduleTarget(ScheduleKind(kind), name): fingerprint for kind, name, fingerprint in payload["hashes"]
+    }
+    page: list[ScheduleSubscription] = [
+        ScheduleSubscription(subscription_id, chat_id, group_name, teacher_name, SubGroup(sub_group))
+        for subscription_id, chat_id, group_name, teacher_name, sub_group in payload["subscriptions"]
+    ]
+
+    fetcher = _ScheduleFetcher(api, previous.get, republish=payload.get("republish", False),
+                               fresh=payload.get("fresh", False))
+    completed: set[DeliveryKey] = outbox.completed(job.broadcast_id, (subscription.chat_id for subscription in page))
+    deliveries, skipped = await _page_deliveries(page, fetcher, completed)
+
+    outbox.enqueue(job.broadcast_id, deliveries)
+    delivered: int = await _deliver_all(bot, job.broadcast_id, deliveries, asyncio.Semaphore(SEND_CONCURRENCY))
+
+    return {
+        "delivered": delivered,
+        "queued": len(deliveries),
+        "skipped": skipped,
+        "total": len(page),
+        "changed": fetcher.changed_count,
+        "targets": len(fetcher),
+        "fingerprints": [[target.kind, target.name, value] for target, value in fetcher.fingerprints().items()],
+        "forbidden": sorted(MessageDispatcher().pop_forbidden_chats()),
+        "migrated": sorted(MessageDispatcher().pop_migrated_chats().items()),
+    }
+
+
+def failed_job_result(job: BroadcastJob, error: Exception) -> dict:
+    """Результат задания, которое так и не выполнилось: бот не запомнит отпечатки целей его страницы"""
+
+    return {
+        "error": repr(error),
+        "failed_targets": [[kind, name] for kind, name, _ in job.payload["hashes"]],
+    }
+
 
+async def _collect_broadcasts(state: StateSnapshot) -> bool:
+    """
+    Завершает рассылки, все задания которых выполнили рабочие процессы, и запоминает отпечатки их целей.
+    Цели страниц, задания которых так и не выполнились, получают пустой отпечаток даты: следующая проверка
+    перепроверит и разошлёт их, даже если другие страницы с ними уже разосланы. Отпечатки рассылки прошлой
+    даты, завершившейся уже после перехода на новую, не запоминаются.
+    Возвращает True, если в очереди ещё есть невыполненные задания рассылки новой даты: только они
+    откладывают проверку даты, повторные сборки и переопубликования её не задерживают.
+    """
+
+    outbox = Outbox()
+    forbidden_chats: set[int] = set()
+    migrated_chats: dict[int, int] = {}
+
+    for broadcast_id, results in outbox.completed_jobs().items():
+        failed_targets: set[ScheduleTarget] = {
+            ScheduleTarget(ScheduleKind(kind), name)
+            for result in results for kind, name in result.get("failed_targets", [])
+        }
+
+        superseded: bool = _is_superseded(broadcast_id)
+        for result in results:
+            for kind, name, fingerprint in result.get("fingerprints", []):
+                target = ScheduleTarget(ScheduleKind(kind), name)
+                if target not in failed_targets and not superseded:
+                    state.set_hash(target, fingerprint)
+            forbidden_chats.update(result.get("forbidden", []))
+            migrated_chats.update((chat_id, new_chat_id) for chat_id, new_chat_id in result.get("migrated", []))
+
+        if not superseded:
+            for target in failed_targets:
+                state.set_hash(target, unsent_fingerprint(broadcast_id))
+
+        _finish_or_defer(broadcast_id)
+        failed: int = sum("error" in result for result in results)
+        logger.info(f"Рассылка расписания {broadcast_id} рабочими процессами: доставлено "
+                    f"{sum(result.get('delivered', 0) for result in results)} из "
+                    f"{sum(result.get('queued', 0) for result in results)}, пропущено "
+                    f"{sum(result.get('skipped', 0) for result in results)} из "
+                    f"{sum(result.get('total', 0) for result in results)} подписок"
+                    + (f"; с ошибкой {failed} из {len(results)} заданий" if failed else ""))
+
+    await _update_chats(forbidden_chats, migrated_chats)
+    await state.save_async()
+
+    open_jobs: int = outbox.open_jobs()
+    idle_seconds: Optional[float] = outbox.idle_seconds()
+    if open_jobs and idle_seconds is not None and idle_seconds > STALLED_JOBS_WARNING:
+        logger.warning(f"Очередь рассылки стоит {idle_seconds / 60:.0f} мин.: {open_jobs} заданий никто не берёт "
+                       f"и не продлевает. Запущены ли рабочие процессы (worker.py)?")
+    return outbox.open_jobs(republish=False) > 0
+# endregion
+
+
+def _finish_or_defer(broadcast_id: str) -> None:
+    """
+    Отмечает рассылку собранной и завершает её, если в ней не осталось недоставленного. Иначе она остаётся
+    незавершённой, и следующая проверка расписания дошлёт то, что не ушло из-за сети или лимитов Telegram.
+    """
+
+    outbox = Outbox()
+    outbox.mark_collected(broadcast_id)
+    pending: int = outbox.pending_count(broadcast_id)
+
+    if not pending:
+        outbox.finish_broadcast(broadcast_id)
+        return
+
+    outbox.clear_jobs(broadcast_id)
+    logger.warning(f"Рассылка расписания {broadcast_id}: {pending} сообщений не отправлено, "
+                   f"дошлю при следующей проверке")
+
+
+async def _broadcast(bot: Bot, broadcast_id: str, state: StateSnapshot, republish: bool = False,
+                     only: Optional[frozenset[ScheduleTarget]] = None) -> None:
+    """
+    Рассылает расписание из бота, страница за страницей подписок, и запоминает отпечатки целей.
+    С only рассылаются только подписки на эти цели.
+    """
 
-async def send_schedule_message(context: ContextTypes.DEFAULT_TYPE):
     api = ApiCommunicator()
     database = Database()
+    outbox = Outbox()
+
+    fetcher = _ScheduleFetcher(api, state.get_hash, republish=republish)
+    semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+
+    delivered: int = 0
+    queued: int = 0
+    skipped: int = 0
+    total: int = 0
+
+    async with outbox.lock:
+        completed: set[DeliveryKey] = outbox.start_broadcast(broadcast_id)
+
+        async for page in _prefetched(database.iter_chat_subscription_pages()):
+            page = _restrict(page, only)
+            deliveries, page_skipped = await _page_deliveries(page, fetcher, completed)
+            skipped += page_skipped
 
-    changed: bool = await api.check_changed()
+            outbox.enqueue(broadcast_id, deliveries)
+            delivered += await _deliver_all(bot, broadcast_id, deliveries, semaphore)
+            queued += len(deliveries)
+            total += len(page)
 
+        _finish_or_defer(broadcast_id)
+
+    logger.info(f"Рассылка расписания {broadcast_id}: доставлено {delivered} из {queued}, "
+                f"пропущено {skipped} из {total} подписок; изменилось {fetcher.changed_count} из {len(fetcher)} "
+                f"целей, {MessageDispatcher().stats.messages_per_second:.1f} сообщ./с")
+
+    await _update_chats()
+
+    for target, fingerprint in fetcher.fingerprints().items():
+        state.set_hash(target, fingerprint)
+
+
+async def _check_republished(bot: Bot, state: StateSnapshot, use_workers: bool, limit: Optional[int] = None) -> None:
+    """
+    Перепроверяет разосланные за текущую дату цели отдельной загрузкой мимо кэша, с limit — не больше limit
+    случайных целей. Кэш и снимок обновляются, а подписки перебираются, только если занятия у каких-то целей
+    исправили, и только ради этих целей.
+    """
+
+    api = ApiCommunicator()
+    broadcast_id: str = api.schedule_date.strftime(SCHEDULE_DATE_FORMAT)
+
+    targets: list[ScheduleTarget] = state.targets_sent_on(broadcast_id)
+    if not targets:
+        return
+    if limit is not None and len(targets) > limit:
+        targets = random.sample(targets, limit)
+
+    fresh: dict[ScheduleTarget, ScheduleGroup] = await api.get_fresh_schedules(targets)
+    # Расписание уже новой даты разошлёт проверка даты
+    changed: dict[ScheduleTarget, ScheduleGroup] = {
+        target: schedule for target, schedule in fresh.items()
+        if schedule.schedule_date == broadcast_id and schedule_fingerprint(schedule) != state.get_hash(target)
+    }
     if not changed:
         return
 
-    subscriptions: list[ScheduleSubscription] = await database.get_all_schedule_subscriptions()
+    logger.info(f"Расписание {broadcast_id} переопубликовано: изменилось {len(changed)} из {len(targets)} целей")
+    api.replace_schedules(changed)
+
+    # Каждая переопубликация — новый проход по рассылке даты: доставленное в прошлых проходах не в счёт,
+    # иначе расписание, вернувшееся к прежнему виду, не дошло бы до подписчиков. Неизменившиеся цели
+    # и так не рассылаются, а доставленное в этом проходе защищает от повтора после перезапуска.
+    async with Outbox().lock:
+        Outbox().forget_completed(broadcast_id)
+
+    if use_workers:
+        await _enqueue_broadcast(broadcast_id, api.schedule_date, state, republish=True, only=frozenset(changed))
+    else:
+        await _broadcast(bot, broadcast_id, state, republish=True, only=frozenset(changed))
+
+
+@observed_handler
+async def send_schedule_message(context: ContextTypes.DEFAULT_TYPE, check_content: bool = False,
+                                content_targets: Optional[int] = None) -> bool:
+    """
+    Рассылает расписание, если вышла новая дата. Если API сообщил о переопубликовании текущей даты,
+    перепроверяет все её цели; с check_content — не больше content_targets целей и без такого сигнала.
+    True означает публикацию новой даты.
+    """
+
+    api = ApiCommunicator()
+
+    state = StateSnapshot()
+    use_workers: bool = context.bot_data.get(BROADCAST_WORKERS_KEY, False)
+
+    # Пока рабочие процессы рассылают новую дату, следующая не проверяется, как и при рассылке в боте
+    if use_workers and await _collect_broadcasts(state):
+        logger.info("Рабочие процессы ещё не закончили рассылку новой даты, проверка расписания отложена")
+        return False
+
+    await _resume_unfinished(context.bot, state, use_workers)
 
-    for subscription in subscriptions:
-        if subscription.group_name:
-            group_schedule: ScheduleGroup = await api.get_student_schedule(subscription.group_name)
-            await context.bot.send_message(chat_id=subscription.chat_id, text=group_schedule.pretty_schedule)
+    new_date: Optional[datetime] = await api.check_changed()
 
-        if subscription.teacher_name:
-            teacher_schedule: ScheduleGroup = await api.get_teacher_schedule(subscription.teacher_name)
-            await context.bot.send_message(chat_id=subscription.chat_id, text=teacher_schedule.pretty_schedule)
+    if new_date is None:
+        # Переопубликование, пока рабочие ещё собирают прошлое, смешало бы проходы по рассылке,
+        # поэтому сигнал о нём дожидается следующей проверки
+        if api.schedule_date is not None and not (use_workers and Outbox().open_jobs()):
+            if api.pop_republish_signal():
+                await _check_republished(context.bot, state, use_workers)
+            elif check_content:
+                await _check_republished(context.bot, state, use_workers, content_targets)
 
+        await state.save_async()
+        return False
 
-async def start_schedule_check(app: Application, minutes: int = 30):
-    if minutes <= 0:
+    # Id рассылки — дата расписания: повторная рассылка той же даты после перезапуска не повторит доставленное
+    broadcast_id: str = new_date.strftime(SCHEDULE_DATE_FORMAT)
+
+    # Новая дата сохраняется только после рассылки или постановки её в очередь, иначе её увидит следующая проверка
+    async with api.advancing_schedule_date(new_date):
+        if use_workers:
+            await _enqueue_broadcast(broadcast_id, new_date, state)
+        else:
+            await _broadcast(context.bot, broadcast_id, state)
+
+    await state.save_async()
+    return True
+
+
+def _is_superseded(broadcast_id: str) -> bool:
+    """Рассылка старше сохранённой даты расписания: собирать её заново уже незачем"""
+
+    schedule_date: Optional[datetime] = ApiCommunicator().schedule_date
+    return schedule_date is None or broadcast_id < schedule_date.strftime(SCHEDULE_DATE_FORMAT)
+
+
+async def _deliver_pending(bot: Bot, broadcast_id: str, deliveries: list[Delivery]) -> None:
+    """
+    Досылает записанные сообщения прерванной рассылки. Здесь завершается только рассылка прошлой даты:
+    рассылку текущей даты завершает _resume_unfinished, если она собрана, а более новую повторит проверка даты.
+    """
+
+    if deliveries:
+        logger.info(f"Продолжаю прерванную рассылку {broadcast_id}: осталось {len(deliveries)} сообщений")
+        delivered: int = await _deliver_all(bot, broadcast_id, deliveries, asyncio.Semaphore(SEND_CONCURRENCY))
+        logger.info(f"Прерванная рассылка {broadcast_id}: доставлено {delivered} из {len(deliveries)}")
+
+    if _is_superseded(broadcast_id):
+        Outbox().finish_broadcast(broadcast_id)
+
+
+async def resume_broadcasts(app: Application) -> None:
+    """Досылает сообщения рассылок, прерванных падением или перезапуском"""
+
+    outbox = Outbox()
+
+    async with outbox.lock:
+        unfinished: dict[str, list[Delivery]] = outbox.unfinished()
+
+        for broadcast_id, deliveries in unfinished.items():
+            await _deliver_pending(app.bot, broadcast_id, deliveries)
+
+    if unfinished:
+        await _update_chats()
+
+
+async def _resume_unfinished(bot: Bot, state: StateSnapshot, use_workers: bool) -> None:
+    """
+    Возобновляет рассылки, не дошедшие до конца, досылая записанное. Рассылку текущей даты, прерванную
+    до того, как её собрали по всем страницам подписок, собирает заново, уже доставленное при этом
+    не повторяется. Рассылки, которые ещё выполняют рабочие процессы, не трогает.
+    """
+
+    api = ApiCommunicator()
+    outbox = Outbox()
+
+    for broadcast_id in outbox.unfinished_broadcasts():
+        if use_workers and outbox.open_jobs(broadcast_id):
+            continue
+
+        if _is_superseded(broadcast_id):
+            async with outbox.lock:
+                await _deliver_pending(bot, broadcast_id, outbox.unfinished().get(broadcast_id, []))
+            await _update_chats()
+            continue
+
+        # Рассылку даты новее сохранённой повторит проверка даты: её дата не сохраняется до конца рассылки
+        if broadcast_id != api.schedule_date.strftime(SCHEDULE_DATE_FORMAT):
+            continue
+
+        async with outbox.lock:
+            await _deliver_pending(bot, broadcast_id, outbox.unfinished().get(broadcast_id, []))
+            if outbox.is_collected(broadcast_id):
+                _finish_or_defer(broadcast_id)
+        await _update_chats()
+
+        if outbox.is_collected(broadcast_id):
+            continue
+
+        logger.info(f"Рассылка расписания {broadcast_id} прервалась, собираю её заново")
+        if use_workers:
+            await _enqueue_broadcast(broadcast_id, api.schedule_date, state, republish=True)
+        else:
+            await _broadcast(bot, broadcast_id, state, republish=True)
+
+
+async def _schedule_check(context: ContextTypes.DEFAULT_TYPE) -> None:
+    poller: PollScheduler = context.job.data
+    check_content: bool = poller.content_check_due(datetime.now())
+
+    try:
+        changed: bool = await send_schedule_message(context, check_content, poller.content_targets)
+    except Exception as e:
+        poller.record_error()
+        logger.error(f"Проверка расписания не удалась ({poller.errors} подряд): {e!r}")
+    else:
+        poller.record_success()
+        if check_content:
+            poller.record_content_check(datetime.now())
+        if changed:
+            poller.record_publish(datetime.now())
+            StateSnapshot().set_publish_minutes(poller.publish_minutes)
+            await StateSnapshot().save_async()
+    finally:
+        now: datetime = datetime.now()
+        window_active: Optional[bool] = poller.window_changed(now)
+        if window_active is not None:
+            logger.info("Идёт окно публикации расписания, проверки частые" if window_active
+                        else "Окно публикации расписания закончилось, проверки редкие")
+        _schedule_next_check(context.job_queue, poller, poller.next_delay(now))
+
+
+def _schedule_next_check(job_queue: JobQueue, poller: PollScheduler, delay: float) -> None:
+    job_queue.run_once(callback=_schedule_check, when=delay, data=poller, name=SCHEDULE_CHECK_JOB)
+
+
+async def start_schedule_check(app: Application, config: PollConfig = PollConfig()):
+    if config.fast_interval <= 0 or config.slow_interval <= 0:
         raise AttributeError("Неправильно указан промежуток между проверками!")
 
     if app.job_queue is not None:
-        app.job_queue.run_repeating(
-            callback=send_schedule_message,
-            interval=minutes * 60,
-            first=10,
-            name="schedule_check"
-        )
\ No newline at end of file
+        poller = PollScheduler(config, StateSnapshot().publish_minutes)
+        _schedule_next_check(app.job_queue, poller, FIRST_CHECK_DELAY)
+
+
+def seconds_until_next_check(job_queue: Optional[JobQueue]) -> Optional[int]:
+    """Сколько секунд известное боту расписание точно останется актуальным"""
+
+    if job_queue is None:
+        return None
+
+    for job in job_queue.get_jobs_by_name(SCHEDULE_CHECK_JOB):
+        if job.next_t is not None:
+            return max(0, int((job.next_t - datetime.now(job.next_t.tzinfo)).total_seconds()))
+
+    return None
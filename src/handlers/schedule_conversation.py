@@ -1,29 +1,43 @@
+from typing import Optional
+
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
 
 from src.api_communicator import ApiCommunicator
+from src.metrics import observed_handler
 from src.utils.schedule import SubGroup, ButtonVariants, ScheduleGroup
 from src.utils import default_keyboard
+from src.utils.digest import build_digest
 
 GROUP, TEACHER, SUBGROUP = range(3)
 
 api = ApiCommunicator()
 
 
+async def _reply_schedule(update: Update, schedule: ScheduleGroup, markup: ReplyKeyboardMarkup) -> None:
+    """Длинное расписание уходит несколькими сообщениями, клавиатура прикрепляется к последнему"""
+
+    texts: list[str] = build_digest([schedule])
+    for text in texts[:-1]:
+        await update.message.reply_text(text)
+    await update.message.reply_text(texts[-1], reply_markup=markup)
+
+
+@observed_handler
 async def ask_group(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     await update.message.reply_text("Напиши название группы:")
     return GROUP
 
+@observed_handler
 async def ask_teacher(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     await update.message.reply_text("Напишите имя преподавателя по примеру (Дианов В.П.)")
     return TEACHER
 
+@observed_handler
 async def ask_sub_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    group_name: str = update.message.text.lower()
-
-    groups_list: list[str] = await api.get_groups_list()
+    group_name: Optional[str] = await api.find_group(update.message.text)
 
-    if group_name not in groups_list:
+    if group_name is None:
         await update.message.reply_text("Этой группы нет в списке, попробуйте ещё раз:\nИспользуйте /cancel чтобы отменить")
         return GROUP
 
@@ -40,6 +54,7 @@ async def ask_sub_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
     return SUBGROUP
 
+@observed_handler
 async def received_group_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     group_name: str = context.user_data["GROUP"]
     sub_group: SubGroup = SubGroup.from_display_name(update.message.text)
@@ -47,20 +62,20 @@ async def received_group_info(update: Update, context: ContextTypes.DEFAULT_TYPE
     group_schedule: ScheduleGroup = await api.get_student_schedule(group_name)
 
     markup: ReplyKeyboardMarkup = await default_keyboard(update)
-    await update.message.reply_text(group_schedule.get_sub_group(sub_group).pretty_schedule, reply_markup=markup)
+    await _reply_schedule(update, group_schedule.get_sub_group(sub_group), markup)
 
     context.user_data.clear()
 
     return ConversationHandler.END
 
+@observed_handler
 async def received_teacher_info(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
-    teachers_list: list[str] = await api.get_teachers_list()
-    teacher_name: str = update.message.text
-
-    if teacher_name is None:
+    if update.message.text is None:
         return TEACHER
 
-    if teacher_name not in teachers_list:
+    teacher_name: Optional[str] = await api.find_teacher(update.message.text)
+
+    if teacher_name is None:
         await update.message.reply_text(f"Этого преподавателя нет в списке, попробуйте ещё раз:\nИспользуйте /cancel чтобы отменить")
         return TEACHER
 
@@ -68,10 +83,11 @@ async def received_teacher_info(update: Update, _: ContextTypes.DEFAULT_TYPE) ->
 
     markup: ReplyKeyboardMarkup = await default_keyboard(update)
 
-    await update.message.reply_text(teacher_schedule.pretty_schedule, reply_markup=markup)
+    await _reply_schedule(update, teacher_schedule, markup)
 
     return ConversationHandler.END
 
+@observed_handler
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
     markup: ReplyKeyboardMarkup = await default_keyboard(update)
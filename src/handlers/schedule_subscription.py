@@ -1,24 +1,32 @@
+from typing import Optional
+
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, filters, MessageHandler, CommandHandler
 
 from src.api_communicator import ApiCommunicator
-from src.database import Database, AlreadyExistingSubscriptionError, SubscriptionLimitError
+from src.database import AlreadyExistingSubscriptionError, SubscriptionLimitError, ScheduleSubscription
+from src.metrics import observed_handler
+from src.subscription_store import SubscriptionStore
 from src.utils import default_keyboard
+from src.utils.directory import Directory
 from src.utils.schedule import SubGroup, ButtonVariants
 
 SUB, GROUP, TEACHER, SUBGROUP, UNSUB = range(5)
 
 api = ApiCommunicator()
-database = Database()
+store = SubscriptionStore()
 
-async def unsubscribe(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+@observed_handler
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     chat_id: int = update.effective_chat.id
 
-    subscriptions, _ = await database.get_schedule_subscriptions(chat_id)
+    subscriptions, _ = await store.get_schedule_subscriptions(chat_id)
 
     if not subscriptions:
         return ConversationHandler.END
 
+    context.user_data["SUBSCRIPTIONS"] = subscriptions
+
     keyboard: list[list[str]] = []
 
     i: int = 1
@@ -39,12 +47,13 @@ async def unsubscribe(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
 
     return UNSUB
 
-async def unsub_number_received(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+@observed_handler
+async def unsub_number_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     received_number_string: str = update.message.text.replace(".", "")
     chat_id: int = update.effective_chat.id
 
     if received_number_string.lower() == "отмена":
-        return await cancel(update, _)
+        return await cancel(update, context)
 
     try:
         received_number: int = int(received_number_string.split(" ")[0]) - 1
@@ -53,11 +62,16 @@ async def unsub_number_received(update: Update, _: ContextTypes.DEFAULT_TYPE) ->
                                         "попробуй снова\nИспользуй /cancel чтобы отменить")
         return UNSUB
 
-    subscriptions, _ = await database.get_schedule_subscriptions(chat_id)
+    subscriptions: Optional[list[ScheduleSubscription]] = context.user_data.get("SUBSCRIPTIONS")
+    if subscriptions is None:
+        subscriptions, _ = await store.get_schedule_subscriptions(chat_id)
 
-    subscription_id = subscriptions[received_number].id
+    if not 0 <= received_number < len(subscriptions):
+        await update.message.reply_text("Подписки с таким номером нет, попробуй снова\nИспользуй /cancel чтобы отменить")
+        return UNSUB
 
-    deleted: bool = await database.remove_subscription(subscription_id)
+    deleted: bool = await store.remove_subscription(subscriptions[received_number])
+    context.user_data.clear()
 
     markup: ReplyKeyboardMarkup = await default_keyboard(update)
 
@@ -71,32 +85,32 @@ async def unsub_number_received(update: Update, _: ContextTypes.DEFAULT_TYPE) ->
 
     return ConversationHandler.END
 
+@observed_handler
 async def subscribe(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     await update.message.reply_text("Напиши название группы или имя преподавателя по примеру (Дианов В.П.)")
     return SUB
 
 
+@observed_handler
 async def name_received(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     name: str = update.message.text
 
-    groups_list: list[str] = await api.get_groups_list()
-    teachers_list: list[str] = await api.get_teachers_list()
+    directory: Directory = await api.get_directory()
 
-    if name.lower() in groups_list:
+    if directory.find_group(name):
         return await ask_sub_group(update, _)
-    elif name in teachers_list:
+    elif directory.find_teacher(name):
         return await received_teacher_info(update, _)
     else:
         await update.message.reply_text("Указанная группа или преподаватель не найдены :/")
         return ConversationHandler.END
 
 
+@observed_handler
 async def ask_sub_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    group_name: str = update.message.text.lower()
-
-    groups_list: list[str] = await api.get_groups_list()
+    group_name: Optional[str] = await api.find_group(update.message.text)
 
-    if group_name not in groups_list:
+    if group_name is None:
         await update.message.reply_text(
             "Этой группы нет в списке, попробуй ещё раз:\nИспользуй /cancel чтобы отменить")
         return GROUP
@@ -115,20 +129,22 @@ async def ask_sub_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     return SUBGROUP
 
 
+@observed_handler
 async def received_group_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     group_name: str = context.user_data["GROUP"]
     sub_group: SubGroup = SubGroup.from_display_name(update.message.text)
 
     context.user_data.clear()
 
-    markup: ReplyKeyboardMarkup = await default_keyboard(update)
-
     try:
-        created: bool = await database.make_subscription(update.effective_chat.id, group_name, None, sub_group)
+        created: Optional[ScheduleSubscription] = await store.make_subscription(
+            update.effective_chat.id, group_name, None, sub_group
+        )
     except (AlreadyExistingSubscriptionError, SubscriptionLimitError) as e:
-        await update.message.reply_text(str(e), reply_markup=markup)
+        await update.message.reply_text(str(e), reply_markup=await default_keyboard(update))
         return ConversationHandler.END
 
+    markup: ReplyKeyboardMarkup = await default_keyboard(update)
 
     if not created:
         await update.message.reply_text(
@@ -136,39 +152,43 @@ async def received_group_info(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return ConversationHandler.END
 
-    markup: ReplyKeyboardMarkup = await default_keyboard(update)
-
     await update.message.reply_text(f"Подписка на расписание группы {group_name} оформлена успешно!",
                                     reply_markup=markup)
 
     return ConversationHandler.END
 
 
+@observed_handler
 async def received_teacher_info(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
-    teacher_name: str = update.message.text
+    teacher_name: Optional[str] = await api.find_teacher(update.message.text)
 
-    markup: ReplyKeyboardMarkup = await default_keyboard(update)
+    if teacher_name is None:
+        await update.message.reply_text("Этого преподавателя нет в списке :/", reply_markup=await default_keyboard(update))
+        return ConversationHandler.END
 
     try:
-        created: bool = await database.make_subscription(update.effective_chat.id, None, teacher_name)
+        created: Optional[ScheduleSubscription] = await store.make_subscription(
+            update.effective_chat.id, None, teacher_name
+        )
     except (AlreadyExistingSubscriptionError, SubscriptionLimitError) as e:
-        await update.message.reply_text(str(e), reply_markup=markup)
+        await update.message.reply_text(str(e), reply_markup=await default_keyboard(update))
         return ConversationHandler.END
 
+    markup: ReplyKeyboardMarkup = await default_keyboard(update)
+
     if not created:
         await update.message.reply_text(
             "Что-то пошло не так во время создания подписки, программисту опять что-то чинить :D", reply_markup=markup
         )
         return ConversationHandler.END
 
-    markup: ReplyKeyboardMarkup = await default_keyboard(update)
-
     await update.message.reply_text(f"Подписка на расписание преподавателя {teacher_name} оформлена успешно!",
                                     reply_markup=markup)
 
     return ConversationHandler.END
 
 
+@observed_handler
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     markup: ReplyKeyboardMarkup = await default_keyboard(update)
 
@@ -2,7 +2,9 @@ from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler
 
 from src.utils import default_keyboard
+from src.metrics import observed_handler
 
+@observed_handler
 async def start(update: Update, _: ContextTypes.DEFAULT_TYPE):
     user_name: str = update.effective_user.full_name
 
@@ -0,0 +1,178 @@
+import asyncio
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Awaitable, Callable, Optional
+
+from src.logger_config import logger
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_HEADERS = 64
+MAX_HEADER_SIZE = 16 * 1024
+MAX_CONNECTIONS = 128
+KEEP_ALIVE_TIMEOUT = 75
+REQUEST_READ_TIMEOUT = 10
+
+
+class RequestError(ValueError):
+    """Запрос, на который сервер отвечает ошибкой и закрывает соединение"""
+
+    def __init__(self, status: HTTPStatus) -> None:
+        super().__init__(status.phrase)
+        self.status: HTTPStatus = status
+
+
+@dataclass(frozen=True)
+class HttpRequest:
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes = b""
+
+
+@dataclass(frozen=True)
+class HttpResponse:
+    status: int = HTTPStatus.OK
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+HttpHandler = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+
+class HttpServer:
+    """
+    Минимальный HTTP/1.1 сервер на asyncio для вебхука, проверки здоровья и метрик.
+    Соединений одновременно не больше max_connections, лишние сразу получают 503; заголовки ограничены
+    по числу и размеру, а начатый запрос должен прийти целиком за REQUEST_READ_TIMEOUT.
+    """
+
+    def __init__(self, listen: str, port: int, max_connections: int = MAX_CONNECTIONS) -> None:
+        self._listen: str = listen
+        self._port: int = port
+        self._routes: dict[tuple[str, str], HttpHandler] = {}
+        self._server: Optional[asyncio.Server] = None
+        self._connections = asyncio.Semaphore(max_connections)
+
+    def add_route(self, method: str, path: str, handler: HttpHandler) -> None:
+        self._routes[(method.upper(), path)] = handler
+
+    @property
+    def port(self) -> int:
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self) -> None:
+        # Строка длиннее limit обрывает readline с ValueError, так что одна строка не займёт больше MAX_HEADER_SIZE
+        self._server = await asyncio.start_server(self._accept, self._listen, self._port, limit=MAX_HEADER_SIZE)
+        logger.info(f"HTTP сервер слушает {self._listen}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+        """
+        Простаивающее соединение ждёт следующий запрос KEEP_ALIVE_TIMEOUT секунд, а начатый запрос
+        с заголовками и телом должен прийти целиком за REQUEST_READ_TIMEOUT,
+        чтобы медленный клиент не держал соединение.
+        """
+
+        request_line: bytes = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not request_line.strip():
+            return None
+
+        return await asyncio.wait_for(self._read_message(reader, request_line), REQUEST_READ_TIMEOUT)
+
+    async def _read_message(self, reader: asyncio.StreamReader, request_line: bytes) -> HttpRequest:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+        headers: dict[str, str] = {}
+        header_size: int = 0
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            header_size += len(line)
+            if len(headers) >= MAX_HEADERS or header_size > MAX_HEADER_SIZE:
+                raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length: int = int(headers.get("content-length", 0))
+        if length > MAX_BODY_SIZE:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        body: bytes = await reader.readexactly(length) if length else b""
+        return HttpRequest(method=method.upper(), path=target.split("?", 1)[0], headers=headers, body=body)
+
+    async def _respond(self, request: HttpRequest) -> HttpResponse:
+        handler: Optional[HttpHandler] = self._routes.get((request.method, request.path))
+
+        if handler is None:
+            known_path: bool = any(path == request.path for _, path in self._routes)
+            status: HTTPStatus = HTTPStatus.METHOD_NOT_ALLOWED if known_path else HTTPStatus.NOT_FOUND
+            return HttpResponse(status=status, body=status.phrase.encode())
+
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.exception(f"Ошибка при обработке {request.method} {request.path}: {e!r}")
+            return HttpResponse(status=HTTPStatus.INTERNAL_SERVER_ERROR, body=b"Internal Server Error")
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, response: HttpResponse, keep_alive: bool) -> None:
+        status = HTTPStatus(response.status)
+        head: list[str] = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {len(response.body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *(f"{name}: {value}" for name, value in response.headers.items()),
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + response.body)
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._connections.locked():
+            status: HTTPStatus = HTTPStatus.SERVICE_UNAVAILABLE
+            self._write_response(writer, HttpResponse(status=status, body=status.phrase.encode()), False)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+            return
+
+        async with self._connections:
+            await self._handle_connection(reader, writer)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request: Optional[HttpRequest] = await self._read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    status: HTTPStatus = e.status if isinstance(e, RequestError) else HTTPStatus.BAD_REQUEST
+                    self._write_response(writer, HttpResponse(status=status, body=status.phrase.encode()), False)
+                    await writer.drain()
+                    return
+
+                if request is None:
+                    return
+
+                keep_alive: bool = request.headers.get("connection", "").lower() != "close"
+                response: HttpResponse = await self._respond(request)
+
+                self._write_response(writer, response, keep_alive)
+                await writer.drain()
+
+                if not keep_alive:
+                    return
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -1,10 +1,25 @@
 import logging
+from contextvars import ContextVar
+from typing import Optional
+
+# trace_id обновления, которое сейчас обрабатывается; выставляется в src.tracing
+trace_id_var: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = trace_id_var.get() or "-"
+        return True
+
 
 logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s',
     level=logging.INFO
 )
 
+for handler in logging.getLogger().handlers:
+    handler.addFilter(TraceIdFilter())
+
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
-logger = logging.getLogger("AkttBot")
\ No newline at end of file
+logger = logging.getLogger("AkttBot")
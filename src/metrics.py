@@ -0,0 +1,226 @@
+import functools
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, Optional, ParamSpec, TypeVar
+
+from src.http_server import HttpRequest, HttpResponse, HttpServer
+from src.tracing import span
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[str, ...]
+Sample = tuple[Labels, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs: list[str] = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labels: Labels = labels
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        ...
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for label_values, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class CallbackMetric(_Metric):
+    """Значения считываются при каждом запросе метрик из уже существующей статистики"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], list[Sample]],
+                 labels: Labels = (), kind: str = "gauge") -> None:
+        super().__init__(name, documentation, labels)
+        self.kind = kind
+        self._callback: Callable[[], list[Sample]] = callback
+
+    def samples(self) -> Iterator[str]:
+        for label_values, value in self._callback():
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self._buckets: tuple[float, ...] = buckets
+        self._counts: dict[Labels, list[int]] = {}
+        self._sums: dict[Labels, float] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        counts: Optional[list[int]] = self._counts.get(label_values)
+        if counts is None:
+            counts = self._counts[label_values] = [0] * (len(self._buckets) + 1)
+            self._sums[label_values] = 0
+
+        counts[bisect_left(self._buckets, value)] += 1
+        self._sums[label_values] += value
+
+    def samples(self) -> Iterator[str]:
+        for label_values, counts in sorted(self._counts.items()):
+            cumulative: int = 0
+            for bound, count in zip((*self._buckets, float("inf")), counts):
+                cumulative += count
+                bucket_label: str = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, bucket_label)} {cumulative}"
+
+            labels: str = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(self._sums[label_values])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_DURATION: Histogram = REGISTRY.register(Histogram(
+    "aktt_handler_duration_seconds", "Время обработки обновления обработчиком", ("handler",)
+))
+HANDLER_ERRORS: Counter = REGISTRY.register(Counter(
+    "aktt_handler_errors_total", "Обработчики, завершившиеся исключением", ("handler",)
+))
+CALL_DURATION: Histogram = REGISTRY.register(Histogram(
+    "aktt_call_duration_seconds", "Время вызовов ApiCommunicator и Database", ("component", "call")
+))
+CALL_ERRORS: Counter = REGISTRY.register(Counter(
+    "aktt_call_errors_total", "Вызовы ApiCommunicator и Database, завершившиеся исключением", ("component", "call")
+))
+UPSTREAM_DURATION: Histogram = REGISTRY.register(Histogram(
+    "aktt_upstream_request_duration_seconds", "Время HTTP-запросов к API расписания", ("endpoint", "status")
+))
+
+
+@contextmanager
+def observe_call(component: str, call: str) -> Iterator[None]:
+    """Время и ошибки вызова в метриках, а внутри обновления ещё и отрезок трассировки"""
+
+    started: float = time.perf_counter()
+    try:
+        with span(f"{component}.{call}"):
+            yield
+    except Exception:
+        CALL_ERRORS.inc(component, call)
+        raise
+    finally:
+        CALL_DURATION.observe(time.perf_counter() - started, component, call)
+
+
+def observed(component: str) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Декоратор async-метода: время и ошибки вызова попадают в aktt_call_* с именем метода"""
+
+    def decorator(function: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @functools.wraps(function)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with observe_call(component, function.__name__):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def observed_handler(function: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    """Декоратор обработчика: имя метки — модуль и функция, так как имена состояний в диалогах повторяются"""
+
+    handler: str = f"{function.__module__.rsplit('.', 1)[-1]}.{function.__name__}"
+
+    @functools.wraps(function)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        started: float = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler)
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, handler)
+
+    return wrapper
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    listen: str = "127.0.0.1"
+    port: int = 9464
+    path: str = "/metrics"
+
+
+class MetricsServer:
+    """Отдаёт метрики в текстовом формате Prometheus по GET path"""
+
+    def __init__(self, config: MetricsConfig, registry: MetricsRegistry = REGISTRY) -> None:
+        self._registry: MetricsRegistry = registry
+        self._server = HttpServer(config.listen, config.port)
+        self._server.add_route("GET", config.path, self._handle_metrics)
+
+    @property
+    def http_server(self) -> HttpServer:
+        return self._server
+
+    async def _handle_metrics(self, _: HttpRequest) -> HttpResponse:
+        return HttpResponse(body=self._registry.render().encode(), content_type=CONTENT_TYPE)
+
+    async def start(self) -> None:
+        await self._server.start()
+
+    async def stop(self) -> None:
+        await self._server.stop()
@@ -0,0 +1,173 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+from dataclasses import dataclass
+from typing import Optional
+
+from telegram.ext import ExtBot
+
+from src.handlers.schedule_anounce import failed_job_result, process_broadcast_job
+from src.logger_config import logger
+from src.outbox import BroadcastJob, Outbox
+from src.utils.message_sender import WORKER_SEND_RATE, MessageDispatcher
+
+POLL_INTERVAL = 1.0
+CLAIM_TIMEOUT = 2 * 60
+HEARTBEATS_PER_CLAIM = 4
+MAX_JOB_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30
+
+
+def _worker_send_rate(send_rate: float) -> float:
+    if send_rate > WORKER_SEND_RATE:
+        logger.warning(f"Лимит отправки рабочих {send_rate:g} сообщ./с вместе с ботом превысил бы лимит Telegram, "
+                       f"использую {WORKER_SEND_RATE} сообщ./с")
+        return WORKER_SEND_RATE
+    return send_rate
+
+
+@dataclass(frozen=True)
+class WorkerConfig:
+    processes: int = 1
+    send_rate: float = WORKER_SEND_RATE
+    poll_interval: float = POLL_INTERVAL
+    claim_timeout: float = CLAIM_TIMEOUT
+
+
+class NotificationWorker:
+    """
+    Рабочий процесс рассылки: забирает задания из очереди в журнале рассылок,
+    загружает и отрисовывает расписание и отправляет сообщения своим ботом.
+    Лимит отправки делится между процессами поровну, чтобы вместе с ботом они не превысили лимит Telegram;
+    лимит больше WORKER_SEND_RATE урезается до него.
+    """
+
+    def __init__(self, token: str, config: WorkerConfig = WorkerConfig(), worker_id: Optional[str] = None) -> None:
+        self._token: str = token
+        self._config: WorkerConfig = config
+        self._worker_id: str = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._stop_event = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    async def run(self) -> None:
+        outbox = Outbox()
+        send_rate: float = _worker_send_rate(self._config.send_rate)
+        dispatcher = MessageDispatcher(send_rate / self._config.processes)
+        bot = ExtBot(self._token, rate_limiter=dispatcher)
+
+        logger.info(f"Рабочий процесс рассылки {self._worker_id} запущен")
+        async with bot:
+            while not self._stop_event.is_set():
+                job: Optional[BroadcastJob] = outbox.claim_job(self._worker_id, self._config.claim_timeout)
+
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._stop_event.wait(), self._config.poll_interval)
+                    except TimeoutError:
+                        pass
+                    continue
+
+                result: Optional[dict] = await self._process(bot, job)
+                if result is not None and not self._finish(job, result):
+                    logger.warning(f"Задание {job.id} рассылки {job.broadcast_id} уже выдано другому процессу, "
+                                   f"результат не записан")
+
+        outbox.close()
+        logger.info(f"Рабочий процесс рассылки {self._worker_id} остановлен")
+
+    def _finish(self, job: BroadcastJob, result: dict) -> bool:
+        """
+        Записывает результат задания. Задание с ошибкой возвращается в очередь с растущей паузой,
+        пока не кончатся попытки; False, если задание уже у другого процесса.
+        """
+
+        outbox = Outbox()
+        if "error" in result and job.attempts + 1 < MAX_JOB_ATTEMPTS:
+            delay: float = JOB_RETRY_DELAY * 2 ** job.attempts
+            logger.info(f"Задание {job.id} рассылки {job.broadcast_id} будет повторено через {delay:.0f} с.")
+            return outbox.release_job(job.id, self._worker_id, delay)
+
+        return outbox.complete_job(job.id, self._worker_id, result)
+
+    async def _heartbeat(self, job: BroadcastJob) -> None:
+        """Продлевает задание, пока оно выполняется; завершается, если задание выдали другому процессу"""
+
+        outbox = Outbox()
+        while True:
+            await asyncio.sleep(self._config.claim_timeout / HEARTBEATS_PER_CLAIM)
+            if not outbox.extend_claim(job.id, self._worker_id):
+                return
+
+    async def _process(self, bot: ExtBot, job: BroadcastJob) -> Optional[dict]:
+        """Результат задания или None, если его выдали другому процессу и выполнение прервано"""
+
+        processing: asyncio.Task = asyncio.create_task(process_broadcast_job(bot, job))
+        heartbeat: asyncio.Task = asyncio.create_task(self._heartbeat(job))
+
+        await asyncio.wait((processing, heartbeat), return_when=asyncio.FIRST_COMPLETED)
+        heartbeat.cancel()
+
+        if not processing.done():
+            processing.cancel()
+            await asyncio.gather(processing, return_exceptions=True)
+            logger.warning(f"Задание {job.id} рассылки {job.broadcast_id} выдано другому процессу, выполнение прервано")
+            return None
+
+        try:
+            result: dict = processing.result()
+        except Exception as e:
+            logger.error(f"Задание {job.id} рассылки {job.broadcast_id} не выполнено "
+                         f"(попытка {job.attempts + 1} из {MAX_JOB_ATTEMPTS}): {e!r}")
+            return failed_job_result(job, e)
+
+        logger.info(f"Задание {job.id} рассылки {job.broadcast_id}: доставлено {result['delivered']} "
+                    f"из {result['queued']}, пропущено {result['skipped']} из {result['total']} подписок")
+        return result
+
+
+def run_worker(token: str, config: WorkerConfig) -> None:
+    async def main() -> None:
+        worker = NotificationWorker(token, config)
+
+        loop = asyncio.get_running_loop()
+        for stop_signal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(stop_signal, worker.stop)
+            except NotImplementedError:
+                pass
+
+        await worker.run()
+
+    asyncio.run(main())
+
+
+def run_workers(token: str, config: WorkerConfig) -> None:
+    """Запускает config.processes рабочих процессов; один процесс работает прямо в текущем"""
+
+    if config.processes <= 1:
+        run_worker(token, config)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes: list = [
+        context.Process(target=run_worker, args=(token, config), name=f"notification-worker-{index}")
+        for index in range(config.processes)
+    ]
+
+    for process in processes:
+        process.start()
+
+    # Ctrl+C получает вся группа процессов, а SIGTERM родитель передаёт рабочим сам и дожидается их
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def stop_workers(*_) -> None:
+        for worker_process in processes:
+            worker_process.terminate()
+
+    signal.signal(signal.SIGTERM, stop_workers)
+    for process in processes:
+        process.join()
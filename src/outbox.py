@@ -0,0 +1,432 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+
+OUTBOX_PATH = "state/outbox.sqlite3"
+RETENTION_SECONDS = 7 * 24 * 60 * 60
+BUSY_TIMEOUT_MS = 5000
+# Сколько раз сообщение откладывается из-за сети или лимитов, прежде чем рассылка перестаёт его ждать
+MAX_DELIVERY_ATTEMPTS = 5
+
+DeliveryKey = tuple[int, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    collected_at REAL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    broadcast_id TEXT NOT NULL REFERENCES broadcasts (id) ON DELETE CASCADE,
+    chat_id INTEGER NOT NULL,
+    message_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    status INTEGER NOT NULL DEFAULT 0,
+    part INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (broadcast_id, chat_id, message_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS deliveries_pending ON deliveries (broadcast_id) WHERE status = 0;
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    broadcast_id TEXT NOT NULL REFERENCES broadcasts (id) ON DELETE CASCADE,
+    payload TEXT NOT NULL,
+    status INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    claimed_at REAL,
+    result TEXT,
+    page_key INTEGER,
+    updated_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    retry_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_open ON jobs (id) WHERE status != 2;
+"""
+
+# Столбцы, которых нет в журналах, созданных до дайджестов, пакетной постановки, повторов заданий и отправок
+# и отметки о собранных рассылках
+_ADDED_COLUMNS: tuple[tuple[str, str, str], ...] = (
+    ("deliveries", "part", "INTEGER NOT NULL DEFAULT 0"),
+    ("deliveries", "attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("broadcasts", "collected_at", "REAL"),
+    ("jobs", "page_key", "INTEGER"),
+    ("jobs", "updated_at", "REAL"),
+    ("jobs", "attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("jobs", "retry_at", "REAL"),
+)
+
+
+class DeliveryStatus(IntEnum):
+    PENDING = 0
+    DELIVERED = 1
+    FAILED = 2
+
+
+class JobStatus(IntEnum):
+    PENDING = 0
+    CLAIMED = 1
+    DONE = 2
+    # Задание поставлено, но рассылка ещё ставится: рабочие его не видят до publish_jobs
+    HELD = 3
+
+
+@dataclass(frozen=True)
+class BroadcastJob:
+    id: int
+    broadcast_id: str
+    payload: dict
+    # Сколько раз задание уже завершалось ошибкой
+    attempts: int = 0
+
+
+@dataclass(frozen=True)
+class Delivery:
+    chat_id: int
+    message_hash: str
+    text: str
+    part: int = 0
+
+    @property
+    def key(self) -> DeliveryKey:
+        return self.chat_id, self.message_hash
+
+
+def message_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def make_delivery(chat_id: int, text: str, part: int = 0) -> Delivery:
+    """part — номер сообщения в дайджесте чата: части отправляются и досылаются по порядку"""
+
+    return Delivery(chat_id=chat_id, message_hash=message_hash(text), text=text, part=part)
+
+
+class Outbox:
+    """
+    Журнал рассылок в SQLite (WAL): сообщение записывается до отправки и отмечается после,
+    поэтому после падения недоставленное можно дослать, не отправляя повторно уже доставленное.
+    Запросы короткие и выполняются прямо в событийном цикле: в режиме WAL с synchronous=NORMAL
+    коммит не ждёт fsync. Та же база служит очередью заданий для рабочих процессов рассылки.
+    """
+
+    instance = None
+    _path: str
+    _connection: Optional[sqlite3.Connection]
+    _lock: asyncio.Lock
+
+    def __new__(cls, path: Optional[str] = None):
+        if not cls.instance:
+            load_dotenv()
+            cls.instance = object.__new__(cls)
+            cls._path: str = path or os.getenv("BOT_OUTBOX_PATH", OUTBOX_PATH)
+            cls._connection: Optional[sqlite3.Connection] = None
+            cls._lock: asyncio.Lock = asyncio.Lock()
+
+        return cls.instance
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Рассылка и досылка не идут одновременно, чтобы одно сообщение не отправилось дважды"""
+
+        return self._lock
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory: str = os.path.dirname(os.path.abspath(self._path))
+            os.makedirs(directory, exist_ok=True)
+
+            connection = sqlite3.connect(self._path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(_SCHEMA)
+
+            for table, column, definition in _ADDED_COLUMNS:
+                columns: set[str] = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS jobs_page ON jobs (broadcast_id, page_key)")
+            self._connection = connection
+
+        return self._connection
+
+    def start_broadcast(self, broadcast_id: str) -> set[DeliveryKey]:
+        """
+        Открывает рассылку, пока не собранную по всем подпискам, и возвращает уже завершённые в ней отправки,
+        если она продолжается
+        """
+
+        connection: sqlite3.Connection = self._connect()
+        connection.execute(
+            "INSERT INTO broadcasts (id, created_at) VALUES (?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET finished_at = NULL, collected_at = NULL",
+            (broadcast_id, time.time())
+        )
+
+        rows = connection.execute(
+            "SELECT chat_id, message_hash FROM deliveries WHERE broadcast_id = ? AND status != ?",
+            (broadcast_id, DeliveryStatus.PENDING)
+        )
+        return {(chat_id, hash_value) for chat_id, hash_value in rows}
+
+    def completed(self, broadcast_id: str, chat_ids: Iterable[int]) -> set[DeliveryKey]:
+        """Завершённые отправки рассылки в указанные чаты"""
+
+        chats: list[int] = list(set(chat_ids))
+        if not chats:
+            return set()
+
+        placeholders: str = ",".join("?" * len(chats))
+        rows = self._connect().execute(
+            f"SELECT chat_id, message_hash FROM deliveries "
+            f"WHERE broadcast_id = ? AND status != ? AND chat_id IN ({placeholders})",
+            (broadcast_id, DeliveryStatus.PENDING, *chats)
+        )
+        return {(chat_id, hash_value) for chat_id, hash_value in rows}
+
+    def forget_completed(self, broadcast_id: str) -> None:
+        """
+        Забывает завершённые отправки рассылки перед новым проходом по ней: исправленное расписание
+        могут вернуть к уже разосланному виду, и такое сообщение должно уйти снова. Недоставленное остаётся.
+        """
+
+        self._connect().execute(
+            "DELETE FROM deliveries WHERE broadcast_id = ? AND status != ?", (broadcast_id, DeliveryStatus.PENDING)
+        )
+
+    def enqueue(self, broadcast_id: str, deliveries: Iterable[Delivery]) -> None:
+        """Записывает пачку отправок одной транзакцией; уже записанные пропускаются"""
+
+        connection: sqlite3.Connection = self._connect()
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR IGNORE INTO deliveries (broadcast_id, chat_id, message_hash, text, part) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((broadcast_id, delivery.chat_id, delivery.message_hash, delivery.text, delivery.part)
+                 for delivery in deliveries)
+            )
+
+    def mark(self, broadcast_id: str, key: DeliveryKey, status: DeliveryStatus) -> None:
+        chat_id, hash_value = key
+        self._connect().execute(
+            "UPDATE deliveries SET status = ? WHERE broadcast_id = ? AND chat_id = ? AND message_hash = ?",
+            (status, broadcast_id, chat_id, hash_value)
+        )
+
+    def defer(self, broadcast_id: str, key: DeliveryKey,
+              max_attempts: int = MAX_DELIVERY_ATTEMPTS) -> DeliveryStatus:
+        """
+        Отмечает неудачную попытку отправки, которую можно повторить. После max_attempts попыток сообщение
+        считается отклонённым, чтобы рассылка всё-таки завершилась. Возвращает новый статус сообщения.
+        """
+
+        chat_id, hash_value = key
+        row = self._connect().execute(
+            "UPDATE deliveries SET attempts = attempts + 1, "
+            "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE status END "
+            "WHERE broadcast_id = ? AND chat_id = ? AND message_hash = ? RETURNING status",
+            (max_attempts, DeliveryStatus.FAILED, broadcast_id, chat_id, hash_value)
+        ).fetchone()
+        return DeliveryStatus(row[0]) if row is not None else DeliveryStatus.PENDING
+
+    def pending_count(self, broadcast_id: str) -> int:
+        """Сколько сообщений рассылки ещё не доставлено и не отклонено Telegram"""
+
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM deliveries WHERE broadcast_id = ? AND status = ?",
+            (broadcast_id, DeliveryStatus.PENDING)
+        ).fetchone()
+        return row[0]
+
+    def finish_broadcast(self, broadcast_id: str) -> None:
+        connection: sqlite3.Connection = self._connect()
+        now: float = time.time()
+
+        with connection:
+            connection.execute("BEGIN")
+            connection.execute("UPDATE broadcasts SET finished_at = ? WHERE id = ?", (now, broadcast_id))
+            connection.execute("DELETE FROM jobs WHERE broadcast_id = ?", (broadcast_id,))
+            connection.execute("DELETE FROM broadcasts WHERE created_at < ? AND finished_at IS NOT NULL",
+                               (now - RETENTION_SECONDS,))
+
+    def mark_collected(self, broadcast_id: str) -> None:
+        """Все сообщения рассылки записаны в журнал: осталось только дослать недоставленное"""
+
+        self._connect().execute("UPDATE broadcasts SET collected_at = ? WHERE id = ?", (time.time(), broadcast_id))
+
+    def is_collected(self, broadcast_id: str) -> bool:
+        row = self._connect().execute("SELECT collected_at FROM broadcasts WHERE id = ?", (broadcast_id,)).fetchone()
+        return row is not None and row[0] is not None
+
+    def unfinished_broadcasts(self) -> list[str]:
+        """Рассылки, не дошедшие до finish_broadcast, в порядке создания, даже если в них нечего досылать"""
+
+        rows = self._connect().execute("SELECT id FROM broadcasts WHERE finished_at IS NULL ORDER BY created_at")
+        return [broadcast_id for broadcast_id, in rows]
+
+    def unfinished(self) -> dict[str, list[Delivery]]:
+        """Недоставленные сообщения незавершённых рассылок, по рассылкам в порядке создания"""
+
+        rows = self._connect().execute(
+            "SELECT d.broadcast_id, d.chat_id, d.message_hash, d.text, d.part FROM deliveries d "
+            "JOIN broadcasts b ON b.id = d.broadcast_id "
+            "WHERE b.finished_at IS NULL AND d.status = ? ORDER BY b.created_at, d.chat_id, d.part",
+            (DeliveryStatus.PENDING,)
+        )
+
+        broadcasts: dict[str, list[Delivery]] = {}
+        for broadcast_id, chat_id, hash_value, text, part in rows:
+            broadcasts.setdefault(broadcast_id, []).append(Delivery(chat_id, hash_value, text, part))
+        return broadcasts
+
+    # region Broadcast jobs
+    def submit_jobs(self, broadcast_id: str, jobs: Iterable[tuple[int, dict]]) -> int:
+        """
+        Ставит пачку заданий рассылки одной транзакцией. Задания придерживаются, пока publish_jobs не откроет
+        всю рассылку разом: рабочие не увидят половину рассылки, даже если бот упадёт между пачками.
+        page_key — первый чат страницы подписок; повторная постановка той же страницы пропускается.
+        Возвращает число новых заданий.
+        """
+
+        connection: sqlite3.Connection = self._connect()
+        now: float = time.time()
+
+        with connection:
+            connection.execute("BEGIN")
+            cursor: sqlite3.Cursor = connection.executemany(
+                "INSERT OR IGNORE INTO jobs (broadcast_id, page_key, payload, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((broadcast_id, page_key, json.dumps(payload, ensure_ascii=False), JobStatus.HELD, now)
+                 for page_key, payload in jobs)
+            )
+        return cursor.rowcount
+
+    def publish_jobs(self, broadcast_id: str) -> int:
+        """Открывает рабочим придержанные задания рассылки; возвращает число её невыполненных заданий"""
+
+        connection: sqlite3.Connection = self._connect()
+
+        with connection:
+            connection.execute("BEGIN")
+            connection.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE broadcast_id = ? AND status = ?",
+                (JobStatus.PENDING, time.time(), broadcast_id, JobStatus.HELD)
+            )
+            row = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE broadcast_id = ? AND status != ?", (broadcast_id, JobStatus.DONE)
+            ).fetchone()
+        return row[0]
+
+    def claim_job(self, worker: str, claim_timeout: float) -> Optional[BroadcastJob]:
+        """
+        Забирает самое старое свободное задание. Задание, чей процесс больше claim_timeout секунд
+        не продлевал его через extend_claim, считается брошенным и выдаётся снова. Возвращённое после ошибки
+        задание ждёт своего retry_at.
+        """
+
+        now: float = time.time()
+        row = self._connect().execute(
+            "UPDATE jobs SET status = ?, worker = ?, claimed_at = ?, updated_at = ? WHERE id = ("
+            "SELECT id FROM jobs WHERE (status = ? AND (retry_at IS NULL OR retry_at <= ?)) "
+            "OR (status = ? AND claimed_at < ?) ORDER BY id LIMIT 1"
+            ") RETURNING id, broadcast_id, payload, attempts",
+            (JobStatus.CLAIMED, worker, now, now, JobStatus.PENDING, now, JobStatus.CLAIMED, now - claim_timeout)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        job_id, broadcast_id, payload, attempts = row
+        return BroadcastJob(id=job_id, broadcast_id=broadcast_id, payload=json.loads(payload), attempts=attempts)
+
+    def extend_claim(self, job_id: int, worker: str) -> bool:
+        """Продлевает взятое задание; False, если его уже выдали другому процессу"""
+
+        now: float = time.time()
+        cursor: sqlite3.Cursor = self._connect().execute(
+            "UPDATE jobs SET claimed_at = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (now, now, job_id, worker, JobStatus.CLAIMED)
+        )
+        return cursor.rowcount > 0
+
+    def complete_job(self, job_id: int, worker: str, result: dict) -> bool:
+        """Записывает результат задания, если оно всё ещё у этого процесса"""
+
+        cursor: sqlite3.Cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (JobStatus.DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id, worker, JobStatus.CLAIMED)
+        )
+        return cursor.rowcount > 0
+
+    def clear_jobs(self, broadcast_id: str) -> None:
+        """Удаляет выполненные задания рассылки, не завершая её: недоставленное ещё будет дослано"""
+
+        self._connect().execute("DELETE FROM jobs WHERE broadcast_id = ?", (broadcast_id,))
+
+    def release_job(self, job_id: int, worker: str, retry_delay: float) -> bool:
+        """Возвращает задание, завершившееся ошибкой, в очередь не раньше чем через retry_delay секунд"""
+
+        now: float = time.time()
+        cursor: sqlite3.Cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, worker = NULL, attempts = attempts + 1, retry_at = ?, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (JobStatus.PENDING, now + retry_delay, now, job_id, worker, JobStatus.CLAIMED)
+        )
+        return cursor.rowcount > 0
+
+    def open_jobs(self, broadcast_id: Optional[str] = None, republish: Optional[bool] = None) -> int:
+        """
+        Задания, которые рабочие ещё должны выполнить; придержанные задания недопоставленной рассылки не в счёт.
+        С broadcast_id — только задания этой рассылки, с republish — только повторные сборки или только новые даты.
+        """
+
+        query: str = "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)"
+        params: list = [JobStatus.PENDING, JobStatus.CLAIMED]
+        if broadcast_id is not None:
+            query += " AND broadcast_id = ?"
+            params.append(broadcast_id)
+        if republish is not None:
+            query += " AND coalesce(json_extract(payload, '$.republish'), 0) = ?"
+            params.append(int(republish))
+
+        row = self._connect().execute(query, params).fetchone()
+        return row[0]
+
+    def idle_seconds(self) -> Optional[float]:
+        """Сколько секунд назад задание ставили, брали, продлевали или завершали; None, если заданий нет"""
+
+        row = self._connect().execute("SELECT MAX(updated_at) FROM jobs").fetchone()
+        return None if row[0] is None else time.time() - row[0]
+
+    def completed_jobs(self) -> dict[str, list[dict]]:
+        """Результаты заданий рассылок, у которых выполнены все задания, по рассылкам в порядке создания"""
+
+        rows = self._connect().execute(
+            "SELECT j.broadcast_id, j.result FROM jobs j JOIN broadcasts b ON b.id = j.broadcast_id "
+            "WHERE b.finished_at IS NULL AND NOT EXISTS ("
+            "SELECT 1 FROM jobs o WHERE o.broadcast_id = j.broadcast_id AND o.status != ?"
+            ") ORDER BY b.created_at, j.id",
+            (JobStatus.DONE,)
+        )
+
+        broadcasts: dict[str, list[dict]] = {}
+        for broadcast_id, result in rows:
+            broadcasts.setdefault(broadcast_id, []).append(json.loads(result))
+        return broadcasts
+    # endregion
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
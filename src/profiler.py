@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from types import FrameType
+from typing import Optional
+
+from src.logger_config import logger
+
+PROFILE_DIRECTORY = "profiles"
+SAMPLE_INTERVAL = 0.005
+MAX_PROFILE_SECONDS = 300
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame: Optional[FrameType]) -> str:
+    names: list[str] = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Снимает стек потока событийного цикла из отдельного потока каждые interval секунд.
+    Результат пишется в свёрнутом формате стеков («кадр;кадр;кадр число»), который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIRECTORY, interval: float = SAMPLE_INTERVAL) -> None:
+        self._directory: str = directory
+        self._interval: float = interval
+        self._samples: Counter[str] = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._started_at: float = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            raise RuntimeError("Профилирование уже идёт")
+
+        target_id: int = threading.get_ident()
+        self._samples = Counter()
+        self._stop_event.clear()
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._sample, args=(target_id,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info("Профилирование событийного цикла запущено")
+
+    def _sample(self, target_id: int) -> None:
+        while not self._stop_event.wait(self._interval):
+            frame: Optional[FrameType] = sys._current_frames().get(target_id)
+            if frame is not None:
+                self._samples[_collapse(frame)] += 1
+
+    async def stop(self) -> str:
+        """Останавливает профилирование и записывает профиль на диск; возвращает путь к файлу"""
+
+        if self._thread is None:
+            raise RuntimeError("Профилирование не запущено")
+
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        await asyncio.to_thread(thread.join)
+
+        duration: float = time.monotonic() - self._started_at
+        path: str = os.path.join(self._directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}.txt")
+        lines: str = "".join(f"{stack} {count}\n" for stack, count in self._samples.most_common())
+        await asyncio.to_thread(self._write, path, lines)
+
+        logger.info(f"Профиль за {duration:.1f} с. ({sum(self._samples.values())} снимков) записан в {path}")
+        return path
+
+    def _write(self, path: str, lines: str) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(lines)
+
+    async def profile(self, seconds: float) -> str:
+        self.start()
+        try:
+            await asyncio.sleep(min(seconds, MAX_PROFILE_SECONDS))
+        finally:
+            path: str = await self.stop()
+        return path
+
+    async def toggle(self) -> Optional[str]:
+        """Запускает профилирование или, если оно уже идёт, останавливает и записывает профиль"""
+
+        if self.running:
+            return await self.stop()
+
+        self.start()
+        return None
@@ -0,0 +1,164 @@
+import random
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+MINUTES_PER_DAY = 24 * 60
+PUBLISH_HISTORY = 14
+
+# Окно публикации в минутах от начала суток: (начало, конец), конец может быть меньше начала при переходе через полночь
+PublishWindow = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class PollConfig:
+    fast_interval: float = 2 * 60
+    slow_interval: float = 30 * 60
+    max_backoff: float = 30 * 60
+    windows: tuple[PublishWindow, ...] = ()
+    learned_margin: int = 45
+    # Периодическая перепроверка содержимого включается явно: переопубликование обычно видно по дате расписания
+    content_interval: float = 0
+    content_after_publish: float = 3 * 60 * 60
+    content_targets: int = 20
+
+
+def parse_windows(value: str) -> tuple[PublishWindow, ...]:
+    """Разбирает строку вида "17:00-21:30,07:00-08:00" в окна публикации"""
+
+    windows: list[PublishWindow] = []
+
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        start, _, end = part.partition("-")
+        windows.append((_parse_minute(start), _parse_minute(end)))
+
+    return tuple(windows)
+
+
+def _parse_minute(value: str) -> int:
+    hours, _, minutes = value.strip().partition(":")
+    minute: int = int(hours) * 60 + int(minutes or 0)
+
+    if not 0 <= minute <= MINUTES_PER_DAY:
+        raise ValueError(f"Неправильное время окна публикации: {value!r}")
+
+    return minute % MINUTES_PER_DAY
+
+
+def _minute_of_day(moment: datetime) -> float:
+    return moment.hour * 60 + moment.minute + moment.second / 60
+
+
+class PollScheduler:
+    """
+    Подбирает паузу до следующей проверки даты расписания: часто в окна публикации
+    (заданные и выученные по прошлым публикациям), редко в остальное время,
+    с экспоненциальной паузой и разбросом после ошибок.
+    """
+
+    def __init__(self, config: PollConfig = PollConfig(), publish_minutes: Iterable[int] = ()) -> None:
+        self._config: PollConfig = config
+        self._publish_minutes: deque[int] = deque(publish_minutes, maxlen=PUBLISH_HISTORY)
+        self._errors: int = 0
+        self._window_active: Optional[bool] = None
+        self._content_checked_at: Optional[datetime] = None
+        self._published_at: Optional[datetime] = None
+
+    @property
+    def publish_minutes(self) -> list[int]:
+        return list(self._publish_minutes)
+
+    @property
+    def content_targets(self) -> int:
+        return self._config.content_targets
+
+    @property
+    def errors(self) -> int:
+        return self._errors
+
+    def record_publish(self, moment: datetime) -> None:
+        self._publish_minutes.append(int(_minute_of_day(moment)))
+        self._published_at = moment
+
+    def record_success(self) -> None:
+        self._errors = 0
+
+    def record_error(self) -> None:
+        self._errors += 1
+
+    def content_check_due(self, moment: datetime) -> bool:
+        """
+        Пора ли перепроверить расписания той же даты: их переопубликовывают с исправлениями, обычно в окна
+        публикации или в первые часы после неё, поэтому в остальное время содержимое не проверяется.
+        С content_interval <= 0 перепроверка выключена.
+        """
+
+        config: PollConfig = self._config
+        if config.content_interval <= 0:
+            return False
+
+        checked_at: Optional[datetime] = self._content_checked_at
+        if checked_at is not None and (moment - checked_at).total_seconds() < config.content_interval:
+            return False
+
+        published_at: Optional[datetime] = self._published_at
+        if published_at is not None and (moment - published_at).total_seconds() < config.content_after_publish:
+            return True
+
+        return self.in_window(moment)
+
+    def record_content_check(self, moment: datetime) -> None:
+        self._content_checked_at = moment
+
+    def windows(self) -> list[PublishWindow]:
+        margin: int = self._config.learned_margin
+        learned: list[PublishWindow] = [
+            ((minute - margin) % MINUTES_PER_DAY, (minute + margin) % MINUTES_PER_DAY)
+            for minute in self._publish_minutes
+        ]
+        return [*self._config.windows, *learned]
+
+    def _minutes_until_window(self, moment: datetime) -> float:
+        """Сколько минут до ближайшего окна публикации; 0, если окно уже идёт"""
+
+        now: float = _minute_of_day(moment)
+        nearest: float = MINUTES_PER_DAY
+
+        for start, end in self.windows():
+            inside: bool = start <= now < end if start <= end else (now >= start or now < end)
+            if inside:
+                return 0
+            nearest = min(nearest, (start - now) % MINUTES_PER_DAY)
+
+        return nearest
+
+    def in_window(self, moment: datetime) -> bool:
+        return self._minutes_until_window(moment) == 0
+
+    def window_changed(self, moment: datetime) -> Optional[bool]:
+        """Новое значение in_window, если оно изменилось с прошлого вызова, иначе None"""
+
+        active: bool = self.in_window(moment)
+        if active == self._window_active:
+            return None
+
+        self._window_active = active
+        return active
+
+    def next_delay(self, moment: datetime) -> float:
+        config: PollConfig = self._config
+
+        if self._errors:
+            backoff: float = min(config.max_backoff, config.fast_interval * 2 ** (self._errors - 1))
+            return random.uniform(backoff / 2, backoff)
+
+        if self.in_window(moment):
+            return config.fast_interval
+
+        until_window: float = self._minutes_until_window(moment) * 60
+        return max(config.fast_interval, min(config.slow_interval, until_window))
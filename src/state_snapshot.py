@@ -0,0 +1,182 @@
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from src.api_communicator import ApiCommunicator
+from src.logger_config import logger
+from src.utils.directory import Directory, build_directory
+from src.utils.schedule import ScheduleKind, ScheduleTarget
+
+STATE_PATH = "state/bot_state.json"
+STATE_VERSION = 3
+# В первой версии отпечатки расписаний не содержали даты, во второй зависели от порядка занятий;
+# такие отпечатки отбрасываются, остальное состояние совместимо
+COMPATIBLE_VERSIONS = (1, 2, STATE_VERSION)
+
+
+def _target_key(target: ScheduleTarget) -> str:
+    return f"{target.kind}:{target.name}"
+
+
+def _parse_target_key(key: str) -> ScheduleTarget:
+    kind, _, name = key.partition(":")
+    return ScheduleTarget(ScheduleKind(kind), name)
+
+
+def _directory_loaded_at(saved: Optional[float]) -> float:
+    """
+    Время загрузки справочника по часам time.monotonic из сохранённого времени по настенным часам.
+    Справочник без сохранённого времени считается устаревшим и обновится при первом обращении.
+    """
+
+    if saved is None:
+        return -math.inf
+    return time.monotonic() - max(0.0, time.time() - saved)
+
+
+def _directory_saved_at(directory: Optional[Directory]) -> Optional[int]:
+    """Время загрузки справочника по настенным часам; секунды, чтобы дрожание часов не меняло файл при каждой записи"""
+
+    if directory is None or math.isinf(directory.loaded_at):
+        return None
+    return round(time.time() - (time.monotonic() - directory.loaded_at))
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    """Пишет файл во временный рядом и переименовывает, чтобы при падении не остался обрезанный файл"""
+
+    directory: str = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class StateSnapshot:
+    """
+    Состояние, переживающее перезапуск: последняя увиденная дата расписания, справочник групп
+    и преподавателей, хэши расписаний по целям и время прошлых публикаций.
+    """
+
+    instance = None
+    _path: str
+    _target_hashes: dict[ScheduleTarget, str]
+    _publish_minutes: list[int]
+    _last_written: Optional[bytes]
+
+    def __new__(cls, path: Optional[str] = None):
+        if not cls.instance:
+            load_dotenv()
+            cls.instance = object.__new__(cls)
+            cls._path: str = path or os.getenv("BOT_STATE_PATH", STATE_PATH)
+            cls._target_hashes: dict[ScheduleTarget, str] = {}
+            cls._publish_minutes: list[int] = []
+            cls._last_written: Optional[bytes] = None
+
+        return cls.instance
+
+    def get_hash(self, target: ScheduleTarget) -> Optional[str]:
+        return self._target_hashes.get(target)
+
+    def set_hash(self, target: ScheduleTarget, fingerprint: str) -> None:
+        self._target_hashes[target] = fingerprint
+
+    def targets_sent_on(self, schedule_date: str) -> list[ScheduleTarget]:
+        """Цели, которые рассылались (или не смогли разослаться) за эту дату"""
+
+        prefix: str = f"{schedule_date}:"
+        return [target for target, fingerprint in self._target_hashes.items() if fingerprint.startswith(prefix)]
+
+    @property
+    def publish_minutes(self) -> list[int]:
+        return list(self._publish_minutes)
+
+    def set_publish_minutes(self, minutes: list[int]) -> None:
+        self._publish_minutes = list(minutes)
+
+    def load(self) -> bool:
+        try:
+            with open(self._path, "rb") as file:
+                data: dict = json.load(file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось прочитать сохранённое состояние {self._path}: {e!r}")
+            return False
+
+        version: Optional[int] = data.get("version")
+        if version not in COMPATIBLE_VERSIONS:
+            return False
+
+        schedule_date_str: Optional[str] = data.get("schedule_date")
+        schedule_date: Optional[datetime] = (
+            datetime.strptime(schedule_date_str, "%Y-%m-%d") if schedule_date_str else None
+        )
+
+        directory: Optional[Directory] = None
+        if data.get("groups") or data.get("teachers"):
+            directory = replace(build_directory(data.get("groups", []), data.get("teachers", [])),
+                                loaded_at=_directory_loaded_at(data.get("directory_loaded_at")))
+
+        target_hashes: dict[str, str] = data.get("target_hashes", {}) if version == STATE_VERSION else {}
+        self._target_hashes = {_parse_target_key(key): value for key, value in target_hashes.items()}
+        self._publish_minutes = [int(minute) for minute in data.get("publish_minutes", [])]
+
+        ApiCommunicator().restore(schedule_date, directory)
+        logger.info(f"Состояние восстановлено из {self._path}: дата {schedule_date_str}, "
+                    f"{len(self._target_hashes)} хэшей расписаний")
+        return True
+
+    def _serialize(self) -> bytes:
+        api = ApiCommunicator()
+        directory: Optional[Directory] = api.directory
+
+        data: dict = {
+            "version": STATE_VERSION,
+            "schedule_date": api.schedule_date.strftime("%Y-%m-%d") if api.schedule_date else None,
+            "groups": sorted(directory.groups) if directory else [],
+            "teachers": sorted(directory.teachers) if directory else [],
+            "directory_loaded_at": _directory_saved_at(directory),
+            "target_hashes": {_target_key(target): value for target, value in sorted(self._target_hashes.items())},
+            "publish_minutes": self._publish_minutes,
+        }
+        return json.dumps(data, ensure_ascii=False, indent=1).encode()
+
+    def save(self) -> None:
+        data: bytes = self._serialize()
+
+        if data == self._last_written:
+            return
+
+        write_atomically(self._path, data)
+        self._last_written = data
+
+    async def save_async(self) -> None:
+        data: bytes = self._serialize()
+
+        if data == self._last_written:
+            return
+
+        try:
+            await asyncio.to_thread(write_atomically, self._path, data)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить состояние в {self._path}: {e!r}")
+            return
+
+        self._last_written = data
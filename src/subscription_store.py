@@ -0,0 +1,147 @@
+from collections import defaultdict
+from typing import Optional
+
+from telegram.ext import Application, ContextTypes
+
+from src.database import Database, ScheduleSubscription
+from src.logger_config import logger
+from src.utils.schedule import SubGroup
+
+SUBSCRIPTIONS_RESYNC_MINUTES = 60
+
+
+class SubscriptionStore:
+    """
+    Копия таблицы подписок в памяти поверх Database. Чтение идёт из памяти,
+    запись сначала в базу, затем в копию.
+    """
+
+    instance = None
+    _database: Database
+    _subscriptions: dict[int, list[ScheduleSubscription]]
+    _loaded: bool
+    _write_logs: list[list[tuple[bool, ScheduleSubscription]]]
+
+    def __new__(cls):
+        if not cls.instance:
+            cls.instance = object.__new__(cls)
+            cls._database: Database = Database()
+            cls._subscriptions: dict[int, list[ScheduleSubscription]] = {}
+            cls._loaded: bool = False
+            cls._write_logs: list[list[tuple[bool, ScheduleSubscription]]] = []
+
+        return cls.instance
+
+    def _record_write(self, added: bool, subscription: ScheduleSubscription) -> None:
+        for write_log in self._write_logs:
+            write_log.append((added, subscription))
+
+    async def load(self) -> None:
+        """
+        Заменяет копию подписками из базы. Подписки, созданные и удалённые, пока шло чтение,
+        могли в него не попасть, поэтому они повторяются поверх прочитанного.
+        """
+
+        write_log: list[tuple[bool, ScheduleSubscription]] = []
+        self._write_logs.append(write_log)
+        try:
+            subscriptions: list[ScheduleSubscription] = await self._database.get_all_schedule_subscriptions()
+        finally:
+            self._write_logs.remove(write_log)
+
+        by_chat: dict[int, list[ScheduleSubscription]] = defaultdict(list)
+        for subscription in sorted(subscriptions, key=lambda s: s.id):
+            by_chat[subscription.chat_id].append(subscription)
+
+        for added, subscription in write_log:
+            chat_subscriptions: list[ScheduleSubscription] = [
+                s for s in by_chat.get(subscription.chat_id, []) if s.id != subscription.id
+            ]
+            if added:
+                chat_subscriptions.append(subscription)
+                chat_subscriptions.sort(key=lambda s: s.id)
+            by_chat[subscription.chat_id] = chat_subscriptions
+
+        self._subscriptions = dict(by_chat)
+        self._loaded = True
+        logger.info(f"Загружено {len(subscriptions)} подписок для {len(by_chat)} чатов")
+
+    async def get_schedule_subscriptions(self, chat_id: int) -> tuple[list[ScheduleSubscription], int]:
+        if not self._loaded and chat_id not in self._subscriptions:
+            subscriptions, _ = await self._database.get_schedule_subscriptions(chat_id)
+            self._subscriptions[chat_id] = subscriptions
+
+        subscriptions: list[ScheduleSubscription] = list(self._subscriptions.get(chat_id, []))
+        return subscriptions, len(subscriptions)
+
+    async def make_subscription(self, chat_id: int, group_name: Optional[str] = None, teacher_name: Optional[str] = None,
+                                sub_group: SubGroup = SubGroup.BOTH) -> Optional[ScheduleSubscription]:
+        created: Optional[ScheduleSubscription] = await self._database.make_subscription(
+            chat_id, group_name, teacher_name, sub_group
+        )
+
+        if created is not None:
+            self._record_write(True, created)
+            if self._loaded or chat_id in self._subscriptions:
+                self._subscriptions.setdefault(chat_id, []).append(created)
+
+        return created
+
+    async def remove_subscription(self, subscription: ScheduleSubscription) -> bool:
+        deleted: bool = await self._database.remove_subscription(subscription.id)
+        self._record_write(False, subscription)
+
+        chat_subscriptions: list[ScheduleSubscription] = self._subscriptions.get(subscription.chat_id, [])
+        self._subscriptions[subscription.chat_id] = [s for s in chat_subscriptions if s.id != subscription.id]
+
+        return deleted
+
+    async def remove_chat(self, chat_id: int) -> int:
+        subscriptions, _ = await self.get_schedule_subscriptions(chat_id)
+
+        removed: int = 0
+        for subscription in subscriptions:
+            removed += await self.remove_subscription(subscription)
+
+        return removed
+
+    async def move_chat(self, chat_id: int, new_chat_id: int) -> int:
+        moved: list[ScheduleSubscription] = await self._database.move_chat(chat_id, new_chat_id)
+
+        for subscription in self._subscriptions.pop(chat_id, []):
+            self._record_write(False, subscription)
+        for subscription in moved:
+            self._record_write(True, subscription)
+
+        if self._loaded or new_chat_id in self._subscriptions:
+            moved_ids: set[int] = {subscription.id for subscription in moved}
+            chat_subscriptions: list[ScheduleSubscription] = [
+                s for s in self._subscriptions.get(new_chat_id, []) if s.id not in moved_ids
+            ]
+            self._subscriptions[new_chat_id] = sorted([*chat_subscriptions, *moved], key=lambda s: s.id)
+
+        return len(moved)
+
+
+async def _resync_subscriptions(_: ContextTypes.DEFAULT_TYPE) -> None:
+    try:
+        await SubscriptionStore().load()
+    except Exception as e:
+        logger.error(f"Не удалось синхронизировать подписки с базой: {e!r}")
+
+
+async def start_subscription_store(app: Application, minutes: int = SUBSCRIPTIONS_RESYNC_MINUTES) -> None:
+    """Загружает все подписки при запуске и, если minutes > 0, периодически сверяет копию с базой"""
+
+    try:
+        await SubscriptionStore().load()
+    except Exception as e:
+        logger.error(f"Не удалось загрузить подписки, чаты будут подгружаться по одному: {e!r}")
+
+    if minutes > 0 and app.job_queue is not None:
+        app.job_queue.run_repeating(
+            callback=_resync_subscriptions,
+            interval=minutes * 60,
+            first=minutes * 60,
+            name="subscriptions_resync"
+        )
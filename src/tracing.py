@@ -0,0 +1,112 @@
+import json
+import secrets
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, Optional
+
+from telegram import Update
+
+from src.logger_config import logger, trace_id_var
+
+SLOW_UPDATE_SECONDS = 2.0
+MAX_SPANS = 200
+
+
+@dataclass
+class Span:
+    name: str
+    offset: float
+    duration: float = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    kind: str
+    chat_id: Optional[int]
+    started: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+    dropped: int = 0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> dict:
+        """Разбор времени обновления: общая длительность и по каждому вызову, в миллисекундах"""
+
+        return {
+            "trace_id": self.trace_id,
+            "kind": self.kind,
+            "chat_id": self.chat_id,
+            "total_ms": round(self.elapsed() * 1000, 1),
+            "spans": [
+                {"name": span.name, "at_ms": round(span.offset * 1000, 1), "ms": round(span.duration * 1000, 1),
+                 **({"error": span.error} if span.error else {})}
+                for span in self.spans
+            ],
+            **({"dropped_spans": self.dropped} if self.dropped else {}),
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Отрезок времени внутри текущего обновления; вне обновления ничего не записывает"""
+
+    trace: Optional[Trace] = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    started: float = time.perf_counter()
+    record = Span(name=name, offset=started - trace.started)
+    if len(trace.spans) < MAX_SPANS:
+        trace.spans.append(record)
+    else:
+        trace.dropped += 1
+
+    try:
+        yield
+    except Exception as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        record.duration = time.perf_counter() - started
+
+
+def _update_kind(update: Update) -> str:
+    for kind in ("message", "inline_query", "callback_query", "edited_message", "my_chat_member"):
+        if getattr(update, kind, None) is not None:
+            return kind
+    return "other"
+
+
+class UpdateTracer:
+    """Присваивает каждому обновлению trace_id и пишет в лог разбор времени медленных обновлений"""
+
+    def __init__(self, slow_threshold: float = SLOW_UPDATE_SECONDS) -> None:
+        self._slow_threshold: float = slow_threshold
+
+    @asynccontextmanager
+    async def trace(self, update: object) -> AsyncIterator[Optional[Trace]]:
+        if not isinstance(update, Update):
+            yield None
+            return
+
+        chat_id: Optional[int] = update.effective_chat.id if update.effective_chat is not None else None
+        trace = Trace(trace_id=secrets.token_hex(8), kind=_update_kind(update), chat_id=chat_id)
+        token = _current_trace.set(trace)
+        id_token = trace_id_var.set(trace.trace_id)
+
+        try:
+            yield trace
+        finally:
+            if trace.elapsed() >= self._slow_threshold:
+                logger.warning(f"Медленное обновление: {json.dumps(trace.breakdown(), ensure_ascii=False)}")
+            trace_id_var.reset(id_token)
+            _current_trace.reset(token)
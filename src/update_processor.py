@@ -0,0 +1,80 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from src.tracing import UpdateTracer, span
+
+CONCURRENT_UPDATES = 64
+
+
+def _ordering_key(update: object) -> Optional[int]:
+    if not isinstance(update, Update):
+        return None
+
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+
+    if update.effective_user is not None:
+        return update.effective_user.id
+
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает обновления разных чатов параллельно, а обновления одного чата строго по очереди,
+    чтобы переходы ConversationHandler не перемешивались.
+    """
+
+    def __init__(self, max_concurrent_updates: int = CONCURRENT_UPDATES,
+                 tracer: Optional[UpdateTracer] = None) -> None:
+        super().__init__(max_concurrent_updates)
+        self._chat_locks: dict[int, tuple[asyncio.Lock, int]] = {}
+        self._tracer: UpdateTracer = tracer or UpdateTracer()
+
+    @asynccontextmanager
+    async def _chat_turn(self, key: int) -> AsyncIterator[None]:
+        lock, users = self._chat_locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._chat_locks[key] = (lock, users + 1)
+
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._chat_locks[key]
+            if users == 1:
+                del self._chat_locks[key]
+            else:
+                self._chat_locks[key] = (lock, users - 1)
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._chat_locks)
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key: Optional[int] = _ordering_key(update)
+
+        # Трассировка начинается до ожидания очереди: время до отрезка handlers — это ожидание
+        async with self._tracer.trace(update):
+            if key is None:
+                await super().process_update(update, coroutine)
+                return
+
+            # Очередь чата ждём до семафора, чтобы ожидающие обновления одного чата не занимали общие слоты
+            async with self._chat_turn(key):
+                await super().process_update(update, coroutine)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        with span("handlers"):
+            await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -1,13 +1,16 @@
 from telegram import Update, ReplyKeyboardMarkup
 
-from src.database import Database, MAX_SUBSCRIPTION_COUNT
+from src.utils.limits import MAX_SUBSCRIPTION_COUNT
 from src.utils.schedule import ButtonVariants
 
 
 async def default_keyboard(update: Update) -> ReplyKeyboardMarkup:
-    database = Database()
+    # Хранилище подписок тянет клиент Supabase: импорт здесь, чтобы модули src.utils обходились без него
+    from src.subscription_store import SubscriptionStore
+
+    store = SubscriptionStore()
     chat_id = update.effective_chat.id
-    subscription, count = await database.get_schedule_subscriptions(chat_id)
+    subscription, count = await store.get_schedule_subscriptions(chat_id)
 
     keyboard: list[list[str]] = [
         [ButtonVariants.GROUP_SCHEDULE],
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total: int = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache(Generic[K, V]):
+    """LRU-кэш с ограничением и по числу записей, и по примерному объёму памяти"""
+
+    def __init__(self, max_entries: int, max_size: int, sizeof: Callable[[V], int] = lambda _: 1) -> None:
+        self._max_entries: int = max_entries
+        self._max_size: int = max_size
+        self._sizeof: Callable[[V], int] = sizeof
+        self._data: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def get(self, key: K) -> Optional[V]:
+        entry: Optional[tuple[V, int]] = self._data.get(key)
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        size: int = self._sizeof(value)
+
+        if size > self._max_size:
+            return
+
+        self.pop(key)
+        self._data[key] = (value, size)
+        self.stats.size += size
+        self.stats.entries = len(self._data)
+
+        while len(self._data) > self._max_entries or self.stats.size > self._max_size:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.stats.size -= evicted_size
+            self.stats.evictions += 1
+            self.stats.entries = len(self._data)
+
+    def pop(self, key: K) -> Optional[V]:
+        entry: Optional[tuple[V, int]] = self._data.pop(key, None)
+
+        if entry is None:
+            return None
+
+        self.stats.size -= entry[1]
+        self.stats.entries = len(self._data)
+        return entry[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.stats.size = 0
+        self.stats.entries = 0
@@ -0,0 +1,67 @@
+import time
+from enum import StrEnum
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Размыкается после failure_threshold ошибок подряд и reset_timeout секунд не пропускает запросы.
+    Затем пропускает один пробный запрос: успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self._failure_threshold: int = failure_threshold
+        self._reset_timeout: float = reset_timeout
+        self._failures: int = 0
+        self._opened_at: float = 0
+        self._state: CircuitState = CircuitState.CLOSED
+        self._probing: bool = False
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+        return self._state
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    def allow(self) -> bool:
+        state: CircuitState = self.state
+
+        if state == CircuitState.CLOSED:
+            return True
+
+        if state == CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        self._state = CircuitState.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+
+        if self._state == CircuitState.HALF_OPEN or self._failures >= self._failure_threshold:
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Возвращает право на пробный запрос, если он был отменён, не дав ответа"""
+
+        self._probing = False
@@ -0,0 +1,55 @@
+from src.utils.schedule import NO_SCHEDULE, ScheduleGroup
+
+MESSAGE_LIMIT = 4096
+SECTION_SEPARATOR = "\n"
+
+
+def _cut(text: str, limit: int) -> list[str]:
+    return [text[start:start + limit] for start in range(0, len(text), limit)]
+
+
+def build_digest(schedules: list[ScheduleGroup], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """
+    Собирает расписания одного чата в как можно меньшее число сообщений не длиннее limit символов.
+    Сообщения делятся только между занятиями; продолжение расписания в следующем сообщении
+    начинается с его заголовка.
+    """
+
+    messages: list[str] = []
+    parts: list[str] = []
+    length: int = 0
+
+    def flush() -> None:
+        nonlocal parts, length
+        if parts:
+            messages.append("".join(parts))
+        parts, length = [], 0
+
+    for schedule in schedules:
+        header: str = schedule.schedule_header
+        blocks: tuple[str, ...] = schedule.lesson_blocks or (f"{NO_SCHEDULE}\n",)
+
+        if parts and length + len(SECTION_SEPARATOR) + len(header) + len(blocks[0]) > limit:
+            flush()
+        if parts:
+            parts.append(SECTION_SEPARATOR)
+            length += len(SECTION_SEPARATOR)
+
+        parts.append(header)
+        length += len(header)
+        placed: int = 0
+
+        for block in blocks:
+            if placed and length + len(block) > limit:
+                flush()
+                parts.append(header)
+                length = len(header)
+
+            parts.append(block)
+            length += len(block)
+            placed += 1
+
+    flush()
+
+    # Заголовок с одним занятием длиннее лимита можно только разрезать
+    return [piece for message in messages for piece in (_cut(message, limit) if len(message) > limit else [message])]
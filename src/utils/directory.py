@@ -0,0 +1,40 @@
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).lower().replace("ё", "е")
+
+
+@dataclass(frozen=True)
+class Directory:
+    """Списки групп и преподавателей в виде множеств для быстрой проверки вхождения"""
+
+    groups: frozenset[str]
+    teachers: frozenset[str]
+    normalized_groups: dict[str, str] = field(repr=False)
+    normalized_teachers: dict[str, str] = field(repr=False)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def find_group(self, name: str) -> Optional[str]:
+        if name in self.groups:
+            return name
+        return self.normalized_groups.get(normalize_name(name))
+
+    def find_teacher(self, name: str) -> Optional[str]:
+        if name in self.teachers:
+            return name
+        return self.normalized_teachers.get(normalize_name(name))
+
+    def is_expired(self, ttl: float) -> bool:
+        return time.monotonic() - self.loaded_at >= ttl
+
+
+def build_directory(groups: list[str], teachers: list[str]) -> Directory:
+    return Directory(
+        groups=frozenset(groups),
+        teachers=frozenset(teachers),
+        normalized_groups={normalize_name(group): group for group in groups},
+        normalized_teachers={normalize_name(teacher): teacher for teacher in teachers},
+    )
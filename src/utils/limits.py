@@ -0,0 +1,3 @@
+# Ограничения, общие для базы, клавиатуры и рассылки; модуль без зависимостей,
+# чтобы его можно было импортировать без клиента Supabase
+MAX_SUBSCRIPTION_COUNT = 5
@@ -1,9 +1,293 @@
-from telegram import Update
-from telegram.error import Forbidden
-from telegram.ext import ContextTypes
+import asyncio
+import contextlib
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from enum import Enum
+from typing import Any, Callable, Coroutine, Optional, Union
 
-async def send_teacher_schedule_message(update: Update, _: ContextTypes.DEFAULT_TYPE):
-    pass
+from telegram import Bot
+from telegram.error import (BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TelegramError,
+                            TimedOut)
+from telegram.ext import BaseRateLimiter
 
-async def send_student_schedule_message(update: Update, _: ContextTypes.DEFAULT_TYPE):
-    pass
\ No newline at end of file
+from src.logger_config import logger
+from src.tracing import span
+
+GLOBAL_RATE = 30
+# С рабочими процессами рассылки бот делит лимит токена: ему остаются ответы на команды и досылка,
+# а рабочим — остальное, чтобы вместе они не превысили лимит Telegram
+BOT_RESERVED_RATE = 10
+WORKER_SEND_RATE = GLOBAL_RATE - BOT_RESERVED_RATE
+PRIVATE_CHAT_RATE = 1
+GROUP_CHAT_RATE = 20 / 60
+CHAT_BURST = 3
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+MAX_TRACKED_CHATS = 10_000
+THROUGHPUT_WINDOW = 60
+
+# Запрос, оборвавшийся по таймауту, мог уже дойти: повтор этих методов отправит сообщение дважды
+NON_IDEMPOTENT_PREFIXES: tuple[str, ...] = ("send", "forward", "copy")
+
+ApiResult = Union[bool, dict[str, Any], list[dict[str, Any]]]
+
+
+class SendResult(Enum):
+    SENT = "sent"
+    # Telegram отказал окончательно: чат заблокировал бота, запрос неверен или бот не может отправлять вовсе
+    REJECTED = "rejected"
+    # Сеть или RetryAfter после всех повторов: сообщение можно отправить позже
+    DEFERRED = "deferred"
+
+
+# Единая классификация ошибок Telegram для ограничителя и отправки, проверяется по порядку:
+# BadRequest — подкласс NetworkError. Ошибки не из таблицы (InvalidToken, Conflict и прочие) повтор не исправит
+_ERROR_RESULTS: tuple[tuple[type[TelegramError], SendResult], ...] = (
+    (Forbidden, SendResult.REJECTED),
+    (ChatMigrated, SendResult.REJECTED),
+    (BadRequest, SendResult.REJECTED),
+    (RetryAfter, SendResult.DEFERRED),
+    (NetworkError, SendResult.DEFERRED),
+)
+
+
+def error_result(error: TelegramError) -> SendResult:
+    """Можно ли отправить сообщение позже, если Telegram ответил этой ошибкой"""
+
+    for error_type, result in _ERROR_RESULTS:
+        if isinstance(error, error_type):
+            return result
+    return SendResult.REJECTED
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after: Union[int, timedelta] = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class TokenBucket:
+    """Ведро токенов: пропускает не больше rate запросов в секунду с запасом в capacity"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate: float = rate
+        self._capacity: float = capacity
+        self._tokens: float = capacity
+        self._updated: float = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self._tokens >= self._capacity and not self._lock.locked()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= 1
+
+
+@dataclass
+class DispatcherStats:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    retry_after: int = 0
+    forbidden: int = 0
+    waiting: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _recent: deque = field(default_factory=lambda: deque(maxlen=GLOBAL_RATE * THROUGHPUT_WINDOW), repr=False)
+
+    def mark_sent(self) -> None:
+        self.sent += 1
+        self._recent.append(time.monotonic())
+
+    @property
+    def messages_per_second(self) -> float:
+        now: float = time.monotonic()
+        while self._recent and now - self._recent[0] > THROUGHPUT_WINDOW:
+            self._recent.popleft()
+
+        window: float = min(THROUGHPUT_WINDOW, now - self.started_at) or 1
+        return len(self._recent) / window
+
+
+class MessageDispatcher(BaseRateLimiter[int]):
+    """
+    Ограничитель исходящих запросов для Application: общее ведро на весь бот и отдельное на каждый чат.
+    Дожидается RetryAfter, повторяет запрос при сетевых ошибках и запоминает чаты, где бот заблокирован,
+    и группы, ставшие супергруппами.
+    """
+
+    instance = None
+    _global_bucket: TokenBucket
+    _chat_buckets: dict[int, TokenBucket]
+    _retry_after_event: asyncio.Event
+    _forbidden_chats: set[int]
+    _migrated_chats: dict[int, int]
+    _max_retries: int
+    stats: DispatcherStats
+
+    def __new__(cls, global_rate: float = GLOBAL_RATE, max_retries: int = MAX_RETRIES):
+        if not cls.instance:
+            cls.instance = object.__new__(cls)
+            cls.instance._global_bucket = TokenBucket(global_rate, global_rate)
+            cls.instance._chat_buckets = {}
+            cls.instance._retry_after_event = asyncio.Event()
+            cls.instance._retry_after_event.set()
+            cls.instance._forbidden_chats = set()
+            cls.instance._migrated_chats = {}
+            cls.instance._max_retries = max_retries
+            cls.instance.stats = DispatcherStats()
+
+        return cls.instance
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def pop_forbidden_chats(self) -> set[int]:
+        chats: set[int] = self._forbidden_chats
+        self._forbidden_chats = set()
+        return chats
+
+    def pop_migrated_chats(self) -> dict[int, int]:
+        """Новые id групп, ставших супергруппами, по прежним id"""
+
+        chats: dict[int, int] = self._migrated_chats
+        self._migrated_chats = {}
+        return chats
+
+    def _get_chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket: Optional[TokenBucket] = self._chat_buckets.get(chat_id)
+        if bucket is not None:
+            return bucket
+
+        if len(self._chat_buckets) >= MAX_TRACKED_CHATS:
+            self._chat_buckets = {key: value for key, value in self._chat_buckets.items() if not value.idle}
+
+        rate: float = GROUP_CHAT_RATE if chat_id < 0 else PRIVATE_CHAT_RATE
+        bucket = TokenBucket(rate, CHAT_BURST)
+        self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _wait_turn(self, chat_id: Optional[int]) -> None:
+        self.stats.waiting += 1
+        try:
+            if chat_id is not None:
+                await self._get_chat_bucket(chat_id).acquire()
+            await self._retry_after_event.wait()
+            await self._global_bucket.acquire()
+        finally:
+            self.stats.waiting -= 1
+
+    async def process_request(
+            self,
+            callback: Callable[..., Coroutine[Any, Any, ApiResult]],
+            args: Any,
+            kwargs: dict[str, Any],
+            endpoint: str,
+            data: dict[str, Any],
+            rate_limit_args: Optional[int],
+    ) -> ApiResult:
+        with span(f"telegram.{endpoint}"):
+            return await self._process_request(callback, args, kwargs, endpoint, data, rate_limit_args)
+
+    async def _process_request(
+            self,
+            callback: Callable[..., Coroutine[Any, Any, ApiResult]],
+            args: Any,
+            kwargs: dict[str, Any],
+            endpoint: str,
+            data: dict[str, Any],
+            rate_limit_args: Optional[int],
+    ) -> ApiResult:
+        max_retries: int = rate_limit_args if rate_limit_args is not None else self._max_retries
+
+        chat_id = data.get("chat_id")
+        with contextlib.suppress(ValueError, TypeError):
+            chat_id = int(chat_id)
+        if not isinstance(chat_id, int):
+            return await callback(*args, **kwargs)
+
+        attempt: int = 0
+        while True:
+            await self._wait_turn(chat_id)
+
+            try:
+                result: ApiResult = await callback(*args, **kwargs)
+            except TelegramError as e:
+                if isinstance(e, RetryAfter):
+                    self.stats.retry_after += 1
+
+                if error_result(e) == SendResult.REJECTED:
+                    self.stats.failed += 1
+                    if isinstance(e, Forbidden):
+                        self.stats.forbidden += 1
+                        self._forbidden_chats.add(chat_id)
+                    elif isinstance(e, ChatMigrated):
+                        self._migrated_chats[chat_id] = e.new_chat_id
+                    raise
+
+                # Запрос, оборвавшийся по таймауту, мог уже дойти
+                repeatable: bool = not (isinstance(e, TimedOut) and endpoint.startswith(NON_IDEMPOTENT_PREFIXES))
+                if attempt >= max_retries or not repeatable:
+                    self.stats.failed += 1
+                    raise
+
+                if isinstance(e, RetryAfter):
+                    delay: float = _retry_after_seconds(e) + 0.1
+                    logger.warning(f"Telegram попросил подождать {delay:.1f} с. перед {endpoint}")
+                    self._retry_after_event.clear()
+                    try:
+                        await asyncio.sleep(delay)
+                    finally:
+                        self._retry_after_event.set()
+                else:
+                    self.stats.retried += 1
+                    delay: float = BACKOFF_BASE * 2 ** attempt
+                    logger.warning(f"Ошибка сети при {endpoint} ({e}), повтор через {delay:.1f} с.")
+                    await asyncio.sleep(delay)
+            else:
+                self.stats.mark_sent()
+                return result
+
+            attempt += 1
+
+
+async def send_message(bot: Bot, chat_id: int, text: str, **kwargs) -> SendResult:
+    """
+    Отправляет сообщение через ограничитель, не пробрасывая ошибки Telegram наружу.
+    Группе, ставшей супергруппой, сообщение отправляется по её новому id.
+    """
+
+    try:
+        await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+    except ChatMigrated as e:
+        logger.info(f"Чат {chat_id} стал супергруппой {e.new_chat_id}, отправляю туда")
+        return await send_message(bot, e.new_chat_id, text, **kwargs)
+    except TelegramError as e:
+        result: SendResult = error_result(e)
+
+        if isinstance(e, Forbidden):
+            logger.info(f"Чат {chat_id} заблокировал бота")
+        elif result == SendResult.REJECTED:
+            logger.error(f"Telegram отклонил сообщение в чат {chat_id}: {e!r}")
+        else:
+            logger.error(f"Не удалось отправить сообщение в чат {chat_id}, повторю позже: {e!r}")
+        return result
+
+    return SendResult.SENT
@@ -1,5 +1,9 @@
-from dataclasses import dataclass
+import hashlib
+import json
+import sys
+from dataclasses import dataclass, field, fields, replace
 from datetime import datetime
+from functools import cached_property, lru_cache
 from enum import StrEnum
 
 class ButtonVariants(StrEnum):
@@ -13,6 +17,10 @@ class ScheduleStates(StrEnum):
     DISTANT = "DISTANT"
     EMPTY = "EMPTY"
 
+class ScheduleKind(StrEnum):
+    STUDENT = "STUDENT"
+    TEACHER = "TEACHER"
+
 class SubGroup(StrEnum):
     FIRST = "FIRST"
     SECOND = "SECOND"
@@ -46,7 +54,27 @@ class SubGroup(StrEnum):
         return values[self]
 
 
+NO_SCHEDULE = "Нет расписания"
+
+_MONTHS: tuple[str, ...] = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря"
+)
+
+
+@lru_cache(maxsize=64)
+def _format_schedule_date(schedule_date: str) -> str:
+    time: datetime = datetime.strptime(schedule_date, "%Y-%m-%d")
+    return f"{time.day} {_MONTHS[time.month - 1]} {time.year}"
+
+
 @dataclass(frozen=True, order=True)
+class ScheduleTarget:
+    kind: ScheduleKind
+    name: str
+
+
+@dataclass(frozen=True, order=True, slots=True)
 class ScheduleItem:
     time: str
     subject_name: str
@@ -62,79 +90,161 @@ class ScheduleGroup:
     group_name: str
     teacher_name: str
     schedule_items: list[ScheduleItem]
+    room_number: str = ""
+    # Отдано из запаса, пока API было недоступно: может не совпадать с текущей датой
+    stale: bool = field(default=False, compare=False)
+
+    @cached_property
+    def schedule_header(self) -> str:
+        parts: list[str] = [f"Расписание на {_format_schedule_date(self.schedule_date)}\n"]
+        if self.teacher_name:
+            parts.append(f"Для преподавателя: {self.teacher_name}\n\n")
+        if self.group_name:
+            parts.append(f"Для группы: {self.group_name}\n\n")
+        if self.room_number:
+            parts.append(f"Для кабинета: {self.room_number}\n\n")
+
+        return "".join(parts)
+
+    def _render_lesson(self, schedule_item: ScheduleItem) -> str:
+        parts: list[str] = [f"- {schedule_item.time} | {schedule_item.subject_name}\n"
+                            f"- Кабинет: {schedule_item.room_number}\n"]
+        if schedule_item.teacher_name != self.teacher_name:
+            parts.append(f"- Преподаватель: {schedule_item.teacher_name}\n")
+        if schedule_item.group_name != self.group_name:
+            parts.append(f"- Группа: {schedule_item.group_name}\n")
+        if schedule_item.sub_group != SubGroup.BOTH:
+            parts.append(f"- Подгруппа: {schedule_item.sub_group.display_name}\n")
+        parts.append("-------------------------------\n")
+
+        return "".join(parts)
+
+    @cached_property
+    def lesson_blocks(self) -> tuple[str, ...]:
+        """Текст каждого занятия; сообщения и дайджесты собираются из этих блоков без повторной отрисовки"""
+
+        return tuple(self._render_lesson(schedule_item) for schedule_item in self.schedule_items)
+
+    @cached_property
+    def pretty_schedule(self) -> str:
+        if not self.schedule_items:
+            return self.schedule_header + NO_SCHEDULE
+
+        return self.schedule_header + "".join(self.lesson_blocks)
+
+    @cached_property
+    def _sub_groups(self) -> dict[SubGroup, "ScheduleGroup"]:
+        first_items: list[ScheduleItem] = []
+        second_items: list[ScheduleItem] = []
+        first_blocks: list[str] = []
+        second_blocks: list[str] = []
+
+        for item, block in zip(self.schedule_items, self.lesson_blocks):
+            if item.sub_group != SubGroup.SECOND:
+                first_items.append(item)
+                first_blocks.append(block)
+            if item.sub_group != SubGroup.FIRST:
+                second_items.append(item)
+                second_blocks.append(block)
+
+        first: ScheduleGroup = replace(self, schedule_items=first_items)
+        second: ScheduleGroup = replace(self, schedule_items=second_items)
+
+        # Заголовок и занятия подгрупп те же, что у всей группы: кладём готовый текст в кэш cached_property
+        for view, blocks in ((first, first_blocks), (second, second_blocks)):
+            view.__dict__["schedule_header"] = self.schedule_header
+            view.__dict__["lesson_blocks"] = tuple(blocks)
+
+        return {
+            SubGroup.FIRST: first,
+            SubGroup.SECOND: second,
+            SubGroup.BOTH: self
+        }
 
-    @property
-    def _schedule_date_obj(self) -> datetime:
-        return datetime.strptime(self.schedule_date, "%Y-%m-%d")
+    def get_sub_group(self, sub_group: SubGroup) -> "ScheduleGroup":
+        """Вид расписания для подгруппы; разбиение считается один раз, и текст каждого вида тоже кэшируется"""
 
-    @property
-    def pretty_schedule(self) -> str:
-        months: list[str] = [
-            "января", "февраля", "марта", "апреля", "мая", "июня",
-            "июля", "августа", "сентября", "октября", "ноября", "декабря"
-        ]
-
-        time = self._schedule_date_obj
-        text = f"Расписание на {time.day} {months[time.month - 1]} {time.year}\n"
-        text += f"Для преподавателя: {self.teacher_name}\n\n" if self.teacher_name else ""
-        text += f"Для группы: {self.group_name}\n\n" if self.group_name else ""
-
-        for schedule_item in self.schedule_items:
-            sub_group: str = schedule_item.sub_group.display_name
-            text += f"- {schedule_item.time} | {schedule_item.subject_name}\n"
-            text += f"- Кабинет: {schedule_item.room_number}\n"
-            text += f"- Преподаватель: {schedule_item.teacher_name}\n" if schedule_item.teacher_name != self.teacher_name else ""
-            text += f"- Группа: {schedule_item.group_name}\n" if schedule_item.group_name != self.group_name else ""
-            text += f"- Подгруппа: {sub_group}\n" if schedule_item.sub_group != SubGroup.BOTH else ""
-            text += "-------------------------------\n"
+        return self._sub_groups[sub_group]
 
-        if not self.schedule_items:
-            text += "Нет расписания"
 
-        return text
+def schedule_group_size(schedule_group: ScheduleGroup) -> int:
+    """Примерный объём памяти, занимаемый расписанием, в байтах"""
 
-    def get_sub_group(self, sub_group: SubGroup) -> "ScheduleGroup":
-        new_schedule_items: list[ScheduleItem] = []
-        if sub_group == SubGroup.BOTH: return self
-        for item in self.schedule_items:
-            if item.sub_group == sub_group or item.sub_group == SubGroup.BOTH:
-                new_schedule_items.append(item)
-        return ScheduleGroup(self.schedule_date, self.group_name, self.teacher_name, new_schedule_items)
+    size: int = sys.getsizeof(schedule_group) + sys.getsizeof(schedule_group.schedule_items)
+    size += sum(sys.getsizeof(getattr(schedule_group, f.name)) for f in fields(schedule_group)
+                if f.name != "schedule_items")
+
+    for item in schedule_group.schedule_items:
+        size += sys.getsizeof(item) + sum(sys.getsizeof(getattr(item, f.name)) for f in fields(item))
 
+    return size
 
 
-async def _build_schedule_item(schedule_item_info: dict) -> ScheduleItem:
-    time: str = schedule_item_info.get("time", "")
-    subject_name: str = schedule_item_info.get("subjectName", "")
-    group_name: str = schedule_item_info.get("groupName", "")
-    teacher_name: str = schedule_item_info.get("teacherName", "")
-    room_number: str = schedule_item_info.get("roomNumber", "")
-    sub_group: SubGroup = SubGroup(schedule_item_info.get("subGroup", ""))
-    state: ScheduleStates = ScheduleStates(schedule_item_info.get("state"))
+def schedule_fingerprint(schedule_group: ScheduleGroup) -> str:
+    """
+    Дата и хэш занятий расписания. Расписание новой даты всегда отличается от прошлого,
+    а при переопубликовании той же даты отпечаток меняется, только если поменялись занятия.
+    Порядок занятий не учитывается: API и снимок могут отдать одни и те же занятия по-разному.
+    """
+
+    # API присылает null в необязательных полях, например в roomNumber
+    lines: list[str] = sorted("\x1f".join(str(value or "") for value in (
+        item.time, item.subject_name, item.group_name, item.teacher_name, item.room_number, item.sub_group, item.state
+    )) for item in schedule_group.schedule_items)
+
+    digest = hashlib.blake2b(digest_size=16)
+    for line in lines:
+        digest.update(line.encode())
+        digest.update(b"\x1e")
+    return f"{schedule_group.schedule_date}:{digest.hexdigest()}"
+
+
+def unsent_fingerprint(schedule_date: str) -> str:
+    """Отпечаток цели, чьё расписание этой даты не удалось загрузить: он не совпадёт ни с одним настоящим"""
+
+    return f"{schedule_date}:"
+
+
+_SUB_GROUPS: dict[str, SubGroup] = {sub_group.value: sub_group for sub_group in SubGroup}
+_STATES: dict[str, ScheduleStates] = {state.value: state for state in ScheduleStates}
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _build_schedule_item(schedule_item_info: dict) -> ScheduleItem:
+    get = schedule_item_info.get
+
+    sub_group_value: str = get("subGroup", "")
+    state_value: str = get("state")
 
     return ScheduleItem(
-        time=time,
-        subject_name=subject_name,
-        group_name=group_name,
-        teacher_name=teacher_name,
-        room_number=room_number,
-        sub_group=sub_group,
-        state=state
+        time=_intern(get("time", "")),
+        subject_name=_intern(get("subjectName", "")),
+        group_name=_intern(get("groupName", "")),
+        teacher_name=_intern(get("teacherName", "")),
+        room_number=_intern(get("roomNumber", "")),
+        sub_group=_SUB_GROUPS.get(sub_group_value) or SubGroup(sub_group_value),
+        state=_STATES.get(state_value) or ScheduleStates(state_value)
     )
 
-async def build_schedule_group(schedule_group_info: dict) -> ScheduleGroup:
+
+def build_schedule_group(schedule_group_info: dict) -> ScheduleGroup:
     schedule_date: str = schedule_group_info.get("scheduleDate", "")
     group_name: str = schedule_group_info.get("groupName", "Не указана")
     teacher_name: str = schedule_group_info.get("teacherName", "Не указан")
     schedule_items_info: list[dict] = schedule_group_info.get("scheduleItems", [])
 
-    schedule_items: list[ScheduleItem] = []
-    for schedule_item_info in schedule_items_info:
-        schedule_items.append(await _build_schedule_item(schedule_item_info))
-
     return ScheduleGroup(
         schedule_date=schedule_date,
-        group_name=group_name,
-        teacher_name=teacher_name,
-        schedule_items=schedule_items
+        group_name=_intern(group_name),
+        teacher_name=_intern(teacher_name),
+        schedule_items=[_build_schedule_item(schedule_item_info) for schedule_item_info in schedule_items_info]
     )
+
+
+def decode_schedule_group(data: bytes) -> ScheduleGroup:
+    """Разбирает тело ответа API сразу в расписание, без промежуточного Response.json()"""
+
+    return build_schedule_group(json.loads(data))
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from functools import lru_cache
+from typing import Optional
+
+from src.utils.directory import normalize_name
+from src.utils.schedule import ScheduleKind, ScheduleTarget
+
+MAX_RESULTS = 50
+MIN_SIMILARITY = 0.3
+
+_LATIN_LAYOUT: str = "qwertyuiop[]asdfghjkl;'zxcvbnm,./`"
+_CYRILLIC_LAYOUT: str = "йцукенгшщзхъфывапролджэячсмитьбю.ё"
+_LAYOUT_TABLE: dict[int, int] = str.maketrans(_LATIN_LAYOUT + _LATIN_LAYOUT.upper(),
+                                              _CYRILLIC_LAYOUT + _CYRILLIC_LAYOUT.upper())
+
+
+def from_latin_layout(text: str) -> str:
+    """Переводит текст, набранный в английской раскладке, в русскую: "lbfyjd" -> "дианов" """
+
+    return text.translate(_LAYOUT_TABLE)
+
+
+def _trigrams(text: str) -> set[str]:
+    padded: str = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.entries: list[int] = []
+
+
+class SearchIndex:
+    """Поиск групп и преподавателей по префиксу (дерево) и по похожести (триграммы)"""
+
+    def __init__(self, targets: list[ScheduleTarget]) -> None:
+        self._targets: list[ScheduleTarget] = targets
+        self._keys: list[str] = [normalize_name(target.name) for target in targets]
+        self._exact: dict[str, list[int]] = defaultdict(list)
+        self._root = _TrieNode()
+        self._trigram_index: dict[str, list[int]] = defaultdict(list)
+        self._trigram_counts: list[int] = []
+
+        for entry, key in enumerate(self._keys):
+            self._exact[key].append(entry)
+
+            for start in self._word_starts(key):
+                self._insert(key[start:], entry)
+
+            trigrams: set[str] = _trigrams(key)
+            self._trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self._trigram_index[trigram].append(entry)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    @staticmethod
+    def _word_starts(key: str) -> list[int]:
+        return [0] + [i for i in range(1, len(key)) if not key[i - 1].isalnum() and key[i].isalnum()]
+
+    def _insert(self, suffix: str, entry: int) -> None:
+        node: _TrieNode = self._root
+        for char in suffix:
+            node = node.children.setdefault(char, _TrieNode())
+            if not node.entries or node.entries[-1] != entry:
+                node.entries.append(entry)
+
+    def _prefix_entries(self, prefix: str) -> list[int]:
+        node: Optional[_TrieNode] = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.entries
+
+    def _score(self, query: str, scores: dict[int, float]) -> None:
+        for entry in self._exact.get(query, []):
+            scores[entry] = max(scores.get(entry, 0), 3.0)
+
+        for entry in self._prefix_entries(query):
+            score: float = 2.0 if self._keys[entry].startswith(query) else 1.5
+            score += len(query) / len(self._keys[entry]) * 0.5
+            scores[entry] = max(scores.get(entry, 0), score)
+
+        query_trigrams: set[str] = _trigrams(query)
+        shared: dict[int, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for entry in self._trigram_index.get(trigram, []):
+                shared[entry] += 1
+
+        for entry, count in shared.items():
+            similarity: float = count / (len(query_trigrams) + self._trigram_counts[entry] - count)
+            if similarity >= MIN_SIMILARITY:
+                scores[entry] = max(scores.get(entry, 0), similarity)
+
+    def search(self, query: str, limit: int = MAX_RESULTS) -> list[ScheduleTarget]:
+        normalized: str = normalize_name(query)
+        if not normalized:
+            return []
+
+        scores: dict[int, float] = {}
+        self._score(normalized, scores)
+
+        converted: str = normalize_name(from_latin_layout(query))
+        if converted != normalized:
+            self._score(converted, scores)
+
+        ranked: list[int] = sorted(scores, key=lambda entry: (-scores[entry], self._keys[entry]))
+        return [self._targets[entry] for entry in ranked[:limit]]
+
+
+@lru_cache(maxsize=2)
+def build_search_index(groups: frozenset[str], teachers: frozenset[str]) -> SearchIndex:
+    targets: list[ScheduleTarget] = [ScheduleTarget(ScheduleKind.STUDENT, group) for group in sorted(groups)]
+    targets += [ScheduleTarget(ScheduleKind.TEACHER, teacher) for teacher in sorted(teachers)]
+    return SearchIndex(targets)
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task: asyncio.Task = task
+        self.waiters: int = 0
+        # Запрос отменён, потому что ждать его стало некому
+        self.abandoned: bool = False
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Объединяет одновременные одинаковые вызовы: пока запрос по ключу выполняется,
+    остальные вызовы с тем же ключом ждут его результат или ошибку.
+    Отмена одного ожидающего не отменяет запрос для остальных; запрос отменяется, только когда ждать его некому.
+    Вызов, пришедший, пока отменённый запрос ещё завершается, не получает чужую отмену, а запускает запрос заново.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[K, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        flight = self._flights.get(key)
+
+        # Брошенный запрос ещё может не успеть завершиться; новый вызов не должен получить его отмену
+        if flight is None or flight.abandoned:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.abandoned = True
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: K, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,94 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from src.utils.schedule import ScheduleGroup, ScheduleItem
+
+_TIME_PATTERN = re.compile(r"(\d{1,2})[:.](\d{2})")
+
+
+def room_key(room_number: str) -> str:
+    return room_number.strip().lower()
+
+
+def _time_sort_key(item: ScheduleItem) -> tuple[int, int]:
+    match: Optional[re.Match] = _TIME_PATTERN.search(item.time)
+    if match is None:
+        return 24, 0
+    return int(match.group(1)), int(match.group(2))
+
+
+def teacher_schedule_group(schedule_date: str, teacher_name: str, items: list[ScheduleItem]) -> ScheduleGroup:
+    """Расписание преподавателя в одном виде, собрано ли оно из снимка или получено из API"""
+
+    return ScheduleGroup(
+        schedule_date=schedule_date,
+        group_name="",
+        teacher_name=teacher_name,
+        schedule_items=sorted(items, key=_time_sort_key)
+    )
+
+
+@dataclass(frozen=True)
+class ScheduleSnapshot:
+    """
+    Расписание всех групп за день с обратными индексами по преподавателям и кабинетам.
+    complete — загрузились ли все группы справочника; иначе расписания преподавателей и кабинетов могут быть неполными.
+    """
+
+    schedule_date: Optional[datetime]
+    groups: dict[str, ScheduleGroup]
+    teachers: dict[str, list[ScheduleItem]] = field(repr=False)
+    rooms: dict[str, list[ScheduleItem]] = field(repr=False)
+    complete: bool = True
+    _views: dict[tuple[str, str], ScheduleGroup] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def _schedule_date_str(self) -> str:
+        return next(iter(self.groups.values())).schedule_date if self.groups else ""
+
+    def teacher_schedule(self, teacher_name: str) -> ScheduleGroup:
+        key: tuple[str, str] = ("teacher", teacher_name)
+        if key not in self._views:
+            self._views[key] = teacher_schedule_group(
+                self._schedule_date_str, teacher_name, self.teachers.get(teacher_name, [])
+            )
+        return self._views[key]
+
+    def room_schedule(self, room_number: str) -> ScheduleGroup:
+        key: tuple[str, str] = ("room", room_key(room_number))
+        if key not in self._views:
+            self._views[key] = ScheduleGroup(
+                schedule_date=self._schedule_date_str,
+                group_name="",
+                teacher_name="",
+                schedule_items=self.rooms.get(room_key(room_number), []),
+                room_number=room_number.strip()
+            )
+        return self._views[key]
+
+
+def build_snapshot(schedule_date: Optional[datetime], groups: dict[str, ScheduleGroup],
+                   complete: bool = True) -> ScheduleSnapshot:
+    teachers: dict[str, list[ScheduleItem]] = defaultdict(list)
+    rooms: dict[str, list[ScheduleItem]] = defaultdict(list)
+
+    for group in groups.values():
+        for item in group.schedule_items:
+            if item.teacher_name:
+                teachers[item.teacher_name].append(item)
+            if item.room_number:
+                rooms[room_key(item.room_number)].append(item)
+
+    for items in (*teachers.values(), *rooms.values()):
+        items.sort(key=_time_sort_key)
+
+    return ScheduleSnapshot(
+        schedule_date=schedule_date,
+        groups=groups,
+        teachers=dict(teachers),
+        rooms=dict(rooms),
+        complete=complete
+    )
@@ -0,0 +1,92 @@
+import hmac
+import json
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import Application
+
+from src.http_server import HttpRequest, HttpResponse, HttpServer
+from src.logger_config import logger
+
+SECRET_TOKEN_HEADER = "x-telegram-bot-api-secret-token"
+# Соединения сверх max_connections Telegram: для проверки здоровья и переподключений
+SPARE_CONNECTIONS = 8
+
+
+@dataclass(frozen=True)
+class WebhookConfig:
+    url: Optional[str] = None
+    listen: str = "0.0.0.0"
+    port: int = 8443
+    path: str = "/telegram"
+    secret_token: Optional[str] = None
+    max_connections: int = 40
+    health_path: str = "/health"
+
+    def __post_init__(self) -> None:
+        # Без секрета поддельное обновление от любого, кто знает адрес, пройдёт даже фильтр ADMIN_IDS
+        if self.url and not self.secret_token:
+            raise ValueError("Для вебхука с WEBHOOK_URL нужен WEBHOOK_SECRET")
+
+
+class WebhookServer:
+    """
+    Принимает обновления от Telegram по HTTP и кладёт их в update_queue приложения.
+    Без url вебхук в Telegram не регистрируется, что удобно для локальной проверки:
+    достаточно отправить POST с JSON обновления на listen:port/path.
+    """
+
+    def __init__(self, application: Application, config: WebhookConfig) -> None:
+        self._application: Application = application
+        self._config: WebhookConfig = config
+        self._server = HttpServer(config.listen, config.port, config.max_connections + SPARE_CONNECTIONS)
+
+        self._server.add_route("POST", config.path, self._handle_update)
+        self._server.add_route("GET", config.health_path, self._handle_health)
+
+    @property
+    def http_server(self) -> HttpServer:
+        return self._server
+
+    async def _handle_update(self, request: HttpRequest) -> HttpResponse:
+        if self._config.secret_token is not None:
+            received: str = request.headers.get(SECRET_TOKEN_HEADER, "")
+            if not hmac.compare_digest(received, self._config.secret_token):
+                return HttpResponse(status=HTTPStatus.FORBIDDEN, body=b"Forbidden")
+
+        try:
+            update: Optional[Update] = Update.de_json(json.loads(request.body), self._application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.warning(f"Получено некорректное обновление: {e!r}")
+            return HttpResponse(status=HTTPStatus.BAD_REQUEST, body=b"Bad Request")
+
+        if update is None:
+            logger.warning("Получено пустое обновление")
+            return HttpResponse(status=HTTPStatus.BAD_REQUEST, body=b"Bad Request")
+
+        await self._application.update_queue.put(update)
+        return HttpResponse()
+
+    async def _handle_health(self, _: HttpRequest) -> HttpResponse:
+        body: dict = {
+            "status": "ok" if self._application.running else "starting",
+            "update_queue": self._application.update_queue.qsize()
+        }
+        return HttpResponse(body=json.dumps(body).encode(), content_type="application/json")
+
+    async def start(self) -> None:
+        await self._server.start()
+
+        if self._config.url:
+            await self._application.bot.set_webhook(
+                url=self._config.url,
+                secret_token=self._config.secret_token,
+                max_connections=self._config.max_connections,
+                allowed_updates=Update.ALL_TYPES
+            )
+            logger.info(f"Вебхук зарегистрирован: {self._config.url}")
+
+    async def stop(self) -> None:
+        await self._server.stop()
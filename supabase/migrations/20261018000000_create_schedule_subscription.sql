@@ -0,0 +1,40 @@
+-- Уникальность подписки и лимит подписок на чат проверяются в базе за один запрос.
+
+delete from schedule_subscriptions a
+    using schedule_subscriptions b
+    where a.chat_id = b.chat_id
+      and a.group_name is not distinct from b.group_name
+      and a.teacher_name is not distinct from b.teacher_name
+      and a.sub_group = b.sub_group
+      and a.id > b.id;
+
+alter table schedule_subscriptions
+    add constraint schedule_subscriptions_unique
+    unique nulls not distinct (chat_id, group_name, teacher_name, sub_group);
+
+create index if not exists schedule_subscriptions_chat_id_idx on schedule_subscriptions (chat_id);
+
+create or replace function create_schedule_subscription(
+    p_chat_id bigint,
+    p_group_name text,
+    p_teacher_name text,
+    p_sub_group text,
+    p_max_count integer
+)
+returns setof schedule_subscriptions
+language plpgsql
+as $$
+begin
+    -- Блокировка на чат, чтобы два одновременных запроса не обошли лимит.
+    perform pg_advisory_xact_lock(p_chat_id);
+
+    if (select count(*) from schedule_subscriptions where chat_id = p_chat_id) >= p_max_count then
+        raise exception 'subscription_limit' using errcode = 'P0001';
+    end if;
+
+    return query
+        insert into schedule_subscriptions (chat_id, group_name, teacher_name, sub_group)
+        values (p_chat_id, p_group_name, p_teacher_name, p_sub_group)
+        returning *;
+end;
+$$;
@@ -0,0 +1,8 @@
+-- Страницы подписок по чатам упорядочиваются и продолжаются по (chat_id, id). Составной индекс отдаёт их
+-- сканированием только индекса и заменяет индекс по одному chat_id: выборки по чату идут по его префиксу.
+
+create index if not exists schedule_subscriptions_chat_id_id_idx
+    on schedule_subscriptions (chat_id, id)
+    include (group_name, teacher_name, sub_group);
+
+drop index if exists schedule_subscriptions_chat_id_idx;
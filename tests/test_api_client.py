@@ -0,0 +1,293 @@
+import asyncio
+import json
+import time
+import unittest
+from http import HTTPStatus
+from unittest import mock
+
+from httpx import HTTPStatusError
+
+from src.api_communicator import BREAKER_THRESHOLD, RETRY_ATTEMPTS, ApiCommunicator
+from src.http_server import HttpRequest, HttpResponse, HttpServer
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from src.utils.schedule import ScheduleGroup, ScheduleItem, ScheduleKind, ScheduleStates, ScheduleTarget, SubGroup
+
+SCHEDULE_PATH = "/api/schedule/student/A/"
+
+
+def _schedule_body(group_name: str, room_number: str = None) -> bytes:
+    return json.dumps({
+        "scheduleDate": "2026-10-19",
+        "groupName": group_name,
+        "teacherName": "",
+        "scheduleItems": [{"time": "08:30-10:00", "subjectName": "Физика", "groupName": group_name,
+                           "teacherName": "Иванов И.И.", "roomNumber": room_number, "subGroup": "BOTH",
+                           "state": "OK"}],
+    }, ensure_ascii=False).encode()
+
+
+SCHEDULE_BODY: bytes = _schedule_body("A")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_after_threshold(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_failures(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitState.CLOSED)
+
+    def test_half_open_lets_one_probe_through(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        self.assertEqual(breaker.state, CircuitState.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+
+    def test_released_probe_can_be_retried(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        self.assertTrue(breaker.allow())
+        breaker.release()
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitState.CLOSED)
+
+
+class ApiClientTest(unittest.IsolatedAsyncioTestCase):
+    """Запросы идут в локальную заглушку API, которая отвечает заданными статусами"""
+
+    async def asyncSetUp(self) -> None:
+        self.statuses: list[int] = []
+        self.requests: int = 0
+
+        async def schedule(_: HttpRequest) -> HttpResponse:
+            self.requests += 1
+            status: int = self.statuses.pop(0) if self.statuses else HTTPStatus.OK
+            body: bytes = SCHEDULE_BODY if status == HTTPStatus.OK else b"error"
+            return HttpResponse(status=status, body=body, content_type="application/json")
+
+        self.server = HttpServer("127.0.0.1", 0)
+        self.server.add_route("GET", SCHEDULE_PATH, schedule)
+        await self.server.start()
+
+        patcher = mock.patch("src.api_communicator.RETRY_BACKOFF", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        ApiCommunicator.instance = None
+        self.api = ApiCommunicator("http://127.0.0.1", self.server.port, snapshot_mode=False)
+
+    async def asyncTearDown(self) -> None:
+        await self.api._http_client.aclose()
+        ApiCommunicator.instance = None
+        await self.server.stop()
+
+    async def test_retries_server_errors(self) -> None:
+        self.statuses = [HTTPStatus.INTERNAL_SERVER_ERROR, HTTPStatus.BAD_GATEWAY]
+
+        response = await self.api._get(SCHEDULE_PATH)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(self.requests, 3)
+        self.assertEqual(self.api.client_stats.retries, 2)
+
+    async def test_gives_up_after_attempts(self) -> None:
+        self.statuses = [HTTPStatus.SERVICE_UNAVAILABLE] * RETRY_ATTEMPTS
+
+        with self.assertRaises(HTTPStatusError):
+            await self.api._get(SCHEDULE_PATH)
+        self.assertEqual(self.requests, RETRY_ATTEMPTS)
+
+    async def test_client_errors_are_not_retried(self) -> None:
+        self.statuses = [HTTPStatus.NOT_FOUND]
+
+        response = await self.api._get(SCHEDULE_PATH)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(self.requests, 1)
+
+    async def test_breaker_stops_requests(self) -> None:
+        self.statuses = [HTTPStatus.INTERNAL_SERVER_ERROR] * RETRY_ATTEMPTS * BREAKER_THRESHOLD
+
+        for _ in range(BREAKER_THRESHOLD):
+            with self.assertRaises(HTTPStatusError):
+                await self.api._get(SCHEDULE_PATH)
+        sent: int = self.requests
+
+        with self.assertRaises(CircuitOpenError):
+            await self.api._get(SCHEDULE_PATH)
+        self.assertEqual(self.requests, sent)
+        self.assertEqual(self.api.client_stats.breaker_state, CircuitState.OPEN)
+
+    async def test_unavailable_api_serves_stale_schedule(self) -> None:
+        fresh = await self.api.get_student_schedule("A")
+        self.assertFalse(fresh.stale)
+
+        # Новая дата расписания: кэш прошлой даты не подходит, а API недоступно
+        self.api._schedule_cache.clear()
+        self.statuses = [HTTPStatus.INTERNAL_SERVER_ERROR] * RETRY_ATTEMPTS
+
+        stale = await self.api.get_student_schedule("A")
+
+        self.assertTrue(stale.stale)
+        self.assertEqual(stale, fresh)
+        self.assertEqual(self.api.client_stats.served_stale, 1)
+
+    async def test_concurrent_fresh_loads_share_one_request(self) -> None:
+        target = ScheduleTarget(ScheduleKind.STUDENT, "A")
+
+        first, second = await asyncio.gather(self.api.get_fresh_schedule(target), self.api.get_fresh_schedule(target))
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.requests, 1)
+
+
+class ScheduleDateTest(unittest.IsolatedAsyncioTestCase):
+    """Заглушка отдаёт одну дату расписания с ETag и отвечает 304 на совпадающий If-None-Match"""
+
+    async def asyncSetUp(self) -> None:
+        self.etag: str = '"1"'
+
+        async def schedule_date(request: HttpRequest) -> HttpResponse:
+            if request.headers.get("if-none-match") == self.etag:
+                return HttpResponse(status=HTTPStatus.NOT_MODIFIED, body=b"")
+            return HttpResponse(body=json.dumps({"scheduleDate": "2026-10-19"}).encode(),
+                                content_type="application/json", headers={"ETag": self.etag})
+
+        self.server = HttpServer("127.0.0.1", 0)
+        self.server.add_route("GET", "/api/schedule/date", schedule_date)
+        await self.server.start()
+
+        ApiCommunicator.instance = None
+        self.api = ApiCommunicator("http://127.0.0.1", self.server.port, snapshot_mode=False)
+
+    async def asyncTearDown(self) -> None:
+        await self.api._http_client.aclose()
+        ApiCommunicator.instance = None
+        await self.server.stop()
+
+    async def test_republish_of_the_same_date_is_signalled(self) -> None:
+        self.assertIsNone(await self.api.check_changed())
+        self.assertIsNone(await self.api.check_changed())
+        self.assertFalse(self.api.pop_republish_signal())
+
+        self.etag = '"2"'
+        self.assertIsNone(await self.api.check_changed())
+
+        self.assertTrue(self.api.pop_republish_signal())
+        self.assertFalse(self.api.pop_republish_signal())
+
+
+class SnapshotTest(unittest.IsolatedAsyncioTestCase):
+    """Снимок собирается из заглушки API с группами A и B; B может отвечать ошибкой"""
+
+    async def asyncSetUp(self) -> None:
+        self.b_failures: int = 0
+        self.requests: int = 0
+
+        async def groups(_: HttpRequest) -> HttpResponse:
+            self.requests += 1
+            return HttpResponse(body=json.dumps({"groupsList": ["A", "B"]}).encode(), content_type="application/json")
+
+        async def teachers(_: HttpRequest) -> HttpResponse:
+            self.requests += 1
+            return HttpResponse(body=json.dumps({"teachersList": []}).encode(), content_type="application/json")
+
+        def schedule(group_name: str):
+            async def handler(_: HttpRequest) -> HttpResponse:
+                self.requests += 1
+                if group_name == "B" and self.b_failures:
+                    self.b_failures -= 1
+                    return HttpResponse(status=HTTPStatus.INTERNAL_SERVER_ERROR, body=b"error")
+                return HttpResponse(body=_schedule_body(group_name, f"2{ord(group_name)}"),
+                                    content_type="application/json")
+            return handler
+
+        self.server = HttpServer("127.0.0.1", 0)
+        self.server.add_route("GET", "/api/schedule/groups", groups)
+        self.server.add_route("GET", "/api/schedule/teachers", teachers)
+        for group_name in ("A", "B"):
+            self.server.add_route("GET", f"/api/schedule/student/{group_name}/", schedule(group_name))
+        await self.server.start()
+
+        patcher = mock.patch("src.api_communicator.RETRY_BACKOFF", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _api(self, snapshot_mode: bool) -> ApiCommunicator:
+        ApiCommunicator.instance = None
+        return ApiCommunicator("http://127.0.0.1", self.server.port, snapshot_mode=snapshot_mode)
+
+    async def asyncTearDown(self) -> None:
+        await ApiCommunicator.instance._http_client.aclose()
+        ApiCommunicator.instance = None
+        await self.server.stop()
+
+    async def test_rooms_need_snapshot_mode(self) -> None:
+        api = self._api(snapshot_mode=False)
+
+        self.assertIsNone(await api.get_room_schedule("265"))
+        self.assertEqual(self.requests, 0)
+
+    async def test_room_schedule_from_snapshot(self) -> None:
+        api = self._api(snapshot_mode=True)
+
+        room = await api.get_room_schedule("265")
+
+        self.assertEqual([item.group_name for item in room.schedule_items], ["A"])
+        self.assertTrue(api.snapshot_complete)
+
+    async def test_incomplete_snapshot_is_rebuilt_later(self) -> None:
+        api = self._api(snapshot_mode=True)
+        self.b_failures = RETRY_ATTEMPTS
+
+        incomplete = await api.get_snapshot()
+        self.assertEqual(set(incomplete.groups), {"A"})
+        self.assertIs(await api.get_snapshot(), incomplete)
+        self.assertIsNone(api._snapshot_task)
+
+        # Срок неполного снимка вышел: пока собирается новый, отдаётся неполный
+        api._snapshot_expires = 0
+        self.assertIs(await api.get_snapshot(), incomplete)
+        await api._snapshot_task
+
+        self.assertEqual(set((await api.get_snapshot()).groups), {"A", "B"})
+        self.assertTrue(api.snapshot_complete)
+
+    async def test_corrected_teacher_keeps_snapshot(self) -> None:
+        api = self._api(snapshot_mode=True)
+        await api.get_snapshot()
+        requests: int = self.requests
+
+        item = ScheduleItem("10:10-11:40", "Химия", "A", "Иванов И.И.", "300", SubGroup.BOTH, ScheduleStates.OK)
+        api.replace_schedules({
+            ScheduleTarget(ScheduleKind.TEACHER, "Иванов И.И."): ScheduleGroup("2026-10-19", "", "Иванов И.И.", [item])
+        })
+
+        self.assertEqual((await api.get_teacher_schedule("Иванов И.И.")).schedule_items, [item])
+        self.assertIsNotNone(await api.get_room_schedule("265"))
+        self.assertEqual(self.requests, requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from src.api_communicator import ApiCommunicator
+from src.database import Database, ScheduleSubscription
+from src.handlers.schedule_anounce import _broadcast, _check_republished
+from src.outbox import Outbox
+from src.state_snapshot import StateSnapshot
+from src.utils.schedule import (ScheduleGroup, ScheduleItem, ScheduleKind, ScheduleStates, ScheduleTarget, SubGroup,
+                                schedule_fingerprint, unsent_fingerprint)
+
+SCHEDULE_DATE = "2026-10-19"
+FIRST = ScheduleTarget(ScheduleKind.STUDENT, "ИС-11")
+SECOND = ScheduleTarget(ScheduleKind.STUDENT, "ИС-12")
+
+
+def schedule(group_name: str, *subjects: str, room: Optional[str] = "101") -> ScheduleGroup:
+    items: list[ScheduleItem] = [
+        ScheduleItem(f"{8 + index}:30-10:00", subject, group_name, "Иванов И.И.", room, SubGroup.BOTH,
+                     ScheduleStates.OK)
+        for index, subject in enumerate(subjects)
+    ]
+    return ScheduleGroup(SCHEDULE_DATE, group_name, "", items)
+
+
+class FakeApi:
+    """
+    API с опубликованными расписаниями published. Обычная загрузка отдаёт то, что осталось в кэше,
+    загрузка мимо кэша — опубликованное, как у ApiCommunicator.
+    """
+
+    def __init__(self, published: dict[ScheduleTarget, ScheduleGroup]) -> None:
+        self.published: dict[ScheduleTarget, ScheduleGroup] = published
+        self.cache: dict[ScheduleTarget, ScheduleGroup] = {}
+        self.fresh_loads: int = 0
+        self.schedule_date: datetime = datetime.strptime(SCHEDULE_DATE, "%Y-%m-%d")
+
+    async def get_schedule(self, target: ScheduleTarget) -> ScheduleGroup:
+        return self.cache.setdefault(target, self.published[target])
+
+    async def get_fresh_schedule(self, target: ScheduleTarget) -> ScheduleGroup:
+        return self.published[target]
+
+    async def get_fresh_schedules(self, targets: list[ScheduleTarget]) -> dict[ScheduleTarget, ScheduleGroup]:
+        self.fresh_loads += len(targets)
+        return {target: self.published[target] for target in targets}
+
+    def replace_schedules(self, schedules: dict[ScheduleTarget, ScheduleGroup]) -> None:
+        self.cache.update(schedules)
+
+
+class FakeDatabase:
+    def __init__(self, subscriptions: list[ScheduleSubscription]) -> None:
+        self.subscriptions: list[ScheduleSubscription] = subscriptions
+        self.reads: int = 0
+
+    async def iter_chat_subscription_pages(self) -> AsyncIterator[list[ScheduleSubscription]]:
+        self.reads += 1
+        yield sorted(self.subscriptions, key=lambda subscription: (subscription.chat_id, subscription.id))
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str, **_) -> None:
+        self.sent.append((chat_id, text))
+
+    def chats(self) -> list[int]:
+        return sorted(chat_id for chat_id, _ in self.sent)
+
+
+class BroadcastTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Рассылка в боте поверх поддельных API, базы и бота; журнал и состояние во временном каталоге.
+    Чат 1 подписан на FIRST, чат 2 на SECOND, чат 3 на обе группы.
+    """
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.api = FakeApi({FIRST: schedule(FIRST.name, "Физика"), SECOND: schedule(SECOND.name, "Химия")})
+        self.database = FakeDatabase([
+            ScheduleSubscription(1, 1, FIRST.name, None, SubGroup.BOTH),
+            ScheduleSubscription(2, 2, SECOND.name, None, SubGroup.BOTH),
+            ScheduleSubscription(3, 3, FIRST.name, None, SubGroup.BOTH),
+            ScheduleSubscription(4, 3, SECOND.name, None, SubGroup.BOTH),
+        ])
+        self.bot = FakeBot()
+
+        ApiCommunicator.instance = self.api
+        Database.instance = self.database
+        Outbox.instance = None
+        StateSnapshot.instance = None
+        self.outbox = Outbox(os.path.join(directory.name, "outbox.sqlite3"))
+        self.state = StateSnapshot(os.path.join(directory.name, "bot_state.json"))
+        self.addCleanup(self._reset)
+
+    def _reset(self) -> None:
+        self.outbox.close()
+        ApiCommunicator.instance = None
+        Database.instance = None
+        Outbox.instance = None
+        StateSnapshot.instance = None
+
+    async def broadcast(self) -> None:
+        await _broadcast(self.bot, SCHEDULE_DATE, self.state)
+
+    async def republish(self, target: ScheduleTarget, published: ScheduleGroup) -> list[int]:
+        """Переопубликовывает расписание цели и возвращает чаты, которым ушло сообщение"""
+
+        self.api.published[target] = published
+        self.bot.sent.clear()
+        await _check_republished(self.bot, self.state, use_workers=False)
+        return self.bot.chats()
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_item_order_is_ignored(self) -> None:
+        forward = schedule("ИС-11", "Физика", "Химия")
+        backward = ScheduleGroup(SCHEDULE_DATE, "ИС-11", "", list(reversed(forward.schedule_items)))
+
+        self.assertEqual(schedule_fingerprint(forward), schedule_fingerprint(backward))
+
+    def test_changed_lesson_changes_fingerprint(self) -> None:
+        self.assertNotEqual(schedule_fingerprint(schedule("ИС-11", "Физика")),
+                            schedule_fingerprint(schedule("ИС-11", "Химия")))
+        self.assertNotEqual(schedule_fingerprint(schedule("ИС-11", "Физика", room="101")),
+                            schedule_fingerprint(schedule("ИС-11", "Физика", room="102")))
+
+    def test_null_fields_are_tolerated(self) -> None:
+        self.assertEqual(schedule_fingerprint(schedule("ИС-11", "Физика", room=None)),
+                         schedule_fingerprint(schedule("ИС-11", "Физика", room="")))
+
+    def test_fingerprint_carries_the_date(self) -> None:
+        fingerprint: str = schedule_fingerprint(schedule("ИС-11", "Физика"))
+
+        self.assertTrue(fingerprint.startswith(f"{SCHEDULE_DATE}:"))
+        self.assertTrue(unsent_fingerprint(SCHEDULE_DATE).startswith(f"{SCHEDULE_DATE}:"))
+        self.assertNotEqual(fingerprint, unsent_fingerprint(SCHEDULE_DATE))
+
+
+class RepublishTest(BroadcastTestCase):
+    async def asyncSetUp(self) -> None:
+        await self.broadcast()
+
+    async def test_first_broadcast_reaches_every_chat(self) -> None:
+        self.assertEqual(self.bot.chats(), [1, 2, 3])
+        self.assertEqual(self.state.targets_sent_on(SCHEDULE_DATE), [FIRST, SECOND])
+
+    async def test_unchanged_republish_reads_no_subscriptions(self) -> None:
+        reads: int = self.database.reads
+
+        self.assertEqual(await self.republish(FIRST, schedule(FIRST.name, "Физика")), [])
+        self.assertEqual(self.database.reads, reads)
+
+    async def test_reordered_republish_is_not_a_change(self) -> None:
+        items: list[ScheduleItem] = schedule(FIRST.name, "Физика", "Химия").schedule_items
+        self.api.published[FIRST] = ScheduleGroup(SCHEDULE_DATE, FIRST.name, "", items)
+        self.api.cache.clear()
+        self.state.set_hash(FIRST, schedule_fingerprint(self.api.published[FIRST]))
+
+        reordered = ScheduleGroup(SCHEDULE_DATE, FIRST.name, "", list(reversed(items)))
+        self.assertEqual(await self.republish(FIRST, reordered), [])
+
+    async def test_changed_target_reaches_only_its_subscribers(self) -> None:
+        corrected: ScheduleGroup = schedule(FIRST.name, "Математика")
+
+        self.assertEqual(await self.republish(FIRST, corrected), [1, 3])
+        self.assertTrue(all("Математика" in text for _, text in self.bot.sent))
+        self.assertEqual(self.state.get_hash(FIRST), schedule_fingerprint(corrected))
+        self.assertIs(self.api.cache[FIRST], corrected)
+
+    async def test_reverted_schedule_is_sent_again(self) -> None:
+        self.assertEqual(await self.republish(FIRST, schedule(FIRST.name, "Математика")), [1, 3])
+
+        # Исправление отменили: подписчики уже получали это расписание в первой рассылке, но должны получить снова
+        self.assertEqual(await self.republish(FIRST, schedule(FIRST.name, "Физика")), [1, 3])
+        self.assertTrue(all("Физика" in text for _, text in self.bot.sent))
+
+    async def test_next_date_is_left_to_the_date_check(self) -> None:
+        next_day = ScheduleGroup("2026-10-20", FIRST.name, "", schedule(FIRST.name, "Математика").schedule_items)
+
+        self.assertEqual(await self.republish(FIRST, next_day), [])
+
+    async def test_content_check_loads_at_most_limit_targets(self) -> None:
+        self.api.published[FIRST] = schedule(FIRST.name, "Математика")
+        self.api.published[SECOND] = schedule(SECOND.name, "Математика")
+        self.bot.sent.clear()
+
+        await _check_republished(self.bot, self.state, use_workers=False, limit=1)
+
+        self.assertEqual(self.api.fresh_loads, 1)
+        self.assertIn(self.bot.chats(), ([1, 3], [2, 3]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import re
+import unittest
+from typing import Optional
+
+from src.database import Database, ScheduleSubscription
+from src.utils.schedule import SubGroup
+
+_SEEK = re.compile(r"^chat_id\.gt\.(-?\d+),and\(chat_id\.eq\.(-?\d+),id\.gt\.(\d+)\)$")
+
+
+class _Response:
+    def __init__(self, data: list[dict]) -> None:
+        self.data: list[dict] = data
+
+
+class _Query:
+    """Запрос PostgREST в той мере, в какой его строит iter_chat_subscription_pages"""
+
+    def __init__(self, table: "_Table") -> None:
+        self._table: _Table = table
+        self._order: list[str] = []
+        self._limit: int = 0
+        self._after: Optional[tuple[int, int]] = None
+
+    def select(self, *_) -> "_Query":
+        return self
+
+    def order(self, column: str) -> "_Query":
+        self._order.append(column)
+        return self
+
+    def limit(self, limit: int) -> "_Query":
+        self._limit = limit
+        return self
+
+    def or_(self, filters: str) -> "_Query":
+        match = _SEEK.match(filters)
+        assert match is not None and match.group(1) == match.group(2), filters
+        self._after = int(match.group(1)), int(match.group(3))
+        return self
+
+    async def execute(self) -> _Response:
+        assert self._order == ["chat_id", "id"], self._order
+        self._table.queries += 1
+
+        rows: list[dict] = sorted(self._table.rows, key=lambda row: (row["chat_id"], row["id"]))
+        if self._after is not None:
+            rows = [row for row in rows if (row["chat_id"], row["id"]) > self._after]
+        return _Response(rows[:self._limit])
+
+
+class _Table:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows: list[dict] = rows
+        self.queries: int = 0
+
+
+class _Supabase:
+    def __init__(self, rows: list[dict]) -> None:
+        self.table_data = _Table(rows)
+
+    def table(self, _: str) -> _Query:
+        return _Query(self.table_data)
+
+
+def _row(subscription_id: int, chat_id: int) -> dict:
+    return {"id": subscription_id, "chat_id": chat_id, "group_name": f"Г-{subscription_id}", "teacher_name": None,
+            "sub_group": SubGroup.BOTH}
+
+
+class ChatSubscriptionPagesTest(unittest.IsolatedAsyncioTestCase):
+    def _database(self, rows: list[dict]) -> Database:
+        database: Database = object.__new__(Database)
+        database._supabase = _Supabase(rows)
+        return database
+
+    async def _pages(self, database: Database, page_size: int) -> list[list[ScheduleSubscription]]:
+        return [page async for page in database.iter_chat_subscription_pages(page_size)]
+
+    async def test_chat_is_never_split_between_pages(self) -> None:
+        rows: list[dict] = [_row(1, 10), _row(2, 20), _row(5, 20), _row(3, 30), _row(4, 20), _row(6, 40)]
+
+        pages = await self._pages(self._database(rows), page_size=2)
+
+        chats_per_page: list[set[int]] = [{subscription.chat_id for subscription in page} for page in pages]
+        for first, second in zip(chats_per_page, chats_per_page[1:]):
+            self.assertFalse(first & second)
+
+        flat: list[tuple[int, int]] = [(s.chat_id, s.id) for page in pages for s in page]
+        self.assertEqual(flat, [(10, 1), (20, 2), (20, 4), (20, 5), (30, 3), (40, 6)])
+
+    async def test_chat_larger_than_page_is_carried_whole(self) -> None:
+        rows: list[dict] = [_row(subscription_id, 7) for subscription_id in range(1, 6)] + [_row(6, 8)]
+
+        pages = await self._pages(self._database(rows), page_size=2)
+
+        self.assertEqual([[s.id for s in page] for page in pages], [[1, 2, 3, 4, 5], [6]])
+
+    async def test_carried_rows_are_not_requested_again(self) -> None:
+        rows: list[dict] = [_row(subscription_id, subscription_id // 3) for subscription_id in range(1, 10)]
+        database: Database = self._database(rows)
+
+        pages = await self._pages(database, page_size=4)
+
+        self.assertEqual(sum(len(page) for page in pages), len(rows))
+        # Три страницы строк и пустой ответ в конце
+        self.assertEqual(database._supabase.table_data.queries, 4)
+
+    async def test_empty_table(self) -> None:
+        self.assertEqual(await self._pages(self._database([]), page_size=3), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from src.utils.digest import MESSAGE_LIMIT, SECTION_SEPARATOR, build_digest
+from src.utils.schedule import NO_SCHEDULE, ScheduleGroup, ScheduleItem, ScheduleStates, SubGroup
+
+
+def _group(name: str, lessons: int, subject: str = "Физика") -> ScheduleGroup:
+    items: list[ScheduleItem] = [
+        ScheduleItem(f"{8 + index % 10:02d}:30-10:00", f"{subject} {index}", name, "Иванов И.И.", str(100 + index),
+                     SubGroup.BOTH, ScheduleStates.OK)
+        for index in range(lessons)
+    ]
+    return ScheduleGroup("2026-10-19", name, "", items)
+
+
+class BuildDigestTest(unittest.TestCase):
+    def test_short_schedules_share_one_message(self) -> None:
+        first, second = _group("ИС-11", 3), _group("ИС-12", 2)
+
+        self.assertEqual(build_digest([first, second]),
+                         [first.pretty_schedule + SECTION_SEPARATOR + second.pretty_schedule])
+
+    def test_empty_schedule_is_rendered(self) -> None:
+        (message,) = build_digest([_group("ИС-11", 0)])
+
+        self.assertIn(NO_SCHEDULE, message)
+
+    def test_long_schedule_is_split_between_lessons(self) -> None:
+        group: ScheduleGroup = _group("ИС-11", 60, subject="Очень длинное название дисциплины " * 3)
+        self.assertGreater(len(group.pretty_schedule), MESSAGE_LIMIT)
+
+        messages: list[str] = build_digest([group])
+
+        self.assertGreater(len(messages), 1)
+        blocks: list[str] = list(group.lesson_blocks)
+        for message in messages:
+            self.assertLessEqual(len(message), MESSAGE_LIMIT)
+            # Продолжение начинается с заголовка и состоит из целых занятий подряд
+            self.assertTrue(message.startswith(group.schedule_header))
+            body: str = message[len(group.schedule_header):]
+            while body:
+                self.assertTrue(body.startswith(blocks[0]))
+                body = body[len(blocks.pop(0)):]
+
+        self.assertEqual(blocks, [])
+
+    def test_schedule_moves_to_next_message_when_it_does_not_fit(self) -> None:
+        first, second = _group("ИС-11", 3), _group("ИС-12", 3)
+        limit: int = len(first.pretty_schedule) + 10
+
+        self.assertEqual(build_digest([first, second], limit), [first.pretty_schedule, second.pretty_schedule])
+
+    def test_oversized_lesson_is_cut(self) -> None:
+        group: ScheduleGroup = _group("ИС-11", 1, subject="x" * 300)
+
+        messages: list[str] = build_digest([group], limit=100)
+
+        self.assertTrue(all(len(message) <= 100 for message in messages))
+        self.assertEqual("".join(messages), group.pretty_schedule)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from typing import Optional
+from unittest import mock
+
+from telegram.error import BadRequest
+
+from src.api_communicator import ApiCommunicator
+from src.handlers.inline import (PARTIAL_FETCH_LIMIT, SCHEDULE_CALLBACK, TRUNCATED_NOTE, _build_answer,
+                                 show_schedule)
+from src.utils.digest import MESSAGE_LIMIT
+from src.utils.directory import Directory, build_directory
+from src.utils.schedule import ScheduleGroup, ScheduleItem, ScheduleKind, ScheduleStates, ScheduleTarget, SubGroup
+
+LOADED = ScheduleTarget(ScheduleKind.STUDENT, "ИС-11")
+MISSING = ScheduleTarget(ScheduleKind.STUDENT, "ИС-12")
+
+
+def schedule(group_name: str, lessons: int = 1) -> ScheduleGroup:
+    items: list[ScheduleItem] = [
+        ScheduleItem("08:30-10:00", f"Предмет {index}", group_name, "Иванов И.И.", "101", SubGroup.BOTH,
+                     ScheduleStates.OK)
+        for index in range(lessons)
+    ]
+    return ScheduleGroup("2026-10-19", group_name, "", items)
+
+
+def _title(target: ScheduleTarget) -> str:
+    return f"Группа {target.name.upper()}"
+
+
+class _Api:
+    """API, у которого загружено только расписание LOADED; остальные загружаются, пока не выставлен slow"""
+
+    def __init__(self, groups: list[str] = ("ИС-11", "ИС-12")) -> None:
+        self.directory: Directory = build_directory(list(groups), [])
+        self.targets: list[ScheduleTarget] = [ScheduleTarget(ScheduleKind.STUDENT, name) for name in groups]
+        self.fetched: list[ScheduleTarget] = []
+        self.slow: asyncio.Event = asyncio.Event()
+        self.slow.set()
+        self.lessons: int = 1
+
+    async def get_directory(self) -> Directory:
+        return self.directory
+
+    async def search(self, _: str, limit: int) -> list[ScheduleTarget]:
+        return self.targets[:limit]
+
+    def loaded_schedule(self, target: ScheduleTarget) -> Optional[ScheduleGroup]:
+        return schedule(target.name) if target == LOADED else None
+
+    async def get_schedule(self, target: ScheduleTarget) -> ScheduleGroup:
+        self.fetched.append(target)
+        await self.slow.wait()
+        return schedule(target.name, self.lessons)
+
+
+class PartialQueryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_partial_query_loads_missing_targets_in_rank_order(self) -> None:
+        api = _Api()
+
+        (results, next_offset), complete = await _build_answer(api, "ис", 0)
+
+        self.assertEqual([result.title for result in results], ["Группа ИС-11", "Группа ИС-12"])
+        self.assertEqual(api.fetched, [MISSING])
+        self.assertTrue(all(result.reply_markup is None for result in results))
+        self.assertIn("ИС-12", results[1].input_message_content.message_text)
+        self.assertIsNone(next_offset)
+        self.assertTrue(complete)
+
+    async def test_only_top_ranked_targets_are_loaded(self) -> None:
+        api = _Api([f"ИС-{index}" for index in range(11, 21)])
+
+        (results, _), complete = await _build_answer(api, "ис", 0)
+
+        self.assertEqual(api.fetched, api.targets[1:1 + PARTIAL_FETCH_LIMIT])
+        self.assertEqual([result.title for result in results], [_title(target) for target in api.targets])
+        self.assertIsNotNone(results[-1].reply_markup)
+        self.assertFalse(complete)
+
+    async def test_slow_target_becomes_pending_result(self) -> None:
+        api = _Api()
+        api.slow.clear()
+
+        with mock.patch("src.handlers.inline.PARTIAL_FETCH_TIMEOUT", 0.01):
+            (results, _), complete = await _build_answer(api, "ис", 0)
+        api.slow.set()
+
+        self.assertIsNone(results[0].reply_markup)
+        self.assertEqual(results[1].reply_markup.inline_keyboard[0][0].callback_data,
+                         f"{SCHEDULE_CALLBACK}:STUDENT:ИС-12")
+        self.assertFalse(complete)
+
+    async def test_long_schedule_is_cut_between_lessons(self) -> None:
+        api = _Api()
+        api.lessons = 200
+
+        (results, _), _ = await _build_answer(api, "ис", 0)
+        text: str = results[1].input_message_content.message_text
+
+        self.assertLessEqual(len(text), MESSAGE_LIMIT)
+        self.assertTrue(text.endswith(TRUNCATED_NOTE))
+
+
+class _CallbackQuery:
+    def __init__(self, data: str, edit_error: Optional[Exception] = None) -> None:
+        self.data: str = data
+        self.edit_error: Optional[Exception] = edit_error
+        self.alerts: list[str] = []
+        self.edited: list[str] = []
+
+    async def answer(self, text: Optional[str] = None, show_alert: bool = False) -> None:
+        if show_alert:
+            self.alerts.append(text)
+
+    async def edit_message_text(self, text: str) -> None:
+        if self.edit_error is not None:
+            raise self.edit_error
+        self.edited.append(text)
+
+
+class ShowScheduleTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.api = _Api()
+        ApiCommunicator.instance = self.api
+        self.addCleanup(setattr, ApiCommunicator, "instance", None)
+
+    async def press(self, query: _CallbackQuery) -> _CallbackQuery:
+        await show_schedule(SimpleNamespace(callback_query=query), None)
+        return query
+
+    async def test_shows_schedule(self) -> None:
+        query: _CallbackQuery = await self.press(_CallbackQuery(f"{SCHEDULE_CALLBACK}:STUDENT:ИС-12"))
+
+        self.assertEqual(query.alerts, [])
+        self.assertIn("ИС-12", query.edited[0])
+
+    async def test_forged_data_is_not_fetched(self) -> None:
+        for data in (f"{SCHEDULE_CALLBACK}:ROOM:101", f"{SCHEDULE_CALLBACK}:STUDENT",
+                     f"{SCHEDULE_CALLBACK}:STUDENT:ЧУЖАЯ"):
+            query: _CallbackQuery = await self.press(_CallbackQuery(data))
+
+            self.assertEqual(len(query.alerts), 1, data)
+            self.assertEqual(query.edited, [])
+        self.assertEqual(self.api.fetched, [])
+
+    async def test_long_schedule_fits_one_message(self) -> None:
+        self.api.lessons = 200
+
+        query: _CallbackQuery = await self.press(_CallbackQuery(f"{SCHEDULE_CALLBACK}:STUDENT:ИС-12"))
+
+        self.assertLessEqual(len(query.edited[0]), MESSAGE_LIMIT)
+
+    async def test_unmodified_message_is_not_an_error(self) -> None:
+        error = BadRequest("Message is not modified: specified new message content is the same")
+
+        query: _CallbackQuery = await self.press(_CallbackQuery(f"{SCHEDULE_CALLBACK}:STUDENT:ИС-12", error))
+
+        self.assertEqual(query.alerts, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import time
+import unittest
+
+from src.outbox import JobStatus
+from tests.test_outbox import OutboxTestCase
+
+BROADCAST = "2026-10-19"
+
+
+class JobQueueTest(OutboxTestCase):
+    def _submit(self, *page_keys: int) -> int:
+        self.outbox.start_broadcast(BROADCAST)
+        self.outbox.submit_jobs(BROADCAST, [(page_key, {"page": page_key}) for page_key in page_keys])
+        return self.outbox.publish_jobs(BROADCAST)
+
+    def test_held_jobs_wait_for_publish(self) -> None:
+        self.outbox.start_broadcast(BROADCAST)
+        self.outbox.submit_jobs(BROADCAST, [(1, {"page": 1})])
+
+        self.assertIsNone(self.outbox.claim_job("w1", 60))
+        self.assertEqual(self.outbox.open_jobs(), 0)
+
+        self.assertEqual(self.outbox.publish_jobs(BROADCAST), 1)
+        self.assertEqual(self.outbox.claim_job("w1", 60).payload, {"page": 1})
+
+    def test_resubmitted_pages_are_ignored(self) -> None:
+        self._submit(1, 2)
+
+        self.assertEqual(self.outbox.submit_jobs(BROADCAST, [(2, {"page": 2}), (3, {"page": 3})]), 1)
+
+    def test_jobs_are_claimed_once_in_order(self) -> None:
+        self._submit(1, 2)
+
+        first = self.outbox.claim_job("w1", 60)
+        second = self.outbox.claim_job("w2", 60)
+
+        self.assertEqual((first.payload["page"], second.payload["page"]), (1, 2))
+        self.assertIsNone(self.outbox.claim_job("w3", 60))
+
+    def test_abandoned_claim_is_reissued(self) -> None:
+        self._submit(1)
+        job = self.outbox.claim_job("w1", 60)
+
+        self.assertIsNone(self.outbox.claim_job("w2", 0.05))
+        time.sleep(0.1)
+        reissued = self.outbox.claim_job("w2", 0.05)
+
+        self.assertEqual(reissued.id, job.id)
+        self.assertFalse(self.outbox.extend_claim(job.id, "w1"))
+        self.assertFalse(self.outbox.complete_job(job.id, "w1", {"delivered": 1}))
+        self.assertTrue(self.outbox.complete_job(job.id, "w2", {"delivered": 1}))
+
+    def test_heartbeat_keeps_claim(self) -> None:
+        self._submit(1)
+        job = self.outbox.claim_job("w1", 0.1)
+
+        time.sleep(0.06)
+        self.assertTrue(self.outbox.extend_claim(job.id, "w1"))
+        time.sleep(0.06)
+
+        self.assertIsNone(self.outbox.claim_job("w2", 0.1))
+
+    def test_released_job_waits_and_counts_attempts(self) -> None:
+        self._submit(1)
+        job = self.outbox.claim_job("w1", 60)
+
+        self.assertTrue(self.outbox.release_job(job.id, "w1", 0.05))
+        self.assertIsNone(self.outbox.claim_job("w1", 60))
+        self.assertEqual(self.outbox.open_jobs(), 1)
+
+        time.sleep(0.1)
+        retried = self.outbox.claim_job("w1", 60)
+        self.assertEqual((retried.id, retried.attempts), (job.id, 1))
+
+    def test_results_are_collected_when_all_jobs_are_done(self) -> None:
+        self._submit(1, 2)
+        first = self.outbox.claim_job("w1", 60)
+        self.outbox.complete_job(first.id, "w1", {"delivered": 1})
+
+        self.assertEqual(self.outbox.completed_jobs(), {})
+
+        second = self.outbox.claim_job("w1", 60)
+        self.outbox.complete_job(second.id, "w1", {"delivered": 2})
+
+        self.assertEqual(self.outbox.completed_jobs(), {BROADCAST: [{"delivered": 1}, {"delivered": 2}]})
+        self.assertEqual(self.outbox.open_jobs(), 0)
+
+    def test_open_jobs_by_broadcast_and_kind(self) -> None:
+        self._submit(1)
+        self.outbox.start_broadcast("2026-10-20")
+        self.outbox.submit_jobs("2026-10-20", [(1, {"republish": True}), (2, {"republish": False})])
+        self.outbox.publish_jobs("2026-10-20")
+
+        self.assertEqual(self.outbox.open_jobs(), 3)
+        self.assertEqual(self.outbox.open_jobs("2026-10-20"), 2)
+        self.assertEqual(self.outbox.open_jobs(republish=True), 1)
+        self.assertEqual(self.outbox.open_jobs(republish=False), 2)
+        self.assertEqual(self.outbox.open_jobs(BROADCAST, republish=True), 0)
+
+    def test_empty_broadcast_has_nothing_to_publish(self) -> None:
+        self.assertEqual(self._submit(), 0)
+
+    def test_finish_drops_jobs(self) -> None:
+        self._submit(1)
+        self.outbox.finish_broadcast(BROADCAST)
+
+        count = self.outbox._connect().execute("SELECT COUNT(*) FROM jobs WHERE status != ?", (JobStatus.DONE,))
+        self.assertEqual(count.fetchone()[0], 0)
+        self.assertEqual(self.outbox.unfinished_broadcasts(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from telegram.error import BadRequest, ChatMigrated, Conflict, Forbidden, InvalidToken, NetworkError, RetryAfter, TimedOut
+
+from src.utils.message_sender import MessageDispatcher, SendResult, TokenBucket, send_message
+
+
+class _Bot:
+    """Бот, который отвечает на отправку заданной ошибкой; с chat_id — только для этого чата"""
+
+    def __init__(self, error: Exception = None, chat_id: int = None) -> None:
+        self._error: Exception = error
+        self._chat_id: int = chat_id
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str, **_) -> None:
+        if self._error is not None and self._chat_id in (None, chat_id):
+            raise self._error
+        self.sent.append((chat_id, text))
+
+
+class SendMessageTest(unittest.IsolatedAsyncioTestCase):
+    async def test_sent(self) -> None:
+        bot = _Bot()
+
+        self.assertEqual(await send_message(bot, 1, "a"), SendResult.SENT)
+        self.assertEqual(bot.sent, [(1, "a")])
+
+    async def test_terminal_errors_are_rejected(self) -> None:
+        for error in (Forbidden("bot was blocked by the user"), BadRequest("chat not found"),
+                      InvalidToken(), Conflict("terminated by other getUpdates request")):
+            with self.subTest(error=error):
+                self.assertEqual(await send_message(_Bot(error), 1, "a"), SendResult.REJECTED)
+
+    async def test_transient_errors_are_deferred(self) -> None:
+        for error in (NetworkError("connection reset"), RetryAfter(30)):
+            with self.subTest(error=error):
+                self.assertEqual(await send_message(_Bot(error), 1, "a"), SendResult.DEFERRED)
+
+    async def test_migrated_chat_gets_message_under_new_id(self) -> None:
+        bot = _Bot(ChatMigrated(-100500), chat_id=-5)
+
+        self.assertEqual(await send_message(bot, -5, "a"), SendResult.SENT)
+        self.assertEqual(bot.sent, [(-100500, "a")])
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    async def _acquire_times(self, bucket: TokenBucket, count: int) -> list[float]:
+        started: float = time.monotonic()
+        times: list[float] = []
+        for _ in range(count):
+            await bucket.acquire()
+            times.append(time.monotonic() - started)
+        return times
+
+    async def test_burst_passes_without_waiting(self) -> None:
+        times = await self._acquire_times(TokenBucket(rate=10, capacity=3), 3)
+
+        self.assertLess(times[-1], 0.05)
+
+    async def test_requests_over_burst_wait_for_rate(self) -> None:
+        times = await self._acquire_times(TokenBucket(rate=20, capacity=2), 4)
+
+        self.assertLess(times[1], 0.03)
+        self.assertGreaterEqual(times[2], 0.04)
+        self.assertGreaterEqual(times[3], 0.09)
+
+    async def test_idle_bucket_refills_only_to_capacity(self) -> None:
+        bucket = TokenBucket(rate=100, capacity=2)
+        await self._acquire_times(bucket, 2)
+        await asyncio.sleep(0.1)
+
+        self.assertTrue(bucket.idle)
+        times = await self._acquire_times(bucket, 3)
+        self.assertGreaterEqual(times[2], 0.008)
+
+
+class MessageDispatcherTest(unittest.IsolatedAsyncioTestCase):
+    """У каждого теста свой ограничитель без пауз между повторами"""
+
+    def setUp(self) -> None:
+        patcher = mock.patch("src.utils.message_sender.BACKOFF_BASE", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        MessageDispatcher.instance = None
+        self.dispatcher = MessageDispatcher(global_rate=1000)
+        self.addCleanup(setattr, MessageDispatcher, "instance", None)
+        self.calls: list[tuple[int, float]] = []
+
+    def _callback(self, chat_id: int, *errors: Exception):
+        """Запрос, который сначала отвечает ошибками errors, а потом успешно"""
+
+        pending: list[Exception] = list(errors)
+
+        async def callback() -> bool:
+            self.calls.append((chat_id, time.monotonic()))
+            if pending:
+                raise pending.pop(0)
+            return True
+
+        return callback
+
+    async def _send(self, chat_id: int, *errors: Exception, endpoint: str = "sendMessage") -> bool:
+        return await self.dispatcher.process_request(self._callback(chat_id, *errors), (), {}, endpoint,
+                                                     {"chat_id": chat_id}, None)
+
+    async def test_private_and_group_chats_have_separate_rates(self) -> None:
+        with mock.patch.multiple("src.utils.message_sender", PRIVATE_CHAT_RATE=50, GROUP_CHAT_RATE=5, CHAT_BURST=1):
+            started: float = time.monotonic()
+            await asyncio.gather(self._send(1), self._send(1), self._send(-1), self._send(-1))
+
+        finished: dict[int, float] = {}
+        for chat_id, at in self.calls:
+            finished[chat_id] = at - started
+
+        self.assertLess(finished[1], 0.1)
+        self.assertGreaterEqual(finished[-1], 0.18)
+
+    async def test_retry_after_pauses_all_chats(self) -> None:
+        started: float = time.monotonic()
+        paused = asyncio.create_task(self._send(1, RetryAfter(0)))
+        await asyncio.sleep(0.02)
+        await self._send(2)
+        await paused
+
+        second_chat: float = next(at for chat_id, at in self.calls if chat_id == 2)
+        self.assertGreaterEqual(second_chat - started, 0.09)
+        self.assertEqual(sorted(chat_id for chat_id, _ in self.calls), [1, 1, 2])
+        self.assertEqual(self.dispatcher.stats.retry_after, 1)
+
+    async def test_timed_out_send_is_not_retried(self) -> None:
+        with self.assertRaises(TimedOut):
+            await self._send(1, TimedOut())
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.dispatcher.stats.failed, 1)
+
+    async def test_timed_out_read_is_retried(self) -> None:
+        self.assertTrue(await self._send(1, TimedOut(), endpoint="getChat"))
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.dispatcher.stats.retried, 1)
+
+    async def test_forbidden_chats_are_recorded(self) -> None:
+        with self.assertRaises(Forbidden):
+            await self._send(-5, Forbidden("bot was kicked from the group chat"))
+
+        self.assertEqual(self.dispatcher.pop_forbidden_chats(), {-5})
+        self.assertEqual(self.dispatcher.pop_forbidden_chats(), set())
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_permanent_errors_are_not_retried(self) -> None:
+        for error in (InvalidToken(), Conflict("terminated by other getUpdates request")):
+            with self.subTest(error=error):
+                self.calls.clear()
+                with self.assertRaises(type(error)):
+                    await self._send(1, error)
+                self.assertEqual(len(self.calls), 1)
+
+        self.assertEqual(self.dispatcher.stats.retried, 0)
+
+    async def test_migrated_chats_are_recorded(self) -> None:
+        with self.assertRaises(ChatMigrated):
+            await self._send(-5, ChatMigrated(-100500))
+
+        self.assertEqual(self.dispatcher.pop_migrated_chats(), {-5: -100500})
+        self.assertEqual(self.dispatcher.pop_migrated_chats(), {})
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_retry_after_gives_up_after_max_retries(self) -> None:
+        MessageDispatcher.instance = None
+        self.dispatcher = MessageDispatcher(global_rate=1000, max_retries=2)
+
+        with self.assertRaises(RetryAfter):
+            await self._send(1, *(RetryAfter(0) for _ in range(3)))
+
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.dispatcher.stats.retry_after, 3)
+        self.assertEqual(self.dispatcher.stats.failed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,17 @@
+import unittest
+
+from src.notification_worker import _worker_send_rate
+from src.utils.message_sender import BOT_RESERVED_RATE, GLOBAL_RATE, WORKER_SEND_RATE
+
+
+class WorkerSendRateTest(unittest.TestCase):
+    def test_bot_keeps_its_share_of_the_token_limit(self) -> None:
+        self.assertEqual(WORKER_SEND_RATE + BOT_RESERVED_RATE, GLOBAL_RATE)
+
+    def test_rate_over_the_workers_share_is_capped(self) -> None:
+        self.assertEqual(_worker_send_rate(GLOBAL_RATE), WORKER_SEND_RATE)
+        self.assertEqual(_worker_send_rate(5), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+from src.outbox import MAX_DELIVERY_ATTEMPTS, DeliveryStatus, Outbox, make_delivery
+
+
+class OutboxTestCase(unittest.TestCase):
+    """Каждый тест получает свой журнал во временном каталоге"""
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        Outbox.instance = None
+        self.outbox = Outbox(os.path.join(directory.name, "outbox.sqlite3"))
+        self.addCleanup(self._close)
+
+    def _close(self) -> None:
+        self.outbox.close()
+        Outbox.instance = None
+
+
+class DeliveryJournalTest(OutboxTestCase):
+    def test_unfinished_broadcast_resumes_pending_deliveries(self) -> None:
+        first, second, third = (make_delivery(chat_id, f"Расписание {chat_id}") for chat_id in (1, 2, 3))
+
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", [first, second, third])
+        self.outbox.mark("2026-10-19", first.key, DeliveryStatus.DELIVERED)
+        self.outbox.mark("2026-10-19", second.key, DeliveryStatus.FAILED)
+
+        self.assertEqual(self.outbox.unfinished_broadcasts(), ["2026-10-19"])
+        self.assertEqual(self.outbox.unfinished(), {"2026-10-19": [third]})
+        self.assertEqual(self.outbox.pending_count("2026-10-19"), 1)
+
+    def test_restarted_broadcast_skips_completed(self) -> None:
+        delivered, pending = make_delivery(1, "a"), make_delivery(2, "b")
+
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", [delivered, pending])
+        self.outbox.mark("2026-10-19", delivered.key, DeliveryStatus.DELIVERED)
+
+        self.assertEqual(self.outbox.start_broadcast("2026-10-19"), {delivered.key})
+        self.assertEqual(self.outbox.completed("2026-10-19", [1, 2]), {delivered.key})
+        self.assertEqual(self.outbox.completed("2026-10-19", [2]), set())
+
+    def test_forget_completed_keeps_pending(self) -> None:
+        delivered, failed, pending = make_delivery(1, "a"), make_delivery(2, "b"), make_delivery(3, "c")
+
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", [delivered, failed, pending])
+        self.outbox.mark("2026-10-19", delivered.key, DeliveryStatus.DELIVERED)
+        self.outbox.mark("2026-10-19", failed.key, DeliveryStatus.FAILED)
+        self.outbox.forget_completed("2026-10-19")
+
+        self.assertEqual(self.outbox.start_broadcast("2026-10-19"), set())
+        self.assertEqual(self.outbox.unfinished(), {"2026-10-19": [pending]})
+
+    def test_deferred_delivery_fails_after_max_attempts(self) -> None:
+        delivery = make_delivery(1, "a")
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", [delivery])
+
+        for _ in range(MAX_DELIVERY_ATTEMPTS - 1):
+            self.assertEqual(self.outbox.defer("2026-10-19", delivery.key), DeliveryStatus.PENDING)
+        self.assertEqual(self.outbox.defer("2026-10-19", delivery.key), DeliveryStatus.FAILED)
+
+        self.assertEqual(self.outbox.pending_count("2026-10-19"), 0)
+
+    def test_enqueue_is_idempotent(self) -> None:
+        delivery = make_delivery(1, "a")
+
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", [delivery])
+        self.outbox.mark("2026-10-19", delivery.key, DeliveryStatus.DELIVERED)
+        self.outbox.enqueue("2026-10-19", [delivery])
+
+        self.assertEqual(self.outbox.pending_count("2026-10-19"), 0)
+
+    def test_digest_parts_resume_in_order(self) -> None:
+        parts = [make_delivery(1, f"часть {part}", part) for part in (1, 0, 2)]
+
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", parts)
+
+        self.assertEqual([delivery.part for delivery in self.outbox.unfinished()["2026-10-19"]], [0, 1, 2])
+
+    def test_finished_broadcast_is_not_resumed(self) -> None:
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", [make_delivery(1, "a")])
+        self.outbox.finish_broadcast("2026-10-19")
+
+        self.assertEqual(self.outbox.unfinished_broadcasts(), [])
+        self.assertEqual(self.outbox.unfinished(), {})
+
+    def test_journal_survives_reopen(self) -> None:
+        delivery = make_delivery(1, "a")
+        self.outbox.start_broadcast("2026-10-19")
+        self.outbox.enqueue("2026-10-19", [delivery])
+
+        path: str = self.outbox._path
+        self.outbox.close()
+        Outbox.instance = None
+        self.outbox = Outbox(path)
+
+        self.assertEqual(self.outbox.unfinished(), {"2026-10-19": [delivery]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+from telegram.error import InvalidToken, NetworkError
+
+from src.handlers.schedule_anounce import _collect_broadcasts, _resume_unfinished
+from src.outbox import MAX_DELIVERY_ATTEMPTS
+from tests.test_change_detection import SCHEDULE_DATE, BroadcastTestCase, FakeBot
+
+
+class FailingBot(FakeBot):
+    """Бот, который не может отправить сообщение в чат failing_chat"""
+
+    def __init__(self, failing_chat: int, error: Exception) -> None:
+        super().__init__()
+        self.failing_chat: int = failing_chat
+        self.error: Exception = error
+        self.attempts: int = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        if chat_id == self.failing_chat:
+            self.attempts += 1
+            raise self.error
+        await super().send_message(chat_id, text, **kwargs)
+
+
+class StuckDeliveryTest(BroadcastTestCase):
+    async def test_permanent_error_finishes_broadcast(self) -> None:
+        self.bot = FailingBot(2, InvalidToken())
+
+        await self.broadcast()
+
+        self.assertEqual(self.bot.chats(), [1, 3])
+        self.assertEqual(self.outbox.unfinished_broadcasts(), [])
+
+    async def test_transient_error_is_retried_a_bounded_number_of_times(self) -> None:
+        self.bot = FailingBot(2, NetworkError("connection reset"))
+
+        await self.broadcast()
+        self.assertEqual(self.outbox.pending_count(SCHEDULE_DATE), 1)
+
+        for _ in range(MAX_DELIVERY_ATTEMPTS * 2):
+            await _resume_unfinished(self.bot, self.state, use_workers=False)
+
+        self.assertEqual(self.bot.attempts, MAX_DELIVERY_ATTEMPTS)
+        self.assertEqual(self.outbox.unfinished_broadcasts(), [])
+        self.assertEqual(self.bot.chats(), [1, 3])
+
+
+class ResumeTest(BroadcastTestCase):
+    async def asyncSetUp(self) -> None:
+        self.bot = FailingBot(2, NetworkError("connection reset"))
+        # Состояние сохраняется вместе со справочником, которого у поддельного API нет
+        self.api.directory = None
+        await self.broadcast()
+        self.reads: int = self.database.reads
+
+    async def test_collected_broadcast_resends_only_pending_rows(self) -> None:
+        for use_workers in (False, True):
+            with self.subTest(use_workers=use_workers):
+                await _resume_unfinished(self.bot, self.state, use_workers)
+
+                self.assertEqual(self.database.reads, self.reads)
+                self.assertEqual(self.outbox.open_jobs(), 0)
+
+        self.assertEqual(self.bot.attempts, 3)
+
+    async def test_interrupted_collection_is_repeated(self) -> None:
+        # Рассылка началась заново и прервалась до конца сбора
+        self.outbox.start_broadcast(SCHEDULE_DATE)
+
+        await _resume_unfinished(self.bot, self.state, use_workers=False)
+
+        self.assertEqual(self.database.reads, self.reads + 1)
+
+    async def test_only_new_date_jobs_delay_the_date_check(self) -> None:
+        self.outbox.start_broadcast(SCHEDULE_DATE)
+        self.outbox.submit_jobs(SCHEDULE_DATE, [(1, {"republish": True})])
+        self.outbox.publish_jobs(SCHEDULE_DATE)
+        self.assertFalse(await _collect_broadcasts(self.state))
+
+        self.outbox.start_broadcast("2026-10-20")
+        self.outbox.submit_jobs("2026-10-20", [(1, {"republish": False})])
+        self.outbox.publish_jobs("2026-10-20")
+        self.assertTrue(await _collect_broadcasts(self.state))
+
+    async def test_broadcast_in_workers_hands_is_left_alone(self) -> None:
+        self.outbox.submit_jobs(SCHEDULE_DATE, [(1, {"republish": True})])
+        self.outbox.publish_jobs(SCHEDULE_DATE)
+
+        await _resume_unfinished(self.bot, self.state, use_workers=True)
+
+        self.assertEqual(self.bot.attempts, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+from src.schedule_poller import PUBLISH_HISTORY, PollConfig, PollScheduler, parse_windows
+
+CONFIG = PollConfig(fast_interval=120, slow_interval=1800, max_backoff=900, windows=((17 * 60, 21 * 60),),
+                    learned_margin=30, content_interval=600, content_after_publish=3 * 60 * 60)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2026, 10, 19, hour, minute)
+
+
+def requests_per_day(config: PollConfig, targets: int, publish: datetime = at(18)) -> int:
+    """
+    Запросы к API за сутки проверок по расписанию poller: дата на каждой проверке и, когда перепроверка
+    содержимого пора, по запросу на перепроверяемую цель. Расписание публикуется в publish.
+    """
+
+    poller = PollScheduler(config)
+    moment: datetime = at(0)
+    requests: int = 0
+
+    while moment < at(0) + timedelta(days=1):
+        requests += 1
+        if moment >= publish and not poller.publish_minutes:
+            poller.record_publish(moment)
+        elif poller.content_check_due(moment):
+            requests += min(targets, config.content_targets)
+            poller.record_content_check(moment)
+        moment += timedelta(seconds=poller.next_delay(moment))
+
+    return requests
+
+
+class ParseWindowsTest(unittest.TestCase):
+    def test_windows(self) -> None:
+        self.assertEqual(parse_windows("17:00-21:30, 7-8:15,"), ((1020, 1290), (420, 495)))
+        self.assertEqual(parse_windows("23:00-24:00"), ((1380, 0),))
+        self.assertEqual(parse_windows(""), ())
+
+    def test_invalid_time(self) -> None:
+        with self.assertRaises(ValueError):
+            parse_windows("25:00-26:00")
+
+
+class PollSchedulerTest(unittest.TestCase):
+    def test_fast_inside_window(self) -> None:
+        poller = PollScheduler(CONFIG)
+
+        self.assertTrue(poller.in_window(at(17)))
+        self.assertEqual(poller.next_delay(at(18, 30)), CONFIG.fast_interval)
+        self.assertFalse(poller.in_window(at(21)))
+
+    def test_slow_far_from_window(self) -> None:
+        self.assertEqual(PollScheduler(CONFIG).next_delay(at(9)), CONFIG.slow_interval)
+
+    def test_wakes_up_at_window_start(self) -> None:
+        poller = PollScheduler(CONFIG)
+
+        self.assertEqual(poller.next_delay(at(16, 50)), 10 * 60)
+        # Ближе fast_interval к окну пауза не сокращается
+        self.assertEqual(poller.next_delay(at(16, 59)), CONFIG.fast_interval)
+
+    def test_window_over_midnight(self) -> None:
+        poller = PollScheduler(PollConfig(windows=((23 * 60, 60),)))
+
+        self.assertTrue(poller.in_window(at(23, 30)))
+        self.assertTrue(poller.in_window(at(0, 30)))
+        self.assertFalse(poller.in_window(at(1)))
+
+    def test_learned_windows(self) -> None:
+        poller = PollScheduler(CONFIG, publish_minutes=[8 * 60])
+
+        self.assertTrue(poller.in_window(at(7, 45)))
+        self.assertFalse(poller.in_window(at(8, 30)))
+
+        poller.record_publish(at(12, 10))
+        self.assertTrue(poller.in_window(at(12, 30)))
+        self.assertEqual(poller.publish_minutes, [8 * 60, 12 * 60 + 10])
+
+    def test_publish_history_is_bounded(self) -> None:
+        poller = PollScheduler(CONFIG, publish_minutes=range(PUBLISH_HISTORY))
+        poller.record_publish(at(10))
+
+        self.assertEqual(len(poller.publish_minutes), PUBLISH_HISTORY)
+        self.assertEqual(poller.publish_minutes[-1], 10 * 60)
+
+    def test_backoff_grows_with_jitter_up_to_max(self) -> None:
+        poller = PollScheduler(CONFIG)
+
+        for errors, backoff in ((1, 120), (2, 240), (3, 480), (4, 900), (10, 900)):
+            while poller.errors < errors:
+                poller.record_error()
+            for _ in range(20):
+                self.assertTrue(backoff / 2 <= poller.next_delay(at(18)) <= backoff, (errors, backoff))
+
+        poller.record_success()
+        self.assertEqual(poller.errors, 0)
+        self.assertEqual(poller.next_delay(at(18)), CONFIG.fast_interval)
+
+    def test_window_changed_reports_transitions_once(self) -> None:
+        poller = PollScheduler(CONFIG)
+
+        self.assertFalse(poller.window_changed(at(16)))
+        self.assertIsNone(poller.window_changed(at(16, 30)))
+        self.assertTrue(poller.window_changed(at(17)))
+        self.assertIsNone(poller.window_changed(at(18)))
+        self.assertFalse(poller.window_changed(at(21)))
+
+    def test_content_check_in_window_and_after_publish(self) -> None:
+        poller = PollScheduler(CONFIG)
+
+        self.assertFalse(poller.content_check_due(at(9)))
+        self.assertTrue(poller.content_check_due(at(18)))
+
+        poller.record_publish(at(9))
+        self.assertTrue(poller.content_check_due(at(11, 59)))
+        self.assertFalse(poller.content_check_due(at(12)))
+
+    def test_content_check_interval(self) -> None:
+        poller = PollScheduler(CONFIG)
+        poller.record_content_check(at(18))
+
+        self.assertFalse(poller.content_check_due(at(18) + timedelta(seconds=CONFIG.content_interval - 1)))
+        self.assertTrue(poller.content_check_due(at(18) + timedelta(seconds=CONFIG.content_interval)))
+
+    def test_content_check_is_off_by_default(self) -> None:
+        poller = PollScheduler(PollConfig(windows=CONFIG.windows))
+        poller.record_publish(at(18))
+
+        self.assertFalse(poller.content_check_due(at(18, 30)))
+
+
+class RequestsPerDayTest(unittest.TestCase):
+    """Число запросов к API за сутки с 300 разосланными целями"""
+
+    TARGETS = 300
+
+    def test_content_check_no_longer_multiplies_requests(self) -> None:
+        # Прежняя настройка: перепроверка раз в 10 минут всех разосланных целей
+        baseline: int = requests_per_day(replace(CONFIG, content_targets=self.TARGETS), self.TARGETS)
+        bounded: int = requests_per_day(CONFIG, self.TARGETS)
+        default: int = requests_per_day(PollConfig(fast_interval=CONFIG.fast_interval,
+                                                   slow_interval=CONFIG.slow_interval, windows=CONFIG.windows),
+                                        self.TARGETS)
+
+        date_checks: int = requests_per_day(replace(CONFIG, content_interval=0), self.TARGETS)
+        self.assertEqual(default, date_checks)
+        self.assertLess(bounded, baseline / 10)
+        self.assertLess(default, bounded)
+
+
+if __name__ == "__main__":
+    unittest.main()
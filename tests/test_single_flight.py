@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+
+from src.utils.single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.flights: SingleFlight[str, int] = SingleFlight()
+        self.calls: int = 0
+        self.release = asyncio.Event()
+
+    async def _load(self) -> int:
+        self.calls += 1
+        await self.release.wait()
+        return self.calls
+
+    async def test_concurrent_calls_share_one_request(self) -> None:
+        callers = [asyncio.create_task(self.flights.do("a", self._load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertEqual(await asyncio.gather(*callers), [1, 1, 1])
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(self.flights), 0)
+
+    async def test_other_keys_are_not_coalesced(self) -> None:
+        self.release.set()
+
+        await asyncio.gather(self.flights.do("a", self._load), self.flights.do("b", self._load))
+
+        self.assertEqual(self.calls, 2)
+
+    async def test_finished_request_is_not_reused(self) -> None:
+        self.release.set()
+
+        self.assertEqual(await self.flights.do("a", self._load), 1)
+        self.assertEqual(await self.flights.do("a", self._load), 2)
+
+    async def test_error_is_shared_and_forgotten(self) -> None:
+        async def fail() -> int:
+            self.calls += 1
+            await self.release.wait()
+            raise RuntimeError("API недоступно")
+
+        callers = [asyncio.create_task(self.flights.do("a", fail)) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.release.set()
+
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(self.flights), 0)
+
+    async def test_cancelled_waiter_does_not_cancel_others(self) -> None:
+        leader = asyncio.create_task(self.flights.do("a", self._load))
+        joiner = asyncio.create_task(self.flights.do("a", self._load))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertEqual(await joiner, 1)
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(self.calls, 1)
+
+    async def test_last_waiter_cancels_request(self) -> None:
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def load() -> int:
+            started.set()
+            try:
+                await self.release.wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return 1
+
+        caller = asyncio.create_task(self.flights.do("a", load))
+        await started.wait()
+        caller.cancel()
+
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.flights), 0)
+
+    async def test_joiner_of_abandoned_request_restarts_it(self) -> None:
+        leader = asyncio.create_task(self.flights.do("a", self._load))
+        await asyncio.sleep(0)
+
+        # Ведущий уходит, и в тот же момент появляется новый вызов: чужая отмена ему не достаётся
+        leader.cancel()
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(self.flights.do("a", self._load))
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertEqual(await asyncio.wait_for(joiner, 1), 2)
+        self.assertTrue(leader.cancelled())
+
+
+if __name__ == "__main__":
+    unittest.main()
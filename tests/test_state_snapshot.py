@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+from src.api_communicator import DIRECTORY_TTL, ApiCommunicator
+from src.state_snapshot import STATE_VERSION, StateSnapshot
+from src.utils.directory import build_directory
+from src.utils.schedule import ScheduleKind, ScheduleTarget
+
+GROUP = ScheduleTarget(ScheduleKind.STUDENT, "ИС-11")
+TEACHER = ScheduleTarget(ScheduleKind.TEACHER, "Иванов И.И.")
+
+
+class StateSnapshotTest(unittest.IsolatedAsyncioTestCase):
+    """Каждый тест пишет состояние во временный каталог и читает его в новые синглтоны, как после перезапуска"""
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path: str = os.path.join(directory.name, "bot_state.json")
+        self._restart()
+
+    async def asyncTearDown(self) -> None:
+        await ApiCommunicator.instance._http_client.aclose()
+        ApiCommunicator.instance = None
+        StateSnapshot.instance = None
+
+    def _restart(self) -> None:
+        ApiCommunicator.instance = None
+        StateSnapshot.instance = None
+        self.api = ApiCommunicator(snapshot_mode=False)
+        self.state = StateSnapshot(self.path)
+
+    def _write(self, data: dict) -> None:
+        with open(self.path, "w") as file:
+            json.dump(data, file, ensure_ascii=False)
+
+    async def _restarted(self) -> None:
+        await self.api._http_client.aclose()
+        self._restart()
+
+    async def test_round_trip(self) -> None:
+        self.api.restore(datetime(2026, 10, 19), build_directory(["ИС-11"], ["Иванов И.И."]))
+        self.state.set_hash(GROUP, "2026-10-19:abc")
+        self.state.set_hash(TEACHER, "2026-10-19:def")
+        self.state.set_publish_minutes([18 * 60, 19 * 60 + 30])
+        self.state.save()
+
+        await self._restarted()
+        self.assertTrue(self.state.load())
+
+        self.assertEqual(self.api.schedule_date, datetime(2026, 10, 19))
+        self.assertEqual(self.api.directory.groups, frozenset({"ИС-11"}))
+        self.assertEqual(self.api.directory.find_teacher("иванов и.и."), "Иванов И.И.")
+        self.assertEqual(self.state.get_hash(GROUP), "2026-10-19:abc")
+        self.assertEqual(self.state.targets_sent_on("2026-10-19"), [GROUP, TEACHER])
+        self.assertEqual(self.state.publish_minutes, [18 * 60, 19 * 60 + 30])
+
+    async def test_fresh_directory_keeps_its_age(self) -> None:
+        self.api.restore(None, build_directory(["ИС-11"], []))
+        self.state.save()
+
+        await self._restarted()
+        self.state.load()
+
+        self.assertFalse(self.api.directory.is_expired(DIRECTORY_TTL))
+
+    async def test_old_directory_is_stale_after_restore(self) -> None:
+        self._write({"version": STATE_VERSION, "groups": ["ИС-11"], "teachers": [],
+                     "directory_loaded_at": time.time() - DIRECTORY_TTL - 60})
+
+        self.assertTrue(self.state.load())
+        self.assertTrue(self.api.directory.is_expired(DIRECTORY_TTL))
+
+    async def test_directory_without_saved_time_is_stale(self) -> None:
+        self._write({"version": STATE_VERSION, "groups": ["ИС-11"], "teachers": []})
+
+        self.assertTrue(self.state.load())
+        self.assertTrue(self.api.directory.is_expired(DIRECTORY_TTL))
+
+        # Устаревший справочник сохраняется снова без времени загрузки и остаётся устаревшим
+        self.state.save()
+        with open(self.path) as file:
+            self.assertIsNone(json.load(file)["directory_loaded_at"])
+
+    async def test_older_version_drops_fingerprints_only(self) -> None:
+        self._write({"version": 2, "schedule_date": "2026-10-19", "target_hashes": {"STUDENT:ИС-11": "x"},
+                     "publish_minutes": [1080]})
+
+        self.assertTrue(self.state.load())
+        self.assertIsNone(self.state.get_hash(GROUP))
+        self.assertEqual(self.api.schedule_date, datetime(2026, 10, 19))
+        self.assertEqual(self.state.publish_minutes, [1080])
+
+    async def test_unknown_version_and_corrupt_file_are_ignored(self) -> None:
+        self._write({"version": STATE_VERSION + 1, "schedule_date": "2026-10-19"})
+        self.assertFalse(self.state.load())
+
+        with open(self.path, "w") as file:
+            file.write('{"version": 3, "schedule_da')
+        self.assertFalse(self.state.load())
+
+        self.assertIsNone(self.api.schedule_date)
+
+    async def test_unchanged_state_is_not_rewritten(self) -> None:
+        self.state.set_hash(GROUP, "2026-10-19:abc")
+        await self.state.save_async()
+        written: float = os.stat(self.path).st_mtime_ns
+
+        os.utime(self.path, ns=(0, 0))
+        await self.state.save_async()
+
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertNotEqual(written, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from typing import Optional
+
+from src.database import Database, ScheduleSubscription
+from src.subscription_store import SubscriptionStore
+from src.utils.schedule import SubGroup
+
+
+class _Database:
+    """База в памяти; чтение всех подписок ждёт release, чтобы тест успел записать что-то во время сверки"""
+
+    def __init__(self, subscriptions: list[ScheduleSubscription]) -> None:
+        self.rows: dict[int, ScheduleSubscription] = {subscription.id: subscription for subscription in subscriptions}
+        self.release = asyncio.Event()
+        self.reading = asyncio.Event()
+        self._next_id: int = max(self.rows, default=0) + 1
+
+    async def get_all_schedule_subscriptions(self) -> list[ScheduleSubscription]:
+        rows: list[ScheduleSubscription] = list(self.rows.values())
+        self.reading.set()
+        await self.release.wait()
+        return rows
+
+    async def make_subscription(self, chat_id: int, group_name: Optional[str] = None,
+                                teacher_name: Optional[str] = None,
+                                sub_group: SubGroup = SubGroup.BOTH) -> ScheduleSubscription:
+        subscription = ScheduleSubscription(self._next_id, chat_id, group_name, teacher_name, sub_group)
+        self._next_id += 1
+        self.rows[subscription.id] = subscription
+        return subscription
+
+    async def remove_subscription(self, subscription_id: int) -> bool:
+        return self.rows.pop(subscription_id, None) is not None
+
+
+class ResyncTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.existing = ScheduleSubscription(1, 10, "ИС-11", None, SubGroup.BOTH)
+        self.database = _Database([self.existing])
+
+        Database.instance = self.database
+        SubscriptionStore.instance = None
+        self.store = SubscriptionStore()
+        self.addCleanup(setattr, Database, "instance", None)
+        self.addCleanup(setattr, SubscriptionStore, "instance", None)
+
+        self.database.release.set()
+        await self.store.load()
+        self.database.release.clear()
+
+    async def _resync_during(self, write) -> None:
+        """Запускает сверку, выполняет write, пока база читается, и дожидается конца сверки"""
+
+        self.database.reading.clear()
+        resync = asyncio.create_task(self.store.load())
+        await self.database.reading.wait()
+        await write()
+        self.database.release.set()
+        await resync
+
+    async def test_subscription_made_during_resync_survives(self) -> None:
+        created: list[ScheduleSubscription] = []
+
+        async def subscribe() -> None:
+            created.append(await self.store.make_subscription(10, group_name="ИС-12"))
+
+        await self._resync_during(subscribe)
+
+        subscriptions, count = await self.store.get_schedule_subscriptions(10)
+        self.assertEqual(subscriptions, [self.existing, created[0]])
+        self.assertEqual(count, 2)
+
+    async def test_subscription_removed_during_resync_stays_removed(self) -> None:
+        await self._resync_during(lambda: self.store.remove_subscription(self.existing))
+
+        self.assertEqual(await self.store.get_schedule_subscriptions(10), ([], 0))
+
+    async def test_resync_picks_up_rows_written_elsewhere(self) -> None:
+        other = ScheduleSubscription(5, 20, None, "Иванов И.И.", SubGroup.BOTH)
+        self.database.rows[other.id] = other
+        self.database.release.set()
+
+        await self.store.load()
+
+        self.assertEqual(await self.store.get_schedule_subscriptions(20), ([other], 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
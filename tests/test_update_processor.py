@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from telegram import Update
+
+from src.update_processor import ChatOrderedUpdateProcessor
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": chat_id, "type": "private", "first_name": "Иван"},
+            "text": "текст",
+        },
+    }, None)
+
+
+class ChatOrderedUpdateProcessorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2)
+        self.events: list[str] = []
+
+    async def _handler(self, name: str, delay: float = 0, wait: asyncio.Event = None) -> None:
+        self.events.append(f"{name}+")
+        if wait is not None:
+            await wait.wait()
+        await asyncio.sleep(delay)
+        self.events.append(f"{name}-")
+
+    async def test_same_chat_is_processed_in_order(self) -> None:
+        await asyncio.gather(
+            self.processor.process_update(_update(1, 10), self._handler("a", delay=0.05)),
+            self.processor.process_update(_update(2, 10), self._handler("b")),
+            self.processor.process_update(_update(3, 10), self._handler("c")),
+        )
+
+        self.assertEqual(self.events, ["a+", "a-", "b+", "b-", "c+", "c-"])
+        self.assertEqual(self.processor.active_chats, 0)
+
+    async def test_other_chats_run_concurrently(self) -> None:
+        released = asyncio.Event()
+
+        async def release() -> None:
+            released.set()
+
+        # Если бы чаты обрабатывались по очереди, первое обновление так и не дождалось бы второго
+        await asyncio.wait_for(asyncio.gather(
+            self.processor.process_update(_update(1, 10), self._handler("a", wait=released)),
+            self.processor.process_update(_update(2, 20), release()),
+        ), 1)
+
+        self.assertEqual(self.events, ["a+", "a-"])
+
+    async def test_queued_updates_of_one_chat_do_not_take_slots(self) -> None:
+        released = asyncio.Event()
+
+        async def release() -> None:
+            released.set()
+
+        await asyncio.wait_for(asyncio.gather(
+            self.processor.process_update(_update(1, 10), self._handler("a", wait=released)),
+            self.processor.process_update(_update(2, 10), self._handler("b")),
+            self.processor.process_update(_update(3, 10), self._handler("c")),
+            self.processor.process_update(_update(4, 20), release()),
+        ), 1)
+
+        self.assertEqual(self.events, ["a+", "a-", "b+", "b-", "c+", "c-"])
+
+    async def test_failed_update_releases_chat(self) -> None:
+        async def fail() -> None:
+            raise RuntimeError("обработчик упал")
+
+        results = await asyncio.gather(
+            self.processor.process_update(_update(1, 10), fail()),
+            self.processor.process_update(_update(2, 10), self._handler("b")),
+            return_exceptions=True,
+        )
+
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertEqual(self.events, ["b+", "b-"])
+        self.assertEqual(self.processor.active_chats, 0)
+
+    async def test_updates_without_chat_are_not_ordered(self) -> None:
+        released = asyncio.Event()
+
+        async def release() -> None:
+            released.set()
+
+        await asyncio.wait_for(asyncio.gather(
+            self.processor.process_update(object(), self._handler("a", wait=released)),
+            self.processor.process_update(object(), release()),
+        ), 1)
+
+        self.assertEqual(self.processor.active_chats, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from httpx import AsyncClient
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+
+from src.http_server import MAX_HEADER_SIZE, MAX_HEADERS, HttpResponse, HttpServer
+from src.webhook import SECRET_TOKEN_HEADER, WebhookConfig, WebhookServer
+
+SECRET = "test-secret"
+
+# Обновление в том виде, в каком его присылает Telegram
+RECORDED_UPDATE: dict = {
+    "update_id": 100500,
+    "message": {
+        "message_id": 7,
+        "date": 1760000000,
+        "chat": {"id": 42, "type": "private", "first_name": "Иван"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Иван"},
+        "text": "/start",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+    },
+}
+
+
+class HttpServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = HttpServer("127.0.0.1", 0, max_connections=2)
+
+        async def echo(request):
+            return HttpResponse(body=request.body)
+
+        self.server.add_route("POST", "/echo", echo)
+        await self.server.start()
+        self.client = AsyncClient(base_url=f"http://127.0.0.1:{self.server.port}")
+
+    async def asyncTearDown(self) -> None:
+        await self.client.aclose()
+        await self.server.stop()
+
+    async def test_routes_body_to_handler(self) -> None:
+        response = await self.client.post("/echo", content=b"hello")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"hello")
+
+    async def test_keeps_connection_between_requests(self) -> None:
+        for body in (b"first", b"second"):
+            response = await self.client.post("/echo", content=body)
+            self.assertEqual(response.content, body)
+
+    async def test_unknown_route(self) -> None:
+        response = await self.client.get("/missing")
+
+        self.assertEqual(response.status_code, 404)
+
+    async def _raw(self, data: bytes) -> bytes:
+        """Отправляет байты как есть и читает ответ до закрытия соединения сервером"""
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        try:
+            writer.write(data)
+            await writer.drain()
+            return await asyncio.wait_for(reader.read(), 2)
+        finally:
+            writer.close()
+
+    async def test_too_many_headers(self) -> None:
+        headers: bytes = b"".join(b"X-H%d: 1\r\n" % index for index in range(MAX_HEADERS + 1))
+
+        response: bytes = await self._raw(b"GET /echo HTTP/1.1\r\n" + headers + b"\r\n")
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 431 "))
+
+    async def test_headers_too_large(self) -> None:
+        headers: bytes = b"".join(b"X-H%d: %s\r\n" % (index, b"a" * 1000)
+                                  for index in range(MAX_HEADER_SIZE // 1000 + 1))
+
+        response: bytes = await self._raw(b"GET /echo HTTP/1.1\r\n" + headers + b"\r\n")
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 431 "))
+
+    async def test_header_line_over_limit(self) -> None:
+        response: bytes = await self._raw(b"GET /echo HTTP/1.1\r\nX-H: " + b"a" * MAX_HEADER_SIZE + b"\r\n\r\n")
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 "))
+
+    async def test_slow_request_is_dropped(self) -> None:
+        with mock.patch("src.http_server.REQUEST_READ_TIMEOUT", 0.1):
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+            try:
+                writer.write(b"POST /echo HTTP/1.1\r\nContent-Length: 10\r\n\r\nhel")
+                await writer.drain()
+
+                self.assertEqual(await asyncio.wait_for(reader.read(), 2), b"")
+            finally:
+                writer.close()
+
+    async def test_connections_over_limit_are_refused(self) -> None:
+        idle = [await asyncio.open_connection("127.0.0.1", self.server.port) for _ in range(2)]
+        try:
+            await asyncio.sleep(0.05)
+            # Лишнее соединение получает 503 сразу, не дожидаясь запроса
+            response: bytes = await self._raw(b"")
+            self.assertTrue(response.startswith(b"HTTP/1.1 503 "))
+        finally:
+            for _, writer in idle:
+                writer.close()
+
+        await asyncio.sleep(0.05)
+        response = await self.client.post("/echo", content=b"again")
+        self.assertEqual(response.content, b"again")
+
+
+class WebhookServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.application = ApplicationBuilder().token("123456:TEST").updater(None).build()
+        self.webhook = WebhookServer(self.application, WebhookConfig(listen="127.0.0.1", port=0, secret_token=SECRET))
+        await self.webhook.start()
+        self.client = AsyncClient(base_url=f"http://127.0.0.1:{self.webhook.http_server.port}")
+
+    async def asyncTearDown(self) -> None:
+        await self.client.aclose()
+        await self.webhook.stop()
+
+    async def _post(self, body: bytes, secret: str = SECRET):
+        return await self.client.post("/telegram", content=body, headers={SECRET_TOKEN_HEADER: secret,
+                                                                          "Content-Type": "application/json"})
+
+    async def test_recorded_update_reaches_update_queue(self) -> None:
+        response = await self._post(json.dumps(RECORDED_UPDATE).encode())
+
+        self.assertEqual(response.status_code, 200)
+        update: Update = await asyncio.wait_for(self.application.update_queue.get(), 1)
+        self.assertEqual(update.update_id, 100500)
+        self.assertEqual(update.effective_chat.id, 42)
+        self.assertEqual(update.message.text, "/start")
+
+    async def test_wrong_secret_is_forbidden(self) -> None:
+        response = await self._post(json.dumps(RECORDED_UPDATE).encode(), secret="forged")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(self.application.update_queue.empty())
+
+    async def test_malformed_bodies_are_bad_requests(self) -> None:
+        for body in (b"{", b"null", b"[]", b"1"):
+            with self.subTest(body=body):
+                response = await self._post(body)
+                self.assertEqual(response.status_code, 400)
+
+        self.assertTrue(self.application.update_queue.empty())
+
+    async def test_health(self) -> None:
+        response = await self.client.get("/health")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "starting", "update_queue": 0})
+
+
+class WebhookConfigTest(unittest.TestCase):
+    def test_url_requires_secret(self) -> None:
+        with self.assertRaises(ValueError):
+            WebhookConfig(url="https://example.org/telegram")
+
+    def test_local_mode_without_secret(self) -> None:
+        self.assertIsNone(WebhookConfig().secret_token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+from dotenv import load_dotenv
+import os
+
+from src.notification_worker import CLAIM_TIMEOUT, POLL_INTERVAL, WorkerConfig, run_workers
+from src.utils.message_sender import WORKER_SEND_RATE
+
+
+def worker_config() -> WorkerConfig:
+    return WorkerConfig(
+        processes=int(os.getenv("WORKER_PROCESSES", "1")),
+        send_rate=float(os.getenv("WORKER_SEND_RATE", str(WORKER_SEND_RATE))),
+        poll_interval=float(os.getenv("WORKER_POLL_INTERVAL", str(POLL_INTERVAL))),
+        claim_timeout=float(os.getenv("WORKER_CLAIM_TIMEOUT", str(CLAIM_TIMEOUT))),
+    )
+
+
+def main() -> None:
+    load_dotenv()
+    token: str = os.getenv("TG_BOT", None)
+
+    run_workers(token, worker_config())
+
+
+if __name__ == "__main__":
+    main()